@@ -0,0 +1,266 @@
+import argparse
+import os
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from features import level_segments
+from runs import (SENSOR_NAMES, STATE_HOLD, STATE_UNKNOWN, Run, list_runs,
+                  load_run)
+
+# ===============================
+# RESAMPLING GRID SERAGAM + ALIGNMENT ANTAR RUN
+# ===============================
+# Jarak sampel rekaman tidak seragam (jitter, rate per fase, reconnect) dan
+# panjang run berbeda, jadi membandingkan run per index baris tidak valid.
+# resample() memetakan semua kanal sekaligus ke titik waktu mana pun
+# (linear atau zero-order hold) dengan satu searchsorted; grid boleh 2D,
+# sehingga window semua level satu run dihitung dalam satu panggilan.
+#
+# align_runs() menaruh setiap run pada sumbu waktu relatif terhadap event
+# protokol: awal fase hold tiap level (anchor 'hold'), atau awal rekaman
+# untuk rekaman lama tanpa State/Level (anchor 'start'). Hasilnya array
+# (run, level, waktu, kanal) dengan NaN di luar rekaman, siap di-stack /
+# dirata-rata dengan np.nanmean.
+
+RESAMPLE_METHODS = ('linear', 'hold')
+ANCHORS = ('hold', 'start')
+DEFAULT_DT = 0.1          # detik, sama dengan rate default board
+DEFAULT_MAX_GAP = 1.0     # detik; titik grid di dalam celah lebih panjang = NaN
+
+
+def _monotonic(time, values):
+    """Urutkan sampel menurut waktu; timestamp dobel -> sampel terakhir dipakai"""
+    if len(time) < 2 or (np.diff(time) > 0).all():
+        return time, values
+    order = np.argsort(time, kind='stable')
+    time, values = time[order], values[order]
+    keep = np.r_[time[1:] != time[:-1], True]
+    return time[keep], values[keep]
+
+
+def uniform_grid(start, stop, dt=DEFAULT_DT):
+    """Titik start, start + dt, ... <= stop"""
+    n = int(np.floor((stop - start) / dt + 1e-9)) + 1
+    return start + np.arange(max(n, 0)) * dt
+
+
+def resample(time, values, grid, method='linear', max_gap=None):
+    """Nilai values (N, C) pada time (N,) di titik grid (bentuk bebas).
+
+    Hasil: grid.shape + (C,). Titik di luar rentang rekaman, NaN di grid,
+    atau di dalam celah antar sampel > max_gap detik bernilai NaN.
+    """
+    if method not in RESAMPLE_METHODS:
+        raise ValueError(f"method must be one of {RESAMPLE_METHODS}")
+    time = np.asarray(time, dtype=float)
+    values = np.asarray(values, dtype=float).reshape(len(time), -1)
+    grid = np.asarray(grid, dtype=float)
+    out_shape = grid.shape + (values.shape[1],)
+    if len(time) == 0:
+        return np.full(out_shape, np.nan)
+    time, values = _monotonic(time, values)
+    g = grid.ravel()
+
+    right = np.searchsorted(time, g, side='right')
+    left = np.clip(right - 1, 0, len(time) - 1)
+    right = np.clip(right, 0, len(time) - 1)
+    span = time[right] - time[left]
+    if method == 'hold':
+        out = values[left]
+    else:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            w = np.where(span > 0, (g - time[left]) / span, 0.0)
+        out = values[left] + w[:, None] * (values[right] - values[left])
+
+    valid = (g >= time[0]) & (g <= time[-1])
+    if max_gap is not None:
+        valid &= (span <= max_gap) | (g == time[left])
+    out[~valid] = np.nan
+    return out.reshape(out_shape)
+
+
+def _resample_codes(time, codes, grid, max_gap=None):
+    """State/level (kategori) selalu zero-order hold; NaN -> STATE_UNKNOWN"""
+    x = resample(time, codes, grid, 'hold', max_gap)[..., 0]
+    return np.where(np.isnan(x), STATE_UNKNOWN, x).astype(np.int16)
+
+
+def resample_run(run, dt=DEFAULT_DT, method='linear', max_gap=None):
+    """Run baru di grid seragam mulai sampel pertama"""
+    if not len(run):
+        return run
+    grid = uniform_grid(run.time[0], run.time[-1], dt)
+    return Run(grid, resample(run.time, run.values, grid, method, max_gap),
+               _resample_codes(run.time, run.state, grid, max_gap),
+               _resample_codes(run.time, run.level, grid, max_gap),
+               name=run.name, sample_type=run.sample_type,
+               timestamp=run.timestamp, path=run.path)
+
+
+# ===============================
+# EVENT PROTOKOL
+# ===============================
+def hold_events(run):
+    """Awal fase hold per level -> {level: (t_hold, t_awal_level, t_akhir_level)}
+
+    Hanya kemunculan pertama tiap level yang dipakai.
+    """
+    events = {}
+    for level, a, b in level_segments(run.level):
+        if level in events or level == STATE_UNKNOWN:
+            continue
+        hold = np.flatnonzero(run.state[a:b] == STATE_HOLD)
+        if len(hold):
+            events[level] = (float(run.time[a + hold[0]]), float(run.time[a]),
+                             float(run.time[b - 1]))
+    return events
+
+
+class AlignedRuns:
+    """Run yang sudah disejajarkan.
+
+    values (R, L, M, C) dan state (R, L, M) pada waktu offsets (M,) relatif
+    terhadap event levels[l] tiap run; events (R, L) = waktu event di run
+    (NaN kalau level itu tidak ada di run).
+    """
+
+    def __init__(self, offsets, levels, values, state, events, runs, anchor):
+        self.offsets = offsets
+        self.levels = levels
+        self.values = values
+        self.state = state
+        self.events = events
+        self.names = [os.path.basename(r.path) if r.path else r.name for r in runs]
+        self.sample_types = [r.sample_type for r in runs]
+        self.anchor = anchor
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def labels(self):
+        return sorted(set(self.sample_types))
+
+    def mean(self, label=None):
+        """Rata-rata antar run (semua, atau satu jenis sampel): (L, M, C)"""
+        pick = [i for i, s in enumerate(self.sample_types) if label is None or s == label]
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)   # titik yang NaN di semua run
+            return np.nanmean(self.values[pick], axis=0)
+
+    def save(self, path):
+        """Tulis .npz: array aligned + rata-rata per jenis sampel"""
+        labels = self.labels
+        np.savez_compressed(
+            path, values=self.values, state=self.state, offsets=self.offsets,
+            levels=np.asarray(self.levels), events=self.events,
+            runs=np.asarray(self.names), sample_types=np.asarray(self.sample_types),
+            labels=np.asarray(labels), mean=np.stack([self.mean(l) for l in labels]),
+            channels=np.asarray(SENSOR_NAMES), anchor=self.anchor)
+
+
+def align_runs(runs, dt=DEFAULT_DT, method='linear', anchor='hold', pre=None, post=None,
+               max_gap=DEFAULT_MAX_GAP):
+    """Sejajarkan runs pada event protokol, semua di grid seragam dt.
+
+    anchor 'hold': window [-pre, +post] detik di sekitar awal hold tiap level;
+    default pre/post = median jarak awal level -> hold dan hold -> akhir level.
+    anchor 'start': satu window dari sampel pertama, default sepanjang run terlama.
+    Run tanpa State/Level dilewati untuk anchor 'hold'.
+    """
+    if anchor not in ANCHORS:
+        raise ValueError(f"anchor must be one of {ANCHORS}")
+    if anchor == 'hold':
+        events = []
+        for run in runs:
+            ev = hold_events(run) if run.has_protocol else {}
+            if not ev:
+                print(f"Skipping {run.path or run.name}: tidak ada fase hold (pakai --anchor start)")
+            events.append(ev)
+        runs = [r for r, ev in zip(runs, events) if ev]
+        events = [ev for ev in events if ev]
+        levels = sorted({level for ev in events for level in ev})
+        spans = np.array([(t - a, b - t) for ev in events for t, a, b in ev.values()])
+        if pre is None:
+            pre = float(np.median(spans[:, 0])) if len(spans) else 0.0
+        if post is None:
+            post = float(np.median(spans[:, 1])) if len(spans) else 0.0
+        event_t = np.array([[ev[l][0] if l in ev else np.nan for l in levels] for ev in events])
+    else:
+        levels = [0]
+        pre = 0.0 if pre is None else pre
+        if post is None:
+            post = max((r.duration for r in runs), default=0.0)
+        event_t = np.array([[r.time[0] if len(r) else np.nan] for r in runs])
+
+    offsets = np.arange(-int(round(pre / dt)), int(round(post / dt)) + 1) * dt
+    shape = (len(runs), len(levels), len(offsets))
+    values = np.full(shape + (len(SENSOR_NAMES),), np.nan)
+    state = np.full(shape, STATE_UNKNOWN, dtype=np.int16)
+    for i, run in enumerate(runs):
+        # Semua window satu run (L, M) sekaligus
+        grid = event_t[i].reshape(len(levels), 1) + offsets
+        values[i] = resample(run.time, run.values, grid, method, max_gap)
+        state[i] = _resample_codes(run.time, run.state, grid, max_gap)
+    return AlignedRuns(offsets, levels, values, state,
+                       event_t.reshape(len(runs), len(levels)), runs, anchor)
+
+
+def _load_or_none(path):
+    try:
+        return load_run(path)
+    except (OSError, ValueError) as e:
+        print(f"Skipping {path}: {e}")
+        return None
+
+
+def align_directory(directory, workers=None, **kwargs):
+    """Load semua run di directory (paralel) lalu align_runs(**kwargs)"""
+    paths = list_runs(directory)
+    if workers == 1 or len(paths) <= 1:
+        runs = list(map(_load_or_none, paths))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            runs = list(pool.map(_load_or_none, paths))
+    return align_runs([r for r in runs if r is not None], **kwargs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Resample rekaman ke grid seragam dan sejajarkan antar run pada event protokol")
+    parser.add_argument('directory')
+    parser.add_argument('-o', '--output', default='aligned.npz')
+    parser.add_argument('--dt', type=float, default=DEFAULT_DT, help="jarak grid (detik)")
+    parser.add_argument('--method', choices=RESAMPLE_METHODS, default='linear',
+                        help="linear atau hold (zero-order hold)")
+    parser.add_argument('--anchor', choices=ANCHORS, default='hold',
+                        help="hold = awal fase hold tiap level, start = awal rekaman (data lama)")
+    parser.add_argument('--pre', type=float, default=None, help="detik sebelum event (default otomatis)")
+    parser.add_argument('--post', type=float, default=None, help="detik setelah event (default otomatis)")
+    parser.add_argument('--max-gap', type=float, default=DEFAULT_MAX_GAP,
+                        help="celah antar sampel lebih panjang dari ini tidak diinterpolasi")
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+    if args.dt <= 0:
+        parser.error("--dt must be > 0")
+
+    aligned = align_directory(args.directory, workers=args.workers, dt=args.dt,
+                              method=args.method, anchor=args.anchor, pre=args.pre,
+                              post=args.post, max_gap=args.max_gap)
+    if not len(aligned):
+        print("Tidak ada run yang bisa disejajarkan")
+        return 1
+    aligned.save(args.output)
+    present = (~np.isnan(aligned.events)).sum(axis=0)
+    print(f"{len(aligned)} run x {len(aligned.levels)} level x {len(aligned.offsets)} titik "
+          f"({aligned.offsets[0]:.1f}..{aligned.offsets[-1]:.1f} s, dt {args.dt:g} s) -> {args.output}")
+    for level, n in zip(aligned.levels, present):
+        print(f"  level {level}: {n}/{len(aligned)} run")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
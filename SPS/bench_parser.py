@@ -0,0 +1,86 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from protocol import parse_sensor_lines
+from runs import WIRE_ORDER
+
+# ===============================
+# BENCHMARK PARSER BARIS SENSOR
+# ===============================
+# Bandingkan parse per baris (cara lama handle_sensor_data: split + float()
+# per field) dengan parse_sensor_lines per buffer recv() dan sekali untuk
+# seluruh buffer. Hasil dalam baris/detik.
+
+CHUNK_BYTES = 65536   # ukuran recv() di DataReceiverThread
+
+
+def make_lines(n, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(0.0, 5.0, (n, 7))
+    state = rng.integers(0, 5, n)
+    level = rng.integers(1, 6, n)
+    lines = [f"SENSOR:{','.join(f'{v:.4f}' for v in row)},{s},{l}\n"
+             for row, s, l in zip(values, state, level)]
+    return ''.join(lines).encode('utf-8')
+
+
+def parse_per_line(buf):
+    """Parser lama: satu baris per panggilan"""
+    out = []
+    for data in buf.decode('utf-8').splitlines():
+        parts = data.split(':')[1].split(',')
+        sensor_values = [float(parts[i]) for i in WIRE_ORDER]
+        out.append((sensor_values, int(parts[7]), int(parts[8])))
+    return out
+
+
+def parse_chunked(buf, chunk=CHUNK_BYTES):
+    """Seperti serve_text: potong per recv(), parse baris lengkap per potongan"""
+    total, pending = 0, b''
+    for i in range(0, len(buf), chunk):
+        pending += buf[i:i + chunk]
+        end = pending.rfind(b'\n') + 1
+        rows, _ = parse_sensor_lines(pending[:end])
+        total += len(rows)
+        pending = pending[end:]
+    return total
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark parser baris SENSOR (per baris vs bulk)")
+    parser.add_argument('-n', '--lines', type=int, default=200000)
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    buf = make_lines(args.lines)
+    rows, bad = parse_sensor_lines(buf)
+    old = parse_per_line(buf)
+    assert not bad and len(rows) == len(old) == args.lines
+    assert np.allclose(rows[:, WIRE_ORDER], [v for v, _, _ in old])
+
+    results = [
+        ("per baris (lama)", best_of(lambda: parse_per_line(buf), args.repeat)),
+        (f"bulk per recv {CHUNK_BYTES // 1024} KiB", best_of(lambda: parse_chunked(buf), args.repeat)),
+        ("bulk satu buffer", best_of(lambda: parse_sensor_lines(buf), args.repeat)),
+    ]
+    base = results[0][1]
+    print(f"{args.lines} baris, {len(buf) / 1e6:.1f} MB, best of {args.repeat}")
+    for name, secs in results:
+        print(f"  {name:<22} {args.lines / secs / 1e6:6.2f} M baris/s  ({base / secs:4.1f}x)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# ===============================
+# BENCHMARK COLD START GUI
+# ===============================
+# 1. `python -X importtime -c "import main"`: total waktu import main.py dan
+#    modul top-level paling mahal.
+# 2. Waktu dari proses dijalankan sampai window selesai paint pertama,
+#    plus cek bahwa modul opsional (LAZY_MODULES) belum ter-load saat itu.
+# Exit code 1 kalau median melewati budget.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LAZY_MODULES = ('requests', 'influxdb_client', 'inference', 'run_index', 'history', 'cache')
+IMPORT_BUDGET_MS = 600
+WINDOW_BUDGET_MS = 1500
+
+_WINDOW_SNIPPET = r"""
+import sys, time
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QApplication
+import main
+app = QApplication(sys.argv)
+window = main.ENoseGUI()
+window.show()
+def done():
+    lazy = [m for m in %r if m in sys.modules]
+    print(f"PAINTED {time.time():.6f} {','.join(lazy)}", flush=True)
+    window.close()
+    app.quit()
+QTimer.singleShot(0, done)
+app.exec()
+"""
+
+
+def parse_importtime(stderr):
+    """Baris '-X importtime' -> list (module, depth, self_us, cumulative_us)"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        head, cum_us, name = line.split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(head.split(':')[1]), int(cum_us)))
+    return rows
+
+
+def measure_import(python):
+    proc = subprocess.run([python, '-X', 'importtime', '-c', 'import main'], cwd=HERE,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    return parse_importtime(proc.stderr)
+
+
+def measure_window(python, platform):
+    env = dict(os.environ)
+    if platform:
+        env['QT_QPA_PLATFORM'] = platform
+    start = time.time()
+    proc = subprocess.run([python, '-c', _WINDOW_SNIPPET % (LAZY_MODULES,)], cwd=HERE,
+                          capture_output=True, text=True, env=env)
+    for line in proc.stdout.splitlines():
+        if line.startswith('PAINTED '):
+            _, stamp, *lazy = line.split(' ')
+            loaded = lazy[0].split(',') if lazy and lazy[0] else []
+            return (float(stamp) - start) * 1000.0, loaded
+    raise RuntimeError(proc.stderr[-2000:] or "window did not paint")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ukur cold start GUI (import + first paint)")
+    parser.add_argument('-n', '--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=IMPORT_BUDGET_MS,
+                        help="budget median waktu import main")
+    parser.add_argument('--window-budget-ms', type=float, default=WINDOW_BUDGET_MS,
+                        help="budget median start proses sampai window tampil")
+    parser.add_argument('--platform', default=os.environ.get('QT_QPA_PLATFORM', 'offscreen'),
+                        help="QT_QPA_PLATFORM untuk pengukuran window (default offscreen)")
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--no-window', action='store_true')
+    args = parser.parse_args(argv)
+
+    python = sys.executable
+    totals, last = [], None
+    for _ in range(args.runs):
+        rows = measure_import(python)
+        totals.append(next(cum for name, depth, _, cum in rows if name == 'main' and depth == 0) / 1000.0)
+        last = rows
+    import_ms = statistics.median(totals)
+
+    print(f"import main: median {import_ms:.0f} ms (min {min(totals):.0f}, max {max(totals):.0f}, n={args.runs})")
+    print("top-level imports main.py (kumulatif, run terakhir):")
+    # importtime mencetak child sebelum parent: import langsung main.py = baris
+    # depth 1 antara baris depth 0 sebelumnya dan baris main
+    end = max(i for i, row in enumerate(last) if row[0] == 'main' and row[1] == 0)
+    begin = max((i for i in range(end) if last[i][1] == 0), default=-1) + 1
+    direct = [(cum, name) for name, depth, _, cum in last[begin:end] if depth == 1]
+    for cum, name in sorted(direct, reverse=True)[:args.top]:
+        print(f"  {cum / 1000.0:8.1f} ms  {name}")
+
+    failed = import_ms > args.budget_ms
+    if not args.no_window:
+        times, loaded = [], set()
+        for _ in range(args.runs):
+            ms, lazy = measure_window(python, args.platform)
+            times.append(ms)
+            loaded.update(lazy)
+        window_ms = statistics.median(times)
+        print(f"start -> first paint: median {window_ms:.0f} ms (min {min(times):.0f}, max {max(times):.0f})")
+        if loaded:
+            print(f"modul lazy sudah ter-load saat window tampil: {', '.join(sorted(loaded))}")
+            failed = True
+        failed |= window_ms > args.window_budget_ms
+        print(f"budget: import {args.budget_ms:.0f} ms, window {args.window_budget_ms:.0f} ms")
+    else:
+        print(f"budget: import {args.budget_ms:.0f} ms")
+    print("FAIL" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
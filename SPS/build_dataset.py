@@ -0,0 +1,283 @@
+import argparse
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from align import DEFAULT_MAX_GAP, resample_run
+from dataset import Catalog, COLUMNS
+from inference import DEFAULT_RATE
+from runs import SENSOR_NAMES, STATE_NAMES, Run
+
+# ===============================
+# TRAIN/VAL/TEST DATASET BUILDER
+# ===============================
+# Semua run di catalog dipotong menjadi sliding window (W, 7) lalu ditulis
+# sebagai shard .npz terkompresi per split. Split dilakukan per rekaman (bukan
+# per window, supaya tidak bocor) dan distratifikasi per label. GUI bisa
+# menyimpan satu rekaman sebagai .csv dan .json; file dengan label sama yang
+# rentang waktunya ([timestamp simpan - durasi, timestamp simpan]) tumpang
+# tindih dianggap satu rekaman dan selalu masuk split yang sama. Rate sampel
+# berbeda per fase, jadi setiap run di-resample dulu ke grid 1/rate detik:
+# window W sampel selalu mencakup W/rate detik, sama dengan yang dilihat
+# model di GUI (lihat inference.py). Setiap worker memproses sekelompok run
+# satu per satu dan menulis shard-nya sendiri, jadi memori per proses
+# dibatasi oleh ukuran shard.
+
+SPLITS = ('train', 'val', 'test')
+DEFAULT_FRACTIONS = (0.7, 0.15, 0.15)
+DEFAULT_SHARD_SIZE = 4096     # window per shard
+RUNS_PER_JOB = 4
+OTHER_SAMPLE_TYPE = 'Lainnya'   # pilihan "lainnya" di GUI; label diambil dari nama sampel
+
+
+def sample_label(entry):
+    """Label kelas yang sama untuk .csv (nama file) dan .json (metadata sample_type)"""
+    label = entry.sample_type
+    if not label or label == OTHER_SAMPLE_TYPE:
+        label = entry.name
+    return ' '.join(label.replace('_', ' ').split())
+
+
+def recording_groups(entries):
+    """Kelompokkan file yang berasal dari rekaman yang sama -> list of list entry"""
+    groups, by_label = [], {}
+    for e in entries:
+        if e.timestamp is None:
+            groups.append([e])
+        else:
+            by_label.setdefault(sample_label(e), []).append(e)
+    for label in sorted(by_label):
+        spans = sorted(((e.timestamp.timestamp() - e.duration, e.timestamp.timestamp(), e)
+                        for e in by_label[label]), key=lambda s: (s[0], s[2].file))
+        end = None
+        for start, stop, e in spans:
+            if end is not None and start <= end:
+                groups[-1].append(e)
+                end = max(end, stop)
+            else:
+                groups.append([e])
+                end = stop
+    return groups
+
+
+def stratified_split(entries, fractions=DEFAULT_FRACTIONS, seed=0):
+    """Bagi entry catalog ke split per label, per rekaman; hasil {split: [entry, ...]}"""
+    rng = random.Random(seed)
+    by_label = {}
+    for group in recording_groups(entries):
+        by_label.setdefault(sample_label(group[0]), []).append(group)
+    result = {s: [] for s in SPLITS}
+    for label in sorted(by_label):
+        groups = sorted(by_label[label], key=lambda g: min(e.file for e in g))
+        rng.shuffle(groups)
+        n = len(groups)
+        n_val = int(round(n * fractions[1]))
+        n_test = int(round(n * fractions[2]))
+        if n - n_val - n_test < 1:   # minimal satu rekaman per label di train
+            n_val, n_test = max(0, min(n_val, n - 1)), 0
+        for split, part in (('val', groups[:n_val]), ('test', groups[n_val:n_val + n_test]),
+                            ('train', groups[n_val + n_test:])):
+            result[split] += [e for g in part for e in g]
+    return result
+
+
+def _resampled(cols, rate):
+    """Kolom catalog (COLUMNS, N) -> kolom yang sama di grid seragam 1/rate detik"""
+    n = len(SENSOR_NAMES)
+    run = Run(np.asarray(cols[0], dtype=float), np.asarray(cols[1:1 + n], dtype=float).T,
+              np.asarray(cols[1 + n]), np.asarray(cols[2 + n]))
+    run = resample_run(run, dt=1.0 / rate, max_gap=DEFAULT_MAX_GAP)
+    return np.vstack([run.time, run.values.T, run.state, run.level])
+
+
+def _spans(cols, states, levels):
+    """Rentang baris kontinu yang state/level-nya diikutkan (celah rekaman = NaN dilewati)"""
+    keep = np.isfinite(cols[1:1 + len(SENSOR_NAMES)]).all(axis=0)
+    if levels is not None:
+        keep &= np.isin(cols[COLUMNS.index('level')], levels)
+    if states is not None:
+        keep &= np.isin(cols[COLUMNS.index('state')], states)
+    edges = np.flatnonzero(np.diff(keep.astype(np.int8))) + 1
+    bounds = np.r_[0, edges, len(keep)]
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if keep[a]]
+
+
+def _run_stats(job):
+    """Worker fase 1: count/sum/sumsq per kanal (untuk normalisasi z-score)"""
+    directory, entries, rate, states, levels = job
+    catalog = Catalog(directory, entries)
+    n, s1, s2 = 0, np.zeros(len(SENSOR_NAMES)), np.zeros(len(SENSOR_NAMES))
+    for entry in entries:
+        cols = _resampled(catalog.columns(entry), rate)
+        for a, b in _spans(cols, states, levels):
+            x = np.asarray(cols[1:1 + len(SENSOR_NAMES), a:b], dtype=float)
+            n += x.shape[1]
+            s1 += x.sum(axis=1)
+            s2 += (x * x).sum(axis=1)
+    return n, s1, s2
+
+
+def _write_windows(job):
+    """Worker fase 2: window + normalisasi + tulis shard untuk sekelompok run"""
+    (directory, entries, split, job_id, out_dir, classes, window, stride, rate,
+     states, levels, mean, std, shard_size) = job
+    catalog = Catalog(directory, entries)
+    split_dir = os.path.join(out_dir, split)
+    shards, buf_x, buf_y, buf_run, buffered = [], [], [], [], 0
+
+    def flush():
+        nonlocal buf_x, buf_y, buf_run, buffered
+        if not buffered:
+            return
+        name = f"shard-{job_id:05d}-{len(shards):03d}.npz"
+        np.savez_compressed(os.path.join(split_dir, name),
+                            x=np.concatenate(buf_x), y=np.concatenate(buf_y),
+                            run=np.concatenate(buf_run))
+        shards.append({'file': f"{split}/{name}", 'count': buffered})
+        buf_x, buf_y, buf_run, buffered = [], [], [], 0
+
+    for entry in entries:
+        cols = _resampled(catalog.columns(entry), rate)
+        label = classes.index(sample_label(entry))
+        for a, b in _spans(cols, states, levels):
+            if b - a < window:
+                continue
+            x = np.asarray(cols[1:1 + len(SENSOR_NAMES), a:b], dtype=np.float32).T
+            if mean is not None:
+                x = (x - mean) / std
+            # (n_windows, W, C) tanpa copy, lalu diambil tiap `stride`
+            wins = sliding_window_view(x, window, axis=0)[::stride].transpose(0, 2, 1)
+            k = 0
+            while k < len(wins):
+                part = wins[k:k + shard_size - buffered]
+                buf_x.append(np.ascontiguousarray(part))
+                buf_y.append(np.full(len(part), label, dtype=np.int16))
+                buf_run.append(np.full(len(part), entry.file))
+                buffered += len(part)
+                k += len(part)
+                if buffered >= shard_size:
+                    flush()
+    flush()
+    return shards
+
+
+def build_dataset(directory, out_dir, window=100, stride=10, states=None, levels=None,
+                  normalize='zscore', fractions=DEFAULT_FRACTIONS, seed=0,
+                  shard_size=DEFAULT_SHARD_SIZE, workers=None, labels=None, rate=DEFAULT_RATE):
+    if not rate > 0:
+        raise ValueError(f"rate harus > 0 Hz, dapat {rate}")
+    catalog = Catalog.open(directory, workers=workers)
+    entries = catalog.query()
+    if labels:
+        wanted = {' '.join(l.replace('_', ' ').split()) for l in labels}
+        entries = [e for e in entries if sample_label(e) in wanted]
+    if not entries:
+        raise ValueError(f"No runs in {directory}")
+    classes = sorted({sample_label(e) for e in entries})
+    splits = stratified_split(entries, fractions, seed)
+    for split in SPLITS:
+        os.makedirs(os.path.join(out_dir, split), exist_ok=True)
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+    run_map = pool.map if pool is not None else map
+    try:
+        mean = std = None
+        if normalize == 'zscore':
+            train = splits['train']
+            jobs = [(directory, train[i:i + RUNS_PER_JOB], rate, states, levels)
+                    for i in range(0, len(train), RUNS_PER_JOB)]
+            n, s1, s2 = 0, 0.0, 0.0
+            for jn, j1, j2 in run_map(_run_stats, jobs):
+                n, s1, s2 = n + jn, s1 + j1, s2 + j2
+            if n == 0:
+                raise ValueError("No training samples for the selected states/levels")
+            mean = (s1 / n).astype(np.float32)
+            std = np.sqrt(np.maximum(s2 / n - (s1 / n) ** 2, 1e-12)).astype(np.float32)
+
+        jobs = []
+        for split in SPLITS:
+            group = splits[split]
+            for i in range(0, len(group), RUNS_PER_JOB):
+                jobs.append((directory, group[i:i + RUNS_PER_JOB], split, len(jobs), out_dir,
+                             classes, window, stride, rate, states, levels, mean, std, shard_size))
+        shards = [s for job_shards in run_map(_write_windows, jobs) for s in job_shards]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    meta = {
+        'classes': classes,
+        'channels': SENSOR_NAMES,
+        'window': window,
+        'stride': stride,
+        'rate': rate,
+        'states': states,
+        'levels': levels,
+        'normalize': normalize,
+        'mean': None if mean is None else mean.tolist(),
+        'std': None if std is None else std.tolist(),
+        'splits': {s: [e.file for e in splits[s]] for s in SPLITS},
+        'shards': shards,
+        'counts': {s: sum(sh['count'] for sh in shards if sh['file'].startswith(s + '/')) for s in SPLITS},
+    }
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def _parse_states(text):
+    if not text:
+        return None
+    names = {v: k for k, v in STATE_NAMES.items()}
+    states = []
+    for s in text.split(','):
+        s = s.strip()
+        if s.lstrip('-').isdigit():
+            states.append(int(s))
+        elif s in names:
+            states.append(names[s])
+        else:
+            raise ValueError(f"State '{s}' tidak dikenal (pilih {', '.join(names)} atau kode angka)")
+    return states
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Potong semua run jadi window train/val/test (.npz shard)")
+    parser.add_argument('directory')
+    parser.add_argument('-o', '--output', default='dataset_out')
+    parser.add_argument('--window', type=int, default=100, help="panjang window (sampel di grid --rate)")
+    parser.add_argument('--stride', type=int, default=10, help="jarak antar window (sampel di grid --rate)")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="rate resample dalam Hz (default 10)")
+    parser.add_argument('--states', default=None, help="mis. 'ramp-up,hold' atau '1,2' (default semua)")
+    parser.add_argument('--levels', default=None, help="mis. '1,2,3' (default semua)")
+    parser.add_argument('--normalize', choices=['zscore', 'none'], default='zscore')
+    parser.add_argument('--split', default='0.7,0.15,0.15')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument('--label', action='append')
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    fractions = tuple(float(v) for v in args.split.split(','))
+    levels = [int(v) for v in args.levels.split(',')] if args.levels else None
+    try:
+        states = _parse_states(args.states)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        meta = build_dataset(args.directory, args.output, args.window, args.stride,
+                             states, levels, args.normalize, fractions,
+                             args.seed, args.shard_size, args.workers, args.label, args.rate)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"classes={meta['classes']} windows={meta['counts']} shards={len(meta['shards'])}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
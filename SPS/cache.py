@@ -0,0 +1,250 @@
+import contextlib
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+
+# ===============================
+# CACHE ARTEFAK TURUNAN (ON-DISK)
+# ===============================
+# Key = hash isi file rekaman + string parameter proses, jadi artefak
+# (index run browser, tabel fitur, hash plot, ...) otomatis invalid kalau
+# rekaman atau parameternya berubah. Hash isi file dimemo per
+# (path, size, mtime), sehingga membuka ulang folder berisi ratusan run
+# hanya butuh stat() + lookup. Eviction LRU berdasarkan total ukuran.
+#
+# Hanya proses utama yang menulis ke cache; worker process pool menerima
+# daftar run yang belum ada di cache dan mengembalikan hasilnya. GUI dan
+# tool CLI bisa memakai folder cache yang sama bersamaan: flush() mengunci
+# index.lock, membaca ulang index di disk lalu menggabungkan perubahan proses
+# ini saja (put / akses / hapus), jadi entry proses lain tidak hilang.
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'enose_sps')
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+INDEX_NAME = 'index.json'
+LOCK_NAME = 'index.lock'
+
+
+def _hash_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_dir():
+    """Folder cache: env ENOSE_CACHE_DIR atau DEFAULT_CACHE_DIR"""
+    return os.environ.get('ENOSE_CACHE_DIR', DEFAULT_CACHE_DIR)
+
+
+class ArtifactCache:
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or cache_dir()
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self._index_path = os.path.join(self.directory, INDEX_NAME)
+        self._lock_path = os.path.join(self.directory, LOCK_NAME)
+        self._entries = {}    # key -> [size, last_access]
+        self._digests = {}    # abspath -> [size, mtime_ns, sha256]
+        self._total = 0       # jumlah size semua entry
+        # Perubahan sejak flush terakhir, digabung ke index di disk saat flush
+        self._touched = set()
+        self._removed = set()
+        self._new_digests = set()
+        self._load_index()
+
+    def _read_index(self):
+        try:
+            with open(self._index_path, 'r') as f:
+                doc = json.load(f)
+            return doc.get('entries', {}), doc.get('digests', {})
+        except (OSError, ValueError):
+            return {}, {}
+
+    def _load_index(self):
+        self._entries, self._digests = self._read_index()
+        self._total = sum(size for size, _ in self._entries.values())
+
+    @contextlib.contextmanager
+    def _index_lock(self):
+        """Lock antar proses untuk read-merge-write index"""
+        with open(self._lock_path, 'a+b') as f:
+            if os.name == 'nt':
+                import msvcrt
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                try:
+                    yield
+                finally:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    @property
+    def _dirty(self):
+        return bool(self._touched or self._removed or self._new_digests)
+
+    def flush(self):
+        """Gabungkan perubahan ke index di disk (di bawah lock, atomic replace)"""
+        if not self._dirty:
+            return
+        with self._index_lock():
+            entries, digests = self._read_index()
+            for key in self._removed - self._touched:
+                entries.pop(key, None)
+            for key in self._touched:
+                if key in self._entries:
+                    mine = self._entries[key]
+                    theirs = entries.get(key)
+                    entries[key] = [mine[0], max(mine[1], theirs[1]) if theirs else mine[1]]
+            for path in self._new_digests:
+                if path in self._digests:
+                    digests[path] = self._digests[path]
+            self._entries, self._digests = entries, digests
+            self._total = sum(size for size, _ in entries.values())
+            self._touched.clear()
+            self._removed.clear()
+            self._new_digests.clear()
+            self._evict()
+            # Blob yang baru dibuang _evict() sudah tidak ada di entries
+            self._removed.clear()
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'entries': self._entries, 'digests': self._digests}, f)
+            os.replace(tmp, self._index_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    # ---------- key ----------
+    def digest(self, path):
+        """sha256 isi file, dimemo selama size & mtime tidak berubah"""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        memo = self._digests.get(path)
+        if memo and memo[0] == st.st_size and memo[1] == st.st_mtime_ns:
+            return memo[2]
+        digest = _hash_file(path)
+        self._digests[path] = [st.st_size, st.st_mtime_ns, digest]
+        self._new_digests.add(path)
+        return digest
+
+    def key(self, path, params):
+        return hashlib.sha256(f"{self.digest(path)}|{params}".encode('utf-8')).hexdigest()
+
+    def _blob_path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.pkl')
+
+    # ---------- get / put ----------
+    def get(self, key, default=None):
+        if key not in self._entries:
+            return default
+        try:
+            with open(self._blob_path(key), 'rb') as f:
+                value = pickle.load(f)
+        except Exception:
+            # Blob hilang (dibuang proses lain), rusak, atau berisi class yang
+            # sudah berubah (AttributeError, ModuleNotFoundError, ...) = miss
+            self._drop(key)
+            return default
+        self._entries[key][1] = time.time()
+        self._touched.add(key)
+        return value
+
+    def put(self, key, value):
+        blob = self._blob_path(key)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(blob), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, blob)
+        old = self._entries.get(key)
+        if old:
+            self._total -= old[0]
+        size = os.path.getsize(blob)
+        self._entries[key] = [size, time.time()]
+        self._total += size
+        self._touched.add(key)
+        self._removed.discard(key)
+        self._evict()
+
+    def _drop(self, key, remove_blob=True):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._total -= entry[0]
+        self._touched.discard(key)
+        self._removed.add(key)
+        if remove_blob:
+            try:
+                os.remove(self._blob_path(key))
+            except OSError:
+                pass
+
+    def lookup(self, paths, params):
+        """Split paths jadi (hits {path: value}, misses [path], keys {path: key})"""
+        hits, misses, keys = {}, [], {}
+        for path in paths:
+            keys[path] = self.key(path, params)
+            value = self.get(keys[path])
+            if value is None:
+                misses.append(path)
+            else:
+                hits[path] = value
+        return hits, misses, keys
+
+    @property
+    def total_bytes(self):
+        return self._total
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        for key, _ in sorted(self._entries.items(), key=lambda kv: kv[1][1]):
+            self._drop(key)
+            if self._total <= self.max_bytes:
+                break
+
+    def clear(self):
+        """Hapus semua blob (termasuk yang tidak tercatat di index) dan kosongkan index"""
+        with self._index_lock():
+            for sub in os.listdir(self.directory):
+                sub_dir = os.path.join(self.directory, sub)
+                if not os.path.isdir(sub_dir):
+                    continue
+                for name in os.listdir(sub_dir):
+                    if name.endswith(('.pkl', '.tmp')):
+                        try:
+                            os.remove(os.path.join(sub_dir, name))
+                        except OSError:
+                            pass
+            self._entries, self._total = {}, 0
+            self._touched.clear()
+            self._removed.clear()
+            self._new_digests.clear()
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'entries': {}, 'digests': self._digests}, f)
+            os.replace(tmp, self._index_path)
+
+
+_default = None
+
+
+def default_cache():
+    """Cache bersama untuk run browser, feature extractor, plotter, dll."""
+    global _default
+    if _default is None:
+        _default = ArtifactCache()
+    return _default
@@ -0,0 +1,220 @@
+import json
+import os
+
+# ===============================
+# KONFIGURASI BERSAMA GUI + BACKEND (config.json)
+# ===============================
+# Satu file config.json dibaca GUI (config.py) dan backend Rust (config.rs).
+# Urutan prioritas: default di SCHEMA < config.json < config.local.json <
+# environment variable ENOSE_<SECTION>_<KEY> (mis. ENOSE_INFLUX_TOKEN,
+# ENOSE_GUI_DATA_PORT). Secret (influx.token, edge_impulse.api_key) tidak
+# disimpan di config.json yang di-commit: isi lewat env atau config.local.json
+# (di .gitignore). Lokasi file bisa diganti lewat ENOSE_CONFIG. Nilai divalidasi saat load;
+# section `performance` bisa diubah saat program berjalan (hot reload),
+# section lain baru berlaku setelah restart.
+
+CONFIG_ENV = 'ENOSE_CONFIG'
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
+HOT_SECTION = 'performance'
+
+
+def _port(v):
+    return 1 <= v <= 65535
+
+
+def _url(v):
+    return v.startswith(('http://', 'https://'))
+
+
+MAX_SAMPLE_RATE = 200   # Hz, batas command SET_RATE
+PHASES = ('precondition', 'ramp', 'hold', 'purge', 'recovery')   # index = kode state
+
+
+def _phase_rates(v):
+    """'ramp=50,hold=50,purge=2' (aturan sama dengan phase_rates di config.rs)"""
+    for item in filter(None, (p.strip() for p in v.split(','))):
+        name, _, hz = item.partition('=')
+        hz = hz.strip()
+        if name.strip() not in PHASES or not hz.isdigit() or not 1 <= int(hz) <= MAX_SAMPLE_RATE:
+            return False
+    return True
+
+
+# section -> key -> (tipe, default, validator atau None)
+SCHEMA = {
+    'backend': {
+        'arduino_addr': (str, '0.0.0.0:8081', lambda v: ':' in v),
+        'command_addr': (str, '0.0.0.0:8082', lambda v: ':' in v),
+        'serial_port': (str, 'COM12', lambda v: bool(v)),
+        'baud_rate': (int, 9600, lambda v: v > 0),
+        'serial_mode': (str, 'command', lambda v: v in ('command', 'ingest')),   # ingest = baca sampel dari serial
+        'wal_dir': (str, 'wal', lambda v: bool(v)),
+        'metrics_addr': (str, '127.0.0.1:9100', lambda v: v == '' or ':' in v),   # '' = nonaktif
+        'hub_addr': (str, '127.0.0.1:8090', lambda v: v == '' or ':' in v),       # pub/sub, '' = nonaktif
+        'web_addr': (str, '127.0.0.1:8091', lambda v: v == '' or ':' in v),       # WebSocket + history HTTP
+    },
+    'gui': {
+        'host': (str, '127.0.0.1', lambda v: bool(v)),
+        'data_port': (int, 8085, _port),
+        'command_port': (int, 8082, _port),
+        'status_port': (int, 8087, _port),
+        'metrics_port': (int, 9101, lambda v: v == 0 or _port(v)),   # 0 = nonaktif
+        'stream_url': (str, '', lambda v: v == '' or v.startswith('ws://')),   # '' = terima di data_port
+    },
+    'influx': {
+        'url': (str, 'http://localhost:8086', _url),
+        'token': (str, '', None),
+        'org': (str, 'ITS', lambda v: bool(v)),
+        'bucket': (str, 'Cuz', lambda v: bool(v)),
+    },
+    'edge_impulse': {
+        'api_key': (str, '', None),
+        'project_id': (str, '', None),
+    },
+    'performance': {
+        'influx_batch_size': (int, 5000, lambda v: 1 <= v <= 100000),
+        'influx_flush_ms': (int, 200, lambda v: 10 <= v <= 60000),
+        'render_fps': (int, 10, lambda v: 1 <= v <= 120),
+        'history_retention': (int, 0, lambda v: v >= 0),   # record di RAM backend, 0 = tanpa batas
+        'phase_rates': (str, '', _phase_rates),   # SET_RATE per fase, '' = rate tetap firmware
+        'stats_window_s': (int, 60, lambda v: 1 <= v <= 3600),   # window statistik Sensor Readings (detik)
+        'stats_ewma_s': (int, 2, lambda v: 1 <= v <= 600),       # konstanta waktu EWMA (detik)
+    },
+}
+
+
+class ConfigError(ValueError):
+    pass
+
+
+class Section:
+    def __init__(self, name, values):
+        self._name = name
+        self.__dict__.update(values)
+
+    def as_dict(self):
+        return {k: v for k, v in self.__dict__.items() if not k.startswith('_')}
+
+    def __repr__(self):
+        return f"Section({self._name!r}, {self.as_dict()})"
+
+
+def _convert(section, key, value, source):
+    kind, _, check = SCHEMA[section][key]
+    try:
+        if kind is int and isinstance(value, str):
+            value = int(value.strip())
+        elif kind is int and (isinstance(value, bool) or not isinstance(value, int)):
+            raise ValueError
+        elif kind is str:
+            value = str(value)
+    except ValueError:
+        raise ConfigError(f"{source}: {section}.{key} harus {kind.__name__}, dapat {value!r}")
+    if check is not None and not check(value):
+        raise ConfigError(f"{source}: {section}.{key} tidak valid: {value!r}")
+    return value
+
+
+def local_path(path):
+    """config.json -> config.local.json di folder yang sama (secret, tidak di-commit)"""
+    return os.path.splitext(path)[0] + '.local.json'
+
+
+def _read_json(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except ValueError as e:
+        raise ConfigError(f"{path}: JSON tidak valid: {e}")
+
+
+def load_values(path=None, environ=None):
+    """Gabungkan default + file + file lokal + env; hasil {section: {key: value}} yang sudah divalidasi"""
+    environ = os.environ if environ is None else environ
+    path = path or environ.get(CONFIG_ENV) or DEFAULT_PATH
+    doc = _read_json(path)
+    for section, keys in _read_json(local_path(path)).items():
+        if isinstance(keys, dict) and isinstance(doc.get(section), dict):
+            doc[section] = {**doc[section], **keys}
+        else:
+            doc[section] = keys
+
+    values = {}
+    for section, keys in SCHEMA.items():
+        given = doc.get(section, {})
+        unknown = set(given) - set(keys)
+        if unknown:
+            raise ConfigError(f"{path}: key tidak dikenal di {section}: {', '.join(sorted(unknown))}")
+        values[section] = {}
+        for key, (_, default, _) in keys.items():
+            value = _convert(section, key, given.get(key, default), path)
+            env_name = f"ENOSE_{section}_{key}".upper()
+            if env_name in environ:
+                value = _convert(section, key, environ[env_name], env_name)
+            values[section][key] = value
+    unknown = set(doc) - set(SCHEMA)
+    if unknown:
+        raise ConfigError(f"{path}: section tidak dikenal: {', '.join(sorted(unknown))}")
+    return path, values
+
+
+class Config:
+    def __init__(self, path, values):
+        self.path = path
+        self._mtime = self._stat()
+        self._set(values)
+
+    @classmethod
+    def load(cls, path=None):
+        return cls(*load_values(path))
+
+    def _set(self, values):
+        self._values = values
+        for section, keys in values.items():
+            setattr(self, section, Section(section, keys))
+
+    def _stat(self):
+        stamps = []
+        for p in (self.path, local_path(self.path)):
+            try:
+                stamps.append(os.stat(p).st_mtime_ns)
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def reload_if_changed(self):
+        """Cek mtime file; kalau berubah, terapkan section performance.
+
+        Hasil: dict key performance yang berubah {key: nilai baru}. Config yang
+        tidak valid diabaikan (nilai lama tetap dipakai) dan errornya dicetak.
+        """
+        mtime = self._stat()
+        if mtime == self._mtime:
+            return {}
+        self._mtime = mtime
+        try:
+            _, values = load_values(self.path)
+        except ConfigError as e:
+            print(f"Config reload ignored: {e}")
+            return {}
+        for section in values:
+            if section != HOT_SECTION and values[section] != self._values[section]:
+                print(f"Config: perubahan [{section}] baru berlaku setelah restart")
+                values[section] = self._values[section]
+        changed = {k: v for k, v in values[HOT_SECTION].items()
+                   if v != self._values[HOT_SECTION][k]}
+        self._set(values)
+        return changed
+
+
+_config = None
+
+
+def get_config():
+    """Config proses ini (dimuat sekali; ConfigError kalau tidak valid)"""
+    global _config
+    if _config is None:
+        _config = Config.load()
+    return _config
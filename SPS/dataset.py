@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from cache import default_cache
+from features import level_segments
+from runs import SENSOR_NAMES, list_runs, load_run
+
+# ===============================
+# DATASET CATALOG + FORMAT MEMORY-MAPPED
+# ===============================
+# Setiap rekaman dikonversi sekali ke file .npy kolumnar (C, N) di
+# <dataset>/.enose/columns/, dengan kolom COLUMNS. Catalog (catalog.json)
+# menyimpan metadata ringkas per run: label, nama, timestamp, durasi,
+# level yang ada dan batas baris tiap level. Query hanya membaca catalog;
+# data dimuat lazy lewat np.load(mmap_mode='r') dan hanya kolom/segmen
+# yang diminta yang benar-benar dibaca dari disk.
+
+COLUMNS = ['time'] + SENSOR_NAMES + ['state', 'level']
+CATALOG_DIR = '.enose'
+CATALOG_NAME = 'catalog.json'
+CATALOG_VERSION = 1
+
+
+class CatalogEntry:
+    def __init__(self, file, digest, name, sample_type, timestamp, n_samples, duration,
+                 levels, segments, size, mtime_ns):
+        self.file = file                    # nama file relatif terhadap folder dataset
+        self.digest = digest
+        self.name = name
+        self.sample_type = sample_type
+        self.timestamp = timestamp          # datetime atau None
+        self.n_samples = n_samples
+        self.duration = duration
+        self.levels = levels                # level yang ada (sorted, unik)
+        self.segments = segments            # list of (level, start_row, stop_row)
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def to_dict(self):
+        d = dict(self.__dict__)
+        d['timestamp'] = self.timestamp.isoformat() if self.timestamp else None
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        d = dict(d)
+        d['timestamp'] = datetime.fromisoformat(d['timestamp']) if d.get('timestamp') else None
+        d['segments'] = [tuple(s) for s in d['segments']]
+        return cls(**d)
+
+    def __repr__(self):
+        return f"CatalogEntry({self.file!r}, {self.sample_type!r}, {self.n_samples} samples)"
+
+
+def _convert(job):
+    """Worker: parse satu rekaman teks dan tulis kolom .npy-nya"""
+    path, columns_path, digest, size, mtime_ns, file = job
+    run = load_run(path)
+    table = np.vstack([run.time[None, :], run.values.T,
+                       run.state[None, :].astype(float), run.level[None, :].astype(float)])
+    tmp = columns_path + '.tmp.npy'
+    np.save(tmp, np.ascontiguousarray(table))
+    os.replace(tmp, columns_path)
+    segments = level_segments(run.level)
+    return CatalogEntry(file, digest, run.name, run.sample_type, run.timestamp, len(run),
+                        run.duration, sorted({int(lv) for lv, _, _ in segments}),
+                        segments, size, mtime_ns)
+
+
+class Catalog:
+    def __init__(self, directory, entries):
+        self.directory = directory
+        self.entries = entries
+        self._columns_dir = os.path.join(directory, CATALOG_DIR, 'columns')
+
+    @classmethod
+    def open(cls, directory, workers=None, refresh=True):
+        """Buka catalog dataset; rekaman baru/berubah dikonversi (paralel)"""
+        meta_dir = os.path.join(directory, CATALOG_DIR)
+        catalog_path = os.path.join(meta_dir, CATALOG_NAME)
+        old = {}
+        if os.path.exists(catalog_path):
+            with open(catalog_path, 'r') as f:
+                doc = json.load(f)
+            if doc.get('version') == CATALOG_VERSION:
+                old = {e['file']: CatalogEntry.from_dict(e) for e in doc['entries']}
+        if not refresh and old:
+            return cls(directory, list(old.values()))
+
+        columns_dir = os.path.join(meta_dir, 'columns')
+        os.makedirs(columns_dir, exist_ok=True)
+        cache = default_cache()
+        entries, jobs = {}, []
+        for path in list_runs(directory):
+            file = os.path.relpath(path, directory)
+            st = os.stat(path)
+            prev = old.get(file)
+            if prev and prev.size == st.st_size and prev.mtime_ns == st.st_mtime_ns \
+                    and os.path.exists(os.path.join(columns_dir, prev.digest + '.npy')):
+                entries[file] = prev
+                continue
+            digest = cache.digest(path)
+            jobs.append((path, os.path.join(columns_dir, digest + '.npy'), digest,
+                         st.st_size, st.st_mtime_ns, file))
+        cache.flush()
+
+        if jobs:
+            if len(jobs) <= 2 or workers == 1:
+                results = [_try_convert(job) for job in jobs]
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(_try_convert, jobs))
+            for entry in results:
+                if entry is not None:
+                    entries[entry.file] = entry
+
+        catalog = cls(directory, sorted(entries.values(), key=lambda e: e.file))
+        catalog.save()
+        catalog._prune_columns()
+        return catalog
+
+    def save(self):
+        path = os.path.join(self.directory, CATALOG_DIR, CATALOG_NAME)
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'version': CATALOG_VERSION, 'columns': COLUMNS,
+                       'entries': [e.to_dict() for e in self.entries]}, f)
+        os.replace(tmp, path)
+
+    def _prune_columns(self):
+        """Hapus file kolom yang tidak lagi dirujuk catalog"""
+        used = {e.digest + '.npy' for e in self.entries}
+        for name in os.listdir(self._columns_dir):
+            if name.endswith('.npy') and name not in used:
+                try:
+                    os.remove(os.path.join(self._columns_dir, name))
+                except OSError:
+                    pass
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    @property
+    def labels(self):
+        return sorted({e.sample_type for e in self.entries})
+
+    def query(self, label=None, start=None, end=None, level=None, name=None):
+        """Filter catalog: label (str/list), rentang tanggal [start, end], level (int/list)"""
+        labels = {label} if isinstance(label, str) else set(label) if label else None
+        levels = {level} if isinstance(level, int) else set(level) if level is not None else None
+        result = []
+        for e in self.entries:
+            if labels and e.sample_type not in labels:
+                continue
+            if name and name.lower() not in e.name.lower():
+                continue
+            if start and (e.timestamp is None or e.timestamp < start):
+                continue
+            if end and (e.timestamp is None or e.timestamp > end):
+                continue
+            if levels and not levels.intersection(e.levels):
+                continue
+            result.append(e)
+        return result
+
+    def columns(self, entry):
+        """Array (len(COLUMNS), N) memory-mapped, read-only"""
+        return np.load(os.path.join(self._columns_dir, entry.digest + '.npy'), mmap_mode='r')
+
+    def load(self, entry, channels=None, level=None, states=None):
+        """Muat (time, values) untuk channel & segmen yang diminta.
+
+        channels: list nama sensor (default semua); level: hanya segmen level itu;
+        states: hanya baris dengan state di list ini.
+        """
+        cols = self.columns(entry)
+        idx = [COLUMNS.index(c) for c in (channels or SENSOR_NAMES)]
+        if level is None:
+            spans = [(0, entry.n_samples)]
+        else:
+            spans = [(a, b) for lv, a, b in entry.segments if lv == level]
+        if not spans:
+            return np.empty(0), np.empty((0, len(idx)))
+
+        times, values = [], []
+        for a, b in spans:
+            t = np.asarray(cols[0, a:b])
+            v = np.asarray(cols[idx, a:b]).T
+            if states is not None:
+                keep = np.isin(cols[COLUMNS.index('state'), a:b], states)
+                t, v = t[keep], v[keep]
+            times.append(t)
+            values.append(v)
+        return np.concatenate(times), np.concatenate(values)
+
+
+def _try_convert(job):
+    try:
+        return _convert(job)
+    except (OSError, ValueError) as e:
+        print(f"Skipping {job[0]}: {e}")
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bangun/query catalog dataset rekaman e-nose")
+    parser.add_argument('directory')
+    parser.add_argument('--label', action='append', help="filter jenis sampel (bisa diulang)")
+    parser.add_argument('--since', type=datetime.fromisoformat, default=None)
+    parser.add_argument('--until', type=datetime.fromisoformat, default=None)
+    parser.add_argument('--level', type=int, default=None)
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    catalog = Catalog.open(args.directory, workers=args.workers)
+    entries = catalog.query(label=args.label, start=args.since, end=args.until, level=args.level)
+    for e in entries:
+        stamp = e.timestamp.isoformat(sep=' ') if e.timestamp else '-'
+        print(f"{e.file:45s} {e.sample_type:15s} {stamp:26s} {e.duration:8.1f}s levels={e.levels}")
+    print(f"{len(entries)}/{len(catalog)} runs")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
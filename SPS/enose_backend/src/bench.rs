@@ -0,0 +1,233 @@
+// ===============================
+//  BENCHMARK KONTENSI HISTORY (enose_backend bench-history)
+// ===============================
+// Bandingkan history lama (Mutex<Vec> yang di-clone utuh saat force-save)
+// dengan log chunk di history.rs. Thread writer meniru koneksi ingest yang
+// masing-masing menambah record satu per satu; thread reader terus membaca
+// seluruh history (force-save, backfill GUI, API history). Yang diukur:
+// throughput tulis dan latency append (p50 / p99 / max) selama reader aktif.
+//
+//   enose_backend bench-history [-w 32] [-r 2] [-n 400000] [--prefill 200000] [--retention 0]
+
+use std::sync::atomic::{AtomicBool, AtomicUsize, Ordering};
+use std::sync::{Arc, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
+
+use crate::history::History;
+use crate::SensorRecord;
+
+trait Store: Send + Sync {
+    fn push(&self, rec: &SensorRecord);
+    /// Baca seluruh history, hasil = jumlah record yang dibaca.
+    fn scan(&self) -> usize;
+}
+
+/// History sebelum history.rs: satu Mutex untuk ingest dan semua reader.
+struct MutexVec {
+    records: Mutex<Vec<SensorRecord>>,
+    retention: usize,
+}
+
+impl Store for MutexVec {
+    fn push(&self, rec: &SensorRecord) {
+        let mut h = self.records.lock().unwrap();
+        h.push(rec.clone());
+        if self.retention > 0 && h.len() >= self.retention + (self.retention / 10).max(1) {
+            let excess = h.len() - self.retention;
+            h.drain(..excess);
+        }
+    }
+
+    fn scan(&self) -> usize {
+        let data = self.records.lock().unwrap().clone();
+        data.iter().filter(|r| r.level >= 0).count()
+    }
+}
+
+struct Chunked {
+    history: History,
+    retention: usize,
+}
+
+impl Store for Chunked {
+    fn push(&self, rec: &SensorRecord) {
+        self.history
+            .extend(std::slice::from_ref(rec), self.retention);
+    }
+
+    fn scan(&self) -> usize {
+        self.history
+            .snapshot()
+            .iter()
+            .filter(|r| r.level >= 0)
+            .count()
+    }
+}
+
+struct Options {
+    writers: usize,
+    readers: usize,
+    records: usize,
+    prefill: usize,
+    retention: usize,
+}
+
+struct Report {
+    elapsed: Duration,
+    latencies: Vec<u32>, // ns per push, terurut
+    scans: usize,
+}
+
+fn record(i: usize) -> SensorRecord {
+    let v = i as f64 * 0.001;
+    SensorRecord {
+        no2_gm: v,
+        ethanol_gm: v,
+        voc_gm: v,
+        co_gm: v,
+        co_mics: v,
+        ethanol_mics: v,
+        voc_mics: v,
+        state: 1,
+        level: 1,
+        timestamp: i as i128,
+        seq: i as u32,
+        device_id: 0,
+    }
+}
+
+fn run(store: Arc<dyn Store>, opt: &Options) -> Report {
+    for i in 0..opt.prefill {
+        store.push(&record(i));
+    }
+    let done = Arc::new(AtomicBool::new(false));
+    let scans = Arc::new(AtomicUsize::new(0));
+    let readers: Vec<_> = (0..opt.readers)
+        .map(|_| {
+            let (store, done, scans) = (store.clone(), done.clone(), scans.clone());
+            thread::spawn(move || {
+                while !done.load(Ordering::Relaxed) {
+                    store.scan();
+                    scans.fetch_add(1, Ordering::Relaxed);
+                }
+            })
+        })
+        .collect();
+
+    let started = Instant::now();
+    let per_writer = opt.records / opt.writers;
+    let writers: Vec<_> = (0..opt.writers)
+        .map(|w| {
+            let store = store.clone();
+            let base = opt.prefill + w * per_writer;
+            thread::spawn(move || {
+                let mut latencies = Vec::with_capacity(per_writer);
+                for i in base..base + per_writer {
+                    let rec = record(i);
+                    let t = Instant::now();
+                    store.push(&rec);
+                    latencies.push(t.elapsed().as_nanos().min(u32::MAX as u128) as u32);
+                }
+                latencies
+            })
+        })
+        .collect();
+    let mut latencies: Vec<u32> = writers
+        .into_iter()
+        .flat_map(|w| w.join().unwrap())
+        .collect();
+    let elapsed = started.elapsed();
+    done.store(true, Ordering::Relaxed);
+    for r in readers {
+        let _ = r.join();
+    }
+    latencies.sort_unstable();
+    Report {
+        elapsed,
+        latencies,
+        scans: scans.load(Ordering::Relaxed),
+    }
+}
+
+fn percentile(sorted: &[u32], p: f64) -> f64 {
+    if sorted.is_empty() {
+        return 0.0;
+    }
+    let idx = ((sorted.len() - 1) as f64 * p).round() as usize;
+    sorted[idx] as f64
+}
+
+fn parse_args(args: &[String]) -> Result<Options, String> {
+    let mut opt = Options {
+        writers: 32,
+        readers: 2,
+        records: 400_000,
+        prefill: 200_000,
+        retention: 0,
+    };
+    let mut it = args.iter();
+    while let Some(flag) = it.next() {
+        let value = it.next().ok_or_else(|| format!("{} needs a value", flag))?;
+        let n: usize = value
+            .parse()
+            .map_err(|_| format!("invalid {}: {:?}", flag, value))?;
+        match flag.as_str() {
+            "-w" | "--writers" => opt.writers = n.max(1),
+            "-r" | "--readers" => opt.readers = n,
+            "-n" | "--records" => opt.records = n,
+            "--prefill" => opt.prefill = n,
+            "--retention" => opt.retention = n,
+            _ => return Err(format!("unknown option {:?}", flag)),
+        }
+    }
+    Ok(opt)
+}
+
+pub fn history(args: &[String]) {
+    let opt = match parse_args(args) {
+        Ok(o) => o,
+        Err(e) => {
+            eprintln!("bench-history: {}", e);
+            std::process::exit(2);
+        }
+    };
+    println!(
+        "{} writer, {} reader, {} record (+{} prefill), retention {}",
+        opt.writers, opt.readers, opt.records, opt.prefill, opt.retention
+    );
+    println!(
+        "{:<14} {:>9} {:>11} {:>9} {:>9} {:>9} {:>7}",
+        "history", "detik", "record/s", "p50 us", "p99 us", "max ms", "scan"
+    );
+    let stores: [(&str, Arc<dyn Store>); 2] = [
+        (
+            "mutex (lama)",
+            Arc::new(MutexVec {
+                records: Mutex::new(Vec::new()),
+                retention: opt.retention,
+            }),
+        ),
+        (
+            "chunk",
+            Arc::new(Chunked {
+                history: History::new(),
+                retention: opt.retention,
+            }),
+        ),
+    ];
+    for (name, store) in stores {
+        let r = run(store, &opt);
+        let secs = r.elapsed.as_secs_f64();
+        println!(
+            "{:<14} {:>9.3} {:>11.0} {:>9.2} {:>9.2} {:>9.2} {:>7}",
+            name,
+            secs,
+            r.latencies.len() as f64 / secs,
+            percentile(&r.latencies, 0.50) / 1e3,
+            percentile(&r.latencies, 0.99) / 1e3,
+            percentile(&r.latencies, 1.0) / 1e6,
+            r.scans
+        );
+    }
+}
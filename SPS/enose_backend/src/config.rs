@@ -0,0 +1,413 @@
+// ===============================
+//  KONFIGURASI (config.json, dipakai bersama GUI)
+// ===============================
+// Urutan prioritas: default di bawah < config.json < config.local.json < env
+// ENOSE_<SECTION>_<KEY> (mis. ENOSE_BACKEND_SERIAL_PORT, ENOSE_INFLUX_TOKEN).
+// Secret (influx.token, edge_impulse.api_key) tidak disimpan di config.json
+// yang di-commit: isi lewat env atau config.local.json (di .gitignore).
+// Lokasi file bisa diganti lewat ENOSE_CONFIG. Section `performance`
+// di-reload otomatis saat file berubah; section lain baru berlaku setelah restart.
+
+use std::fs;
+use std::path::{Path, PathBuf};
+use std::sync::OnceLock;
+use std::thread;
+use std::time::{Duration, SystemTime};
+
+use parking_lot::{RwLock, RwLockReadGuard};
+use serde::Deserialize;
+
+const RELOAD_POLL_SECS: u64 = 2;
+
+pub const MAX_SAMPLE_RATE: u32 = 200; // Hz, batas command SET_RATE
+
+// Nama fase untuk performance.phase_rates, index = kode state dari Arduino
+pub const PHASES: [&str; 5] = ["precondition", "ramp", "hold", "purge", "recovery"];
+
+#[derive(Clone, Debug, Deserialize, PartialEq)]
+#[serde(default, deny_unknown_fields)]
+pub struct BackendConfig {
+    pub arduino_addr: String,
+    pub command_addr: String,
+    pub serial_port: String,
+    pub baud_rate: u32,
+    pub serial_mode: String, // "command" = hanya kirim command, "ingest" = juga baca sampel
+    pub wal_dir: String,
+    pub metrics_addr: String, // "" = endpoint /metrics nonaktif
+    pub hub_addr: String,     // pub/sub consumer tambahan, "" = nonaktif
+    pub web_addr: String,     // WebSocket stream + HTTP history, "" = nonaktif
+}
+
+#[derive(Clone, Debug, Deserialize, PartialEq)]
+#[serde(default, deny_unknown_fields)]
+pub struct GuiConfig {
+    pub host: String,
+    pub data_port: u16,
+    pub command_port: u16,
+    pub status_port: u16,
+    pub metrics_port: u16,  // endpoint /metrics GUI, 0 = nonaktif
+    pub stream_url: String, // "" = terima data di data_port, ws://... = dari backend.web_addr
+}
+
+#[derive(Clone, Debug, Deserialize, PartialEq)]
+#[serde(default, deny_unknown_fields)]
+pub struct InfluxConfig {
+    pub url: String,
+    pub token: String,
+    pub org: String,
+    pub bucket: String,
+}
+
+#[derive(Clone, Debug, Default, Deserialize, PartialEq)]
+#[serde(default, deny_unknown_fields)]
+pub struct EdgeImpulseConfig {
+    pub api_key: String,
+    pub project_id: String,
+}
+
+#[derive(Clone, Debug, Deserialize, PartialEq)]
+#[serde(default, deny_unknown_fields)]
+pub struct PerformanceConfig {
+    pub influx_batch_size: usize,
+    pub influx_flush_ms: u64,
+    pub render_fps: u32,
+    pub history_retention: usize, // record di RAM, 0 = tanpa batas
+    pub phase_rates: String,      // rate sampling per fase, "" = rate tetap firmware
+    pub stats_window_s: u32,      // (GUI) window statistik panel Sensor Readings, detik
+    pub stats_ewma_s: u32,        // (GUI) konstanta waktu EWMA, detik
+}
+
+#[derive(Clone, Debug, Default, Deserialize, PartialEq)]
+#[serde(default, deny_unknown_fields)]
+pub struct Config {
+    pub backend: BackendConfig,
+    pub gui: GuiConfig,
+    pub influx: InfluxConfig,
+    pub edge_impulse: EdgeImpulseConfig,
+    pub performance: PerformanceConfig,
+}
+
+impl Default for BackendConfig {
+    fn default() -> Self {
+        BackendConfig {
+            arduino_addr: "0.0.0.0:8081".into(),
+            command_addr: "0.0.0.0:8082".into(),
+            serial_port: "COM12".into(),
+            baud_rate: 9600,
+            serial_mode: "command".into(),
+            wal_dir: "wal".into(),
+            metrics_addr: "127.0.0.1:9100".into(),
+            hub_addr: "127.0.0.1:8090".into(),
+            web_addr: "127.0.0.1:8091".into(),
+        }
+    }
+}
+
+impl Default for GuiConfig {
+    fn default() -> Self {
+        GuiConfig {
+            host: "127.0.0.1".into(),
+            data_port: 8085,
+            command_port: 8082,
+            status_port: 8087,
+            metrics_port: 9101,
+            stream_url: String::new(),
+        }
+    }
+}
+
+impl Default for InfluxConfig {
+    fn default() -> Self {
+        InfluxConfig {
+            url: "http://localhost:8086".into(),
+            token: String::new(),
+            org: "ITS".into(),
+            bucket: "Cuz".into(),
+        }
+    }
+}
+
+impl Default for PerformanceConfig {
+    fn default() -> Self {
+        PerformanceConfig {
+            influx_batch_size: 5000,
+            influx_flush_ms: 200,
+            render_fps: 10,
+            history_retention: 0,
+            phase_rates: String::new(),
+            stats_window_s: 60,
+            stats_ewma_s: 2,
+        }
+    }
+}
+
+macro_rules! env_override {
+    ($field:expr, $name:expr) => {
+        if let Ok(v) = std::env::var($name) {
+            $field = v
+                .trim()
+                .parse()
+                .map_err(|_| format!("{}: invalid value {:?}", $name, v))?;
+        }
+    };
+}
+
+impl Config {
+    pub fn gui_data_addr(&self) -> String {
+        format!("{}:{}", self.gui.host, self.gui.data_port)
+    }
+
+    pub fn gui_status_addr(&self) -> String {
+        format!("{}:{}", self.gui.host, self.gui.status_port)
+    }
+
+    pub fn influx_write_url(&self) -> String {
+        format!(
+            "{}/api/v2/write?org={}&bucket={}&precision=ns",
+            self.influx.url.trim_end_matches('/'),
+            self.influx.org,
+            self.influx.bucket
+        )
+    }
+
+    /// Baca file + file lokal (kalau ada), terapkan env override, lalu validasi.
+    pub fn load(path: &Path) -> Result<Config, String> {
+        let mut doc = read_json(path)?;
+        let local = local_path(path);
+        merge_json(&mut doc, read_json(&local)?);
+        let mut cfg: Config = serde_json::from_value(doc)
+            .map_err(|e| format!("{} / {}: {}", path.display(), local.display(), e))?;
+        cfg.apply_env()?;
+        cfg.validate()?;
+        Ok(cfg)
+    }
+
+    fn apply_env(&mut self) -> Result<(), String> {
+        env_override!(self.backend.arduino_addr, "ENOSE_BACKEND_ARDUINO_ADDR");
+        env_override!(self.backend.command_addr, "ENOSE_BACKEND_COMMAND_ADDR");
+        env_override!(self.backend.serial_port, "ENOSE_BACKEND_SERIAL_PORT");
+        env_override!(self.backend.baud_rate, "ENOSE_BACKEND_BAUD_RATE");
+        env_override!(self.backend.serial_mode, "ENOSE_BACKEND_SERIAL_MODE");
+        env_override!(self.backend.wal_dir, "ENOSE_BACKEND_WAL_DIR");
+        env_override!(self.backend.metrics_addr, "ENOSE_BACKEND_METRICS_ADDR");
+        env_override!(self.backend.hub_addr, "ENOSE_BACKEND_HUB_ADDR");
+        env_override!(self.backend.web_addr, "ENOSE_BACKEND_WEB_ADDR");
+        env_override!(self.gui.host, "ENOSE_GUI_HOST");
+        env_override!(self.gui.data_port, "ENOSE_GUI_DATA_PORT");
+        env_override!(self.gui.command_port, "ENOSE_GUI_COMMAND_PORT");
+        env_override!(self.gui.status_port, "ENOSE_GUI_STATUS_PORT");
+        env_override!(self.gui.metrics_port, "ENOSE_GUI_METRICS_PORT");
+        env_override!(self.gui.stream_url, "ENOSE_GUI_STREAM_URL");
+        env_override!(self.influx.url, "ENOSE_INFLUX_URL");
+        env_override!(self.influx.token, "ENOSE_INFLUX_TOKEN");
+        env_override!(self.influx.org, "ENOSE_INFLUX_ORG");
+        env_override!(self.influx.bucket, "ENOSE_INFLUX_BUCKET");
+        env_override!(self.edge_impulse.api_key, "ENOSE_EDGE_IMPULSE_API_KEY");
+        env_override!(
+            self.edge_impulse.project_id,
+            "ENOSE_EDGE_IMPULSE_PROJECT_ID"
+        );
+        env_override!(
+            self.performance.influx_batch_size,
+            "ENOSE_PERFORMANCE_INFLUX_BATCH_SIZE"
+        );
+        env_override!(
+            self.performance.influx_flush_ms,
+            "ENOSE_PERFORMANCE_INFLUX_FLUSH_MS"
+        );
+        env_override!(self.performance.render_fps, "ENOSE_PERFORMANCE_RENDER_FPS");
+        env_override!(
+            self.performance.history_retention,
+            "ENOSE_PERFORMANCE_HISTORY_RETENTION"
+        );
+        env_override!(
+            self.performance.phase_rates,
+            "ENOSE_PERFORMANCE_PHASE_RATES"
+        );
+        env_override!(
+            self.performance.stats_window_s,
+            "ENOSE_PERFORMANCE_STATS_WINDOW_S"
+        );
+        env_override!(
+            self.performance.stats_ewma_s,
+            "ENOSE_PERFORMANCE_STATS_EWMA_S"
+        );
+        Ok(())
+    }
+
+    /// Aturan yang sama dengan SCHEMA di config.py.
+    fn validate(&self) -> Result<(), String> {
+        let checks = [
+            (
+                self.backend.arduino_addr.contains(':'),
+                "backend.arduino_addr",
+            ),
+            (
+                self.backend.command_addr.contains(':'),
+                "backend.command_addr",
+            ),
+            (!self.backend.serial_port.is_empty(), "backend.serial_port"),
+            (self.backend.baud_rate > 0, "backend.baud_rate"),
+            (
+                matches!(self.backend.serial_mode.as_str(), "command" | "ingest"),
+                "backend.serial_mode",
+            ),
+            (!self.backend.wal_dir.is_empty(), "backend.wal_dir"),
+            (
+                self.backend.metrics_addr.is_empty() || self.backend.metrics_addr.contains(':'),
+                "backend.metrics_addr",
+            ),
+            (
+                self.backend.hub_addr.is_empty() || self.backend.hub_addr.contains(':'),
+                "backend.hub_addr",
+            ),
+            (
+                self.backend.web_addr.is_empty() || self.backend.web_addr.contains(':'),
+                "backend.web_addr",
+            ),
+            (!self.gui.host.is_empty(), "gui.host"),
+            (self.gui.data_port > 0, "gui.data_port"),
+            (self.gui.command_port > 0, "gui.command_port"),
+            (self.gui.status_port > 0, "gui.status_port"),
+            (
+                self.gui.stream_url.is_empty() || self.gui.stream_url.starts_with("ws://"),
+                "gui.stream_url",
+            ),
+            (
+                self.influx.url.starts_with("http://") || self.influx.url.starts_with("https://"),
+                "influx.url",
+            ),
+            (!self.influx.org.is_empty(), "influx.org"),
+            (!self.influx.bucket.is_empty(), "influx.bucket"),
+            (
+                (1..=100_000).contains(&self.performance.influx_batch_size),
+                "performance.influx_batch_size",
+            ),
+            (
+                (10..=60_000).contains(&self.performance.influx_flush_ms),
+                "performance.influx_flush_ms",
+            ),
+            (
+                (1..=120).contains(&self.performance.render_fps),
+                "performance.render_fps",
+            ),
+            (
+                phase_rates(&self.performance.phase_rates).is_some(),
+                "performance.phase_rates",
+            ),
+            (
+                (1..=3600).contains(&self.performance.stats_window_s),
+                "performance.stats_window_s",
+            ),
+            (
+                (1..=600).contains(&self.performance.stats_ewma_s),
+                "performance.stats_ewma_s",
+            ),
+        ];
+        match checks.iter().find(|(ok, _)| !ok) {
+            Some((_, name)) => Err(format!("invalid value for {}", name)),
+            None => Ok(()),
+        }
+    }
+}
+
+static CONFIG: OnceLock<RwLock<Config>> = OnceLock::new();
+
+fn read_json(path: &Path) -> Result<serde_json::Value, String> {
+    match fs::read_to_string(path) {
+        Ok(text) => serde_json::from_str(&text).map_err(|e| format!("{}: {}", path.display(), e)),
+        Err(_) => Ok(serde_json::Value::Object(Default::default())),
+    }
+}
+
+/// Timpa key di `base` dengan isi `over`, per section (sama dengan config.py).
+fn merge_json(base: &mut serde_json::Value, over: serde_json::Value) {
+    match (base, over) {
+        (serde_json::Value::Object(b), serde_json::Value::Object(o)) => {
+            for (k, v) in o {
+                merge_json(b.entry(k).or_insert(serde_json::Value::Null), v);
+            }
+        }
+        (b, o) => *b = o,
+    }
+}
+
+/// config.json -> config.local.json di folder yang sama (secret, tidak di-commit).
+pub fn local_path(path: &Path) -> PathBuf {
+    let stem = path
+        .file_stem()
+        .and_then(|s| s.to_str())
+        .unwrap_or("config");
+    path.with_file_name(format!("{}.local.json", stem))
+}
+
+/// performance.phase_rates ("ramp=50,hold=50,purge=2") -> rate Hz per kode
+/// state; 0 = fase itu tidak mengubah rate. Sama dengan _phase_rates di config.py.
+pub fn phase_rates(spec: &str) -> Option<[u32; 5]> {
+    let mut rates = [0; 5];
+    for item in spec.split(',').map(str::trim).filter(|s| !s.is_empty()) {
+        let (name, hz) = item.split_once('=')?;
+        let state = PHASES.iter().position(|p| *p == name.trim())?;
+        let hz: u32 = hz.trim().parse().ok()?;
+        if !(1..=MAX_SAMPLE_RATE).contains(&hz) {
+            return None;
+        }
+        rates[state] = hz;
+    }
+    Some(rates)
+}
+
+/// ENOSE_CONFIG, atau config.json di folder kerja, atau ../config.json (SPS/ saat `cargo run`).
+pub fn default_path() -> PathBuf {
+    if let Ok(p) = std::env::var("ENOSE_CONFIG") {
+        return PathBuf::from(p);
+    }
+    let local = PathBuf::from("config.json");
+    if local.exists() {
+        local
+    } else {
+        PathBuf::from("../config.json")
+    }
+}
+
+/// Load + validasi config saat startup, lalu mulai thread hot reload.
+pub fn init(path: PathBuf) -> Result<(), String> {
+    let cfg = Config::load(&path)?;
+    let _ = CONFIG.set(RwLock::new(cfg));
+    thread::spawn(move || watch(path));
+    Ok(())
+}
+
+pub fn get() -> RwLockReadGuard<'static, Config> {
+    CONFIG.get().expect("config not initialised").read()
+}
+
+fn mtime(path: &Path) -> Option<SystemTime> {
+    fs::metadata(path).and_then(|m| m.modified()).ok()
+}
+
+fn watch(path: PathBuf) {
+    let local = local_path(&path);
+    let mut last = (mtime(&path), mtime(&local));
+    loop {
+        thread::sleep(Duration::from_secs(RELOAD_POLL_SECS));
+        let now = (mtime(&path), mtime(&local));
+        if now == last {
+            continue;
+        }
+        last = now;
+        match Config::load(&path) {
+            Ok(new) => {
+                let mut cfg = CONFIG.get().unwrap().write();
+                if new.backend != cfg.backend || new.gui != cfg.gui || new.influx != cfg.influx {
+                    println!("CONFIG: non-performance changes take effect after restart");
+                }
+                if new.performance != cfg.performance {
+                    println!("CONFIG: reloaded performance {:?}", new.performance);
+                    cfg.performance = new.performance;
+                }
+            }
+            Err(e) => eprintln!("CONFIG: reload ignored: {}", e),
+        }
+    }
+}
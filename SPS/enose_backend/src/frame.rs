@@ -0,0 +1,177 @@
+// ===============================
+//  FRAME BINER SENSOR (Arduino → Rust → GUI)
+// ===============================
+// Alternatif kompak untuk baris teks `SENSOR:...`. Layout little-endian,
+// FRAME_SIZE = 50 byte (sama dengan FRAME_DTYPE di protocol.py):
+//
+//   0  magic "EN"        2  versi (u8)        3  device id (u8)
+//   4  seq (u32)         8  timestamp ns (i64, 0 = diisi relay)
+//   16 7 × f32 urutan wire (no2, ethanol, voc, co GM, co, ethanol, voc MiCS)
+//   44 state (i8)        45 level (i8)        46 CRC32 zlib atas byte 0..46
+//
+// Negosiasi per koneksi: pengirim mengirim baris HELLO, penerima membalas
+// ACK lalu isi stream berikutnya berupa frame. Tanpa ACK (penerima versi
+// lama / timeout) pengirim tetap memakai teks.
+//
+// Backfill relay → GUI: setelah ACK, GUI mengirim `RESUME <sesi> <seq>`
+// (seq terakhir yang diterima) atau `RESUME` saja. Relay membalas
+// `SESSION <sesi> <n>` diikuti n frame yang terlewat, baru stream live.
+
+pub const MAGIC: [u8; 2] = *b"EN";
+pub const VERSION: u8 = 1;
+pub const FRAME_SIZE: usize = 50;
+pub const HELLO: &str = "HELLO ENOSE-BIN/1";
+pub const ACK: &str = "OK ENOSE-BIN/1";
+pub const RESUME: &str = "RESUME";
+pub const SESSION: &str = "SESSION";
+
+const CRC_OFFSET: usize = FRAME_SIZE - 4;
+
+#[derive(Clone, Debug, PartialEq)]
+pub struct Frame {
+    pub device_id: u8,
+    pub seq: u32,
+    pub timestamp_ns: i64,
+    pub values: [f32; 7],
+    pub state: i8,
+    pub level: i8,
+}
+
+// ------------------------------
+// CRC32 (IEEE, kompatibel zlib.crc32)
+// ------------------------------
+const fn crc_table() -> [u32; 256] {
+    let mut table = [0u32; 256];
+    let mut i = 0;
+    while i < 256 {
+        let mut c = i as u32;
+        let mut k = 0;
+        while k < 8 {
+            c = if c & 1 != 0 {
+                0xEDB8_8320 ^ (c >> 1)
+            } else {
+                c >> 1
+            };
+            k += 1;
+        }
+        table[i] = c;
+        i += 1;
+    }
+    table
+}
+
+static CRC_TABLE: [u32; 256] = crc_table();
+
+pub fn crc32(data: &[u8]) -> u32 {
+    let mut crc = 0xFFFF_FFFFu32;
+    for &b in data {
+        crc = CRC_TABLE[((crc ^ b as u32) & 0xFF) as usize] ^ (crc >> 8);
+    }
+    !crc
+}
+
+impl Frame {
+    pub fn encode(&self) -> [u8; FRAME_SIZE] {
+        let mut buf = [0u8; FRAME_SIZE];
+        buf[0..2].copy_from_slice(&MAGIC);
+        buf[2] = VERSION;
+        buf[3] = self.device_id;
+        buf[4..8].copy_from_slice(&self.seq.to_le_bytes());
+        buf[8..16].copy_from_slice(&self.timestamp_ns.to_le_bytes());
+        for (i, v) in self.values.iter().enumerate() {
+            buf[16 + i * 4..20 + i * 4].copy_from_slice(&v.to_le_bytes());
+        }
+        buf[44] = self.state as u8;
+        buf[45] = self.level as u8;
+        let crc = crc32(&buf[..CRC_OFFSET]);
+        buf[CRC_OFFSET..].copy_from_slice(&crc.to_le_bytes());
+        buf
+    }
+
+    /// Decode tepat satu frame; None kalau magic/versi/CRC tidak cocok.
+    pub fn decode(buf: &[u8]) -> Option<Frame> {
+        if buf.len() < FRAME_SIZE || buf[0..2] != MAGIC || buf[2] != VERSION {
+            return None;
+        }
+        let crc = u32::from_le_bytes(buf[CRC_OFFSET..FRAME_SIZE].try_into().ok()?);
+        if crc32(&buf[..CRC_OFFSET]) != crc {
+            return None;
+        }
+        let mut values = [0f32; 7];
+        for (i, v) in values.iter_mut().enumerate() {
+            *v = f32::from_le_bytes(buf[16 + i * 4..20 + i * 4].try_into().ok()?);
+        }
+        Some(Frame {
+            device_id: buf[3],
+            seq: u32::from_le_bytes(buf[4..8].try_into().ok()?),
+            timestamp_ns: i64::from_le_bytes(buf[8..16].try_into().ok()?),
+            values,
+            state: buf[44] as i8,
+            level: buf[45] as i8,
+        })
+    }
+}
+
+// ------------------------------
+// DECODER STREAM (resync setelah byte rusak)
+// ------------------------------
+#[derive(Default)]
+pub struct Decoder {
+    buf: Vec<u8>,
+}
+
+impl Decoder {
+    /// Tambah byte dari socket, frame lengkap masuk `out`. Hasil: jumlah
+    /// frame rusak (CRC/magic salah) yang dilewati.
+    pub fn feed(&mut self, data: &[u8], out: &mut Vec<Frame>) -> u64 {
+        self.buf.extend_from_slice(data);
+        let mut pos = 0;
+        let mut errors = 0;
+        while self.buf.len() - pos >= FRAME_SIZE {
+            match Frame::decode(&self.buf[pos..]) {
+                Some(frame) => {
+                    out.push(frame);
+                    pos += FRAME_SIZE;
+                }
+                None => {
+                    // Cari magic berikutnya; sisa yang belum lengkap disimpan
+                    errors += 1;
+                    pos = match self.buf[pos + 1..].windows(2).position(|w| w == MAGIC) {
+                        Some(i) => pos + 1 + i,
+                        None => self.buf.len() - 1,
+                    };
+                }
+            }
+        }
+        self.buf.drain(..pos);
+        errors
+    }
+}
+
+// ------------------------------
+// DETEKSI SAMPEL HILANG
+// ------------------------------
+#[derive(Default)]
+pub struct SeqTracker {
+    last: Option<u32>,
+}
+
+impl SeqTracker {
+    /// Jumlah seq yang terlewat sebelum `seq`. Lompatan mundur (device
+    /// restart) dan duplikat tidak dihitung hilang.
+    pub fn update(&mut self, seq: u32) -> u64 {
+        let lost = match self.last {
+            Some(last) => {
+                let diff = seq.wrapping_sub(last);
+                if diff == 0 || diff >= 1 << 31 {
+                    0
+                } else {
+                    (diff - 1) as u64
+                }
+            }
+            None => 0,
+        };
+        self.last = Some(seq);
+        lost
+    }
+}
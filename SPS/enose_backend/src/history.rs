@@ -0,0 +1,139 @@
+// ===============================
+//  HISTORY RAM (log append-only per chunk)
+// ===============================
+// Record disimpan di chunk berukuran tetap yang tidak pernah dipindah. Writer
+// (stage store) mengisi slot lalu menerbitkan panjang baru dengan satu store
+// atomic per batch; reader mengambil Snapshot (salinan Arc daftar chunk +
+// panjang saat itu) tanpa menyalin record, lalu membaca di luar lock
+// apa pun. Lock daftar chunk hanya ditulis saat chunk baru dibuat atau chunk
+// lama dibuang (tiap CHUNK record), jadi force-save / backfill GUI / API
+// history yang membaca seluruh history tidak menahan ingest.
+//
+// Retention (performance.history_retention) dibuang per chunk utuh; chunk yang
+// masih dipegang snapshot baru dibebaskan setelah snapshot selesai.
+
+use std::collections::VecDeque;
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::{Arc, OnceLock};
+
+use parking_lot::{Mutex, RwLock};
+
+use crate::SensorRecord;
+
+pub const CHUNK: usize = 4096;
+
+struct Chunk {
+    first: usize, // index global record pertama
+    slots: Box<[OnceLock<SensorRecord>]>,
+}
+
+impl Chunk {
+    fn new(first: usize) -> Arc<Chunk> {
+        Arc::new(Chunk {
+            first,
+            slots: (0..CHUNK).map(|_| OnceLock::new()).collect(),
+        })
+    }
+}
+
+pub struct History {
+    chunks: RwLock<VecDeque<Arc<Chunk>>>,
+    len: AtomicUsize,                // record yang sudah terbit (index global)
+    tail: Mutex<Option<Arc<Chunk>>>, // chunk yang sedang diisi; juga lock writer
+}
+
+impl History {
+    pub fn new() -> History {
+        History {
+            chunks: RwLock::new(VecDeque::new()),
+            len: AtomicUsize::new(0),
+            tail: Mutex::new(None),
+        }
+    }
+
+    /// Tambah satu batch; reader melihat batch utuh atau tidak sama sekali.
+    /// `retention` 0 = tanpa batas.
+    pub fn extend(&self, batch: &[SensorRecord], retention: usize) {
+        let mut tail = self.tail.lock();
+        let mut len = self.len.load(Ordering::Relaxed);
+        for rec in batch {
+            let chunk = match tail.as_ref() {
+                Some(c) if len < c.first + CHUNK => c.clone(),
+                _ => {
+                    let c = Chunk::new(len);
+                    self.roll(c.clone(), len, retention);
+                    *tail = Some(c.clone());
+                    c
+                }
+            };
+            let _ = chunk.slots[len - chunk.first].set(rec.clone());
+            len += 1;
+        }
+        self.len.store(len, Ordering::Release);
+    }
+
+    /// Pasang chunk baru dan buang chunk terdepan selama sisanya masih
+    /// memuat `retention` record.
+    fn roll(&self, chunk: Arc<Chunk>, len: usize, retention: usize) {
+        let mut chunks = self.chunks.write();
+        chunks.push_back(chunk);
+        while retention > 0 && chunks.len() > 1 && len - chunks[1].first >= retention {
+            chunks.pop_front();
+        }
+    }
+
+    pub fn snapshot(&self) -> Snapshot {
+        let chunks = self.chunks.read();
+        // Dibaca di bawah read lock: chunk untuk record yang sudah terbit
+        // pasti sudah ada di daftar
+        let end = self.len.load(Ordering::Acquire);
+        Snapshot {
+            start: chunks.front().map_or(end, |c| c.first),
+            end,
+            chunks: chunks.iter().cloned().collect(),
+        }
+    }
+}
+
+/// Pandangan history pada satu saat; index 0..len() relatif ke record tertua
+/// yang masih disimpan.
+pub struct Snapshot {
+    chunks: Vec<Arc<Chunk>>,
+    start: usize,
+    end: usize,
+}
+
+impl Snapshot {
+    pub fn len(&self) -> usize {
+        self.end - self.start
+    }
+
+    pub fn get(&self, i: usize) -> &SensorRecord {
+        // Chunk selalu mulai di kelipatan CHUNK dan start = awal chunk pertama
+        self.chunks[i / CHUNK].slots[i % CHUNK]
+            .get()
+            .expect("record sudah terbit")
+    }
+
+    /// Seperti slice::partition_point (record urut menurut `pred`).
+    pub fn partition_point(&self, mut pred: impl FnMut(&SensorRecord) -> bool) -> usize {
+        let (mut lo, mut hi) = (0, self.len());
+        while lo < hi {
+            let mid = lo + (hi - lo) / 2;
+            if pred(self.get(mid)) {
+                lo = mid + 1;
+            } else {
+                hi = mid;
+            }
+        }
+        lo
+    }
+
+    pub fn range(&self, from: usize, to: usize) -> impl Iterator<Item = &SensorRecord> {
+        (from..to.min(self.len())).map(move |i| self.get(i))
+    }
+
+    pub fn iter(&self) -> impl Iterator<Item = &SensorRecord> {
+        self.range(0, self.len())
+    }
+}
@@ -0,0 +1,570 @@
+// ===============================
+//  HUB PUB/SUB (relay → banyak consumer)
+// ===============================
+// Consumer (viewer kedua, recorder headless, analisis) connect ke
+// backend.hub_addr dan mengirim satu baris:
+//
+//   SUBSCRIBE device=1 channels=co_gm,voc_mics decimate=10 policy=drop_oldest format=binary queue=1024 batch_ms=20
+//
+// Semua key opsional (default: semua device, semua kanal, decimate=1,
+// drop_oldest, binary, queue 1024, batch_ms 20). Hub membalas "OK <id>"
+// atau "ERR <pesan>", lalu mengirim batch frame (frame.rs) atau baris SENSOR
+// teks. Kanal yang tidak dipilih dikirim sebagai NaN supaya layout frame
+// tetap sama.
+//
+// Tiap subscriber punya antrean terbatas + thread writer sendiri; publish()
+// hanya memegang lock antrean sebentar dan tidak pernah menunggu socket.
+// Writer dibangunkan saat antrean berubah dari kosong, lalu menunggu batch_ms
+// supaya frame terkumpul dan dikirim dengan satu write.
+// Antrean penuh: drop_oldest membuang frame tertua, disconnect memutus
+// subscriber.
+
+use std::collections::VecDeque;
+use std::io::{self, BufRead, BufReader, Write};
+use std::net::{Shutdown, TcpListener, TcpStream};
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::{Arc, Condvar, Mutex};
+use std::thread;
+use std::time::Duration;
+
+use parking_lot::RwLock;
+
+use crate::frame::Frame;
+use crate::metrics;
+
+pub const CHANNELS: [&str; 7] = [
+    "no2_gm",
+    "ethanol_gm",
+    "voc_gm",
+    "co_gm",
+    "co_mics",
+    "ethanol_mics",
+    "voc_mics",
+];
+const DEFAULT_QUEUE: usize = 1024;
+const MAX_QUEUE: usize = 65536;
+const DEFAULT_BATCH_MS: u64 = 20;
+const MAX_BATCH_MS: u64 = 1000;
+const HANDSHAKE_TIMEOUT_SECS: u64 = 5;
+const WRITE_TIMEOUT_SECS: u64 = 10; // consumer macet lebih lama dari ini diputus
+
+#[derive(Clone, Copy, Debug, PartialEq)]
+pub enum Policy {
+    DropOldest,
+    Disconnect,
+}
+
+#[derive(Clone, Copy, Debug, PartialEq)]
+pub enum Format {
+    Binary,
+    Text,
+}
+
+#[derive(Clone, Debug, PartialEq)]
+pub struct Subscription {
+    pub device: Option<u8>,
+    pub channels: [bool; 7],
+    pub decimate: u64,
+    pub policy: Policy,
+    pub format: Format,
+    pub queue: usize,
+    pub batch_ms: u64,
+}
+
+impl Default for Subscription {
+    fn default() -> Self {
+        Subscription {
+            device: None,
+            channels: [true; 7],
+            decimate: 1,
+            policy: Policy::DropOldest,
+            format: Format::Binary,
+            queue: DEFAULT_QUEUE,
+            batch_ms: DEFAULT_BATCH_MS,
+        }
+    }
+}
+
+impl Subscription {
+    pub fn parse(line: &str) -> Result<Subscription, String> {
+        let mut words = line.split_whitespace();
+        if words.next() != Some("SUBSCRIBE") {
+            return Err("expected SUBSCRIBE".into());
+        }
+        let mut sub = Subscription::default();
+        for word in words {
+            let (key, value) = word
+                .split_once('=')
+                .ok_or_else(|| format!("expected key=value, got {:?}", word))?;
+            let invalid = || format!("invalid {}: {:?}", key, value);
+            match key {
+                "device" if value == "*" => sub.device = None,
+                "device" => sub.device = Some(value.parse().map_err(|_| invalid())?),
+                "channels" if value == "*" => sub.channels = [true; 7],
+                "channels" => {
+                    sub.channels = [false; 7];
+                    for name in value.split(',') {
+                        let idx = CHANNELS
+                            .iter()
+                            .position(|c| *c == name)
+                            .ok_or_else(invalid)?;
+                        sub.channels[idx] = true;
+                    }
+                }
+                "decimate" => {
+                    sub.decimate = value.parse().map_err(|_| invalid())?;
+                    if sub.decimate == 0 {
+                        return Err(invalid());
+                    }
+                }
+                "policy" => {
+                    sub.policy = match value {
+                        "drop_oldest" => Policy::DropOldest,
+                        "disconnect" => Policy::Disconnect,
+                        _ => return Err(invalid()),
+                    }
+                }
+                "format" => {
+                    sub.format = match value {
+                        "binary" => Format::Binary,
+                        "text" => Format::Text,
+                        _ => return Err(invalid()),
+                    }
+                }
+                "queue" => {
+                    sub.queue = value.parse().map_err(|_| invalid())?;
+                    if !(1..=MAX_QUEUE).contains(&sub.queue) {
+                        return Err(invalid());
+                    }
+                }
+                "batch_ms" => {
+                    sub.batch_ms = value.parse().map_err(|_| invalid())?;
+                    if sub.batch_ms > MAX_BATCH_MS {
+                        return Err(invalid());
+                    }
+                }
+                _ => return Err(format!("unknown key {:?}", key)),
+            }
+        }
+        Ok(sub)
+    }
+
+    fn encode(&self, frame: &Frame, out: &mut Vec<u8>) {
+        let mut f = frame.clone();
+        for (v, keep) in f.values.iter_mut().zip(self.channels) {
+            if !keep {
+                *v = f32::NAN;
+            }
+        }
+        match self.format {
+            Format::Binary => out.extend_from_slice(&f.encode()),
+            Format::Text => {
+                let v = f.values;
+                let line = format!(
+                    "SENSOR:{},{},{},{},{},{},{},{},{}\n",
+                    v[0], v[1], v[2], v[3], v[4], v[5], v[6], f.state, f.level
+                );
+                out.extend_from_slice(line.as_bytes());
+            }
+        }
+    }
+}
+
+// ------------------------------
+// SUBSCRIBER (antrean terbatas + thread writer)
+// ------------------------------
+struct Queue {
+    frames: VecDeque<Frame>,
+    matched: u64, // frame yang lolos filter device, untuk decimation
+    closed: bool,
+}
+
+struct Subscriber {
+    id: u64,
+    sub: Subscription,
+    queue: Mutex<Queue>,
+    ready: Condvar,
+}
+
+impl Subscriber {
+    /// Masukkan frame ke antrean tanpa menunggu; false = subscriber sudah tutup.
+    fn offer(&self, frame: &Frame) -> bool {
+        if self.sub.device.is_some_and(|d| d != frame.device_id) {
+            return true;
+        }
+        let mut q = self.queue.lock().unwrap();
+        if q.closed {
+            return false;
+        }
+        q.matched += 1;
+        if (q.matched - 1) % self.sub.decimate != 0 {
+            return true;
+        }
+        if q.frames.len() >= self.sub.queue {
+            match self.sub.policy {
+                Policy::DropOldest => {
+                    q.frames.pop_front();
+                    metrics::inc(&metrics::HUB_DROPPED);
+                }
+                Policy::Disconnect => {
+                    q.closed = true;
+                    self.ready.notify_one();
+                    metrics::inc(&metrics::HUB_DISCONNECTS);
+                    return false;
+                }
+            }
+        }
+        q.frames.push_back(frame.clone());
+        if q.frames.len() == 1 {
+            self.ready.notify_one();
+        }
+        true
+    }
+
+    fn close(&self) {
+        self.queue.lock().unwrap().closed = true;
+        self.ready.notify_one();
+    }
+
+    fn serve(&self, mut stream: TcpStream) {
+        let mut batch = Vec::new();
+        let mut buf = Vec::new();
+        loop {
+            {
+                let mut q = self.queue.lock().unwrap();
+                while q.frames.is_empty() && !q.closed {
+                    q = self.ready.wait(q).unwrap();
+                }
+                if q.closed {
+                    break;
+                }
+            }
+            // Kumpulkan frame selama batch_ms, lalu kirim sekaligus
+            if self.sub.batch_ms > 0 {
+                thread::sleep(Duration::from_millis(self.sub.batch_ms));
+            }
+            {
+                let mut q = self.queue.lock().unwrap();
+                if q.closed {
+                    break;
+                }
+                batch.extend(q.frames.drain(..));
+            }
+            let sent = batch.len() as u64;
+            buf.clear();
+            for frame in batch.drain(..) {
+                self.sub.encode(&frame, &mut buf);
+            }
+            if stream.write_all(&buf).is_err() {
+                break;
+            }
+            metrics::HUB_FRAMES_SENT.fetch_add(sent, Ordering::Relaxed);
+        }
+        self.close();
+        let _ = stream.shutdown(Shutdown::Both);
+    }
+}
+
+// ------------------------------
+// HUB
+// ------------------------------
+pub struct Hub {
+    subscribers: RwLock<Vec<Arc<Subscriber>>>,
+    next_id: AtomicU64,
+}
+
+impl Hub {
+    pub fn new() -> Arc<Hub> {
+        Arc::new(Hub {
+            subscribers: RwLock::new(Vec::new()),
+            next_id: AtomicU64::new(1),
+        })
+    }
+
+    /// Hub + thread accept di `addr`.
+    pub fn start(addr: &str) -> io::Result<Arc<Hub>> {
+        let listener = TcpListener::bind(addr)?;
+        metrics::log("info", "hub", &format!("listening on {}", addr));
+        Ok(Hub::serve(listener))
+    }
+
+    fn serve(listener: TcpListener) -> Arc<Hub> {
+        let hub = Hub::new();
+        let h = hub.clone();
+        thread::spawn(move || {
+            for stream in listener.incoming().flatten() {
+                let h = h.clone();
+                thread::spawn(move || h.handle(stream));
+            }
+        });
+        hub
+    }
+
+    /// Kirim satu frame ke semua subscriber yang cocok (tidak pernah blocking
+    /// pada socket consumer).
+    pub fn publish(&self, frame: &Frame) {
+        let mut stale = false;
+        for sub in self.subscribers.read().iter() {
+            stale |= !sub.offer(frame);
+        }
+        if stale {
+            let mut subs = self.subscribers.write();
+            subs.retain(|s| !s.queue.lock().unwrap().closed);
+            metrics::HUB_SUBSCRIBERS.store(subs.len() as u64, Ordering::Relaxed);
+        }
+    }
+
+    fn handle(&self, stream: TcpStream) {
+        let peer = stream
+            .peer_addr()
+            .map(|a| a.to_string())
+            .unwrap_or_default();
+        let _ = stream.set_read_timeout(Some(Duration::from_secs(HANDSHAKE_TIMEOUT_SECS)));
+        let mut line = String::new();
+        let parsed = BufReader::new(&stream)
+            .read_line(&mut line)
+            .map_err(|e| e.to_string())
+            .and_then(|_| Subscription::parse(line.trim()));
+        let mut writer = &stream;
+        let sub = match parsed {
+            Ok(sub) => sub,
+            Err(e) => {
+                let _ = writer.write_all(format!("ERR {}\n", e).as_bytes());
+                metrics::log_limited("warn", "hub_subscribe", &format!("{}: {}", peer, e));
+                return;
+            }
+        };
+        let _ = stream.set_read_timeout(None);
+        let _ = stream.set_write_timeout(Some(Duration::from_secs(WRITE_TIMEOUT_SECS)));
+        let _ = stream.set_nodelay(true);
+
+        let id = self.next_id.fetch_add(1, Ordering::Relaxed);
+        if writer.write_all(format!("OK {}\n", id).as_bytes()).is_err() {
+            return;
+        }
+        let subscriber = Arc::new(Subscriber {
+            id,
+            sub,
+            queue: Mutex::new(Queue {
+                frames: VecDeque::new(),
+                matched: 0,
+                closed: false,
+            }),
+            ready: Condvar::new(),
+        });
+        {
+            let mut subs = self.subscribers.write();
+            subs.push(subscriber.clone());
+            metrics::HUB_SUBSCRIBERS.store(subs.len() as u64, Ordering::Relaxed);
+        }
+        metrics::log(
+            "info",
+            "hub_subscribe",
+            &format!("{} id={} {:?}", peer, id, subscriber.sub),
+        );
+
+        subscriber.serve(stream);
+
+        let mut subs = self.subscribers.write();
+        subs.retain(|s| s.id != id);
+        metrics::HUB_SUBSCRIBERS.store(subs.len() as u64, Ordering::Relaxed);
+        metrics::log("info", "hub_unsubscribe", &format!("{} id={}", peer, id));
+    }
+}
+
+// ------------------------------
+// TEST: banyak subscriber lokal lewat TCP loopback
+// ------------------------------
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::frame::{Decoder, FRAME_SIZE};
+    use std::io::Read;
+    use std::net::SocketAddr;
+    use std::time::Instant;
+
+    fn start_local() -> (Arc<Hub>, SocketAddr) {
+        let listener = TcpListener::bind("127.0.0.1:0").unwrap();
+        let addr = listener.local_addr().unwrap();
+        (Hub::serve(listener), addr)
+    }
+
+    fn subscribe(addr: SocketAddr, line: &str) -> TcpStream {
+        let mut stream = TcpStream::connect(addr).unwrap();
+        stream.write_all(format!("{}\n", line).as_bytes()).unwrap();
+        // Baca "OK <id>\n" byte per byte supaya frame pertama tidak ikut terbaca
+        let mut reply = Vec::new();
+        let mut byte = [0u8; 1];
+        while byte[0] != b'\n' {
+            stream.read_exact(&mut byte).unwrap();
+            reply.push(byte[0]);
+        }
+        assert!(
+            reply.starts_with(b"OK "),
+            "{:?}",
+            String::from_utf8_lossy(&reply)
+        );
+        stream
+    }
+
+    fn wait_subscribers(hub: &Hub, n: usize) {
+        let deadline = Instant::now() + Duration::from_secs(5);
+        while hub.subscribers.read().len() != n {
+            assert!(Instant::now() < deadline, "subscriber tidak terdaftar");
+            thread::sleep(Duration::from_millis(5));
+        }
+    }
+
+    fn frame(device_id: u8, seq: u32) -> Frame {
+        Frame {
+            device_id,
+            seq,
+            timestamp_ns: 1_700_000_000_000_000_000 + seq as i64 * 100_000_000,
+            values: [seq as f32; 7],
+            state: 2,
+            level: 1,
+        }
+    }
+
+    /// Baca frame biner sampai `n` frame atau EOF/timeout (decoder dipakai ulang
+    /// antar panggilan supaya frame yang terpotong di batas read tidak hilang).
+    fn read_frames(
+        stream: &mut TcpStream,
+        decoder: &mut Decoder,
+        n: usize,
+        timeout: Duration,
+    ) -> Vec<Frame> {
+        stream.set_read_timeout(Some(timeout)).unwrap();
+        let mut frames = Vec::new();
+        let mut buf = vec![0u8; 64 * FRAME_SIZE];
+        while frames.len() < n {
+            match stream.read(&mut buf) {
+                Ok(0) | Err(_) => break,
+                Ok(k) => {
+                    assert_eq!(decoder.feed(&buf[..k], &mut frames), 0, "frame rusak");
+                }
+            }
+        }
+        frames
+    }
+
+    #[test]
+    fn twenty_subscribers_get_their_filtered_streams() {
+        let (hub, addr) = start_local();
+        let specs = [
+            "SUBSCRIBE",
+            "SUBSCRIBE device=1",
+            "SUBSCRIBE device=2",
+            "SUBSCRIBE decimate=3",
+            "SUBSCRIBE device=2 decimate=4",
+            "SUBSCRIBE channels=co_gm,voc_mics",
+            "SUBSCRIBE device=1 channels=no2_gm decimate=5",
+        ];
+        let mut clients: Vec<(Subscription, TcpStream)> = (0..21)
+            .map(|i| {
+                let line = format!("{} batch_ms={}", specs[i % specs.len()], i % 3 * 10);
+                (Subscription::parse(&line).unwrap(), subscribe(addr, &line))
+            })
+            .collect();
+        wait_subscribers(&hub, clients.len());
+
+        let published: Vec<Frame> = (0..600).map(|i| frame(1 + (i % 2) as u8, i)).collect();
+        for f in &published {
+            hub.publish(f);
+        }
+
+        for (sub, stream) in clients.iter_mut() {
+            let matched: Vec<&Frame> = published
+                .iter()
+                .filter(|f| sub.device.map_or(true, |d| d == f.device_id))
+                .collect();
+            let expected: Vec<&Frame> =
+                matched.into_iter().step_by(sub.decimate as usize).collect();
+            let got = read_frames(
+                stream,
+                &mut Decoder::default(),
+                expected.len(),
+                Duration::from_secs(5),
+            );
+            assert_eq!(got.len(), expected.len(), "{:?}", sub);
+            for (g, e) in got.iter().zip(&expected) {
+                assert_eq!((g.device_id, g.seq), (e.device_id, e.seq), "{:?}", sub);
+                for (c, v) in g.values.iter().enumerate() {
+                    assert_eq!(v.is_nan(), !sub.channels[c], "{:?} kanal {}", sub, c);
+                }
+            }
+        }
+    }
+
+    #[test]
+    fn stalled_reader_drop_oldest_keeps_newest_disconnect_drops_subscriber() {
+        let (hub, addr) = start_local();
+        // Tidak dibaca sama sekali sampai buffer socket penuh
+        let mut dropper = subscribe(addr, "SUBSCRIBE policy=drop_oldest queue=16 batch_ms=0");
+        let mut strict = subscribe(addr, "SUBSCRIBE policy=disconnect queue=16 batch_ms=0");
+        wait_subscribers(&hub, 2);
+
+        let n = 400_000u32; // ~20 MB per subscriber, jauh di atas buffer socket loopback
+        for seq in 0..n {
+            hub.publish(&frame(1, seq));
+        }
+        // disconnect: dikeluarkan dari hub; drop_oldest: tetap terdaftar, antrean tidak lewat batas
+        wait_subscribers(&hub, 1);
+        let survivor = hub.subscribers.read()[0].clone();
+        assert_eq!(survivor.sub.policy, Policy::DropOldest);
+        assert!(survivor.queue.lock().unwrap().frames.len() <= 16);
+
+        // drop_oldest: frame tertua yang dibuang, frame terakhir tetap sampai
+        let mut decoder = Decoder::default();
+        let mut last = None;
+        let deadline = Instant::now() + Duration::from_secs(20);
+        while last != Some(n - 1) && Instant::now() < deadline {
+            let got = read_frames(&mut dropper, &mut decoder, 4096, Duration::from_millis(500));
+            let seqs: Vec<u32> = got.iter().map(|f| f.seq).collect();
+            assert!(seqs.windows(2).all(|w| w[0] < w[1]), "urutan");
+            last = seqs.last().copied().or(last);
+        }
+        assert_eq!(last, Some(n - 1));
+
+        // disconnect: yang sempat terkirim tetap terbaca (bisa nol), lalu EOF
+        let got = read_frames(
+            &mut strict,
+            &mut Decoder::default(),
+            usize::MAX,
+            Duration::from_secs(20),
+        );
+        assert!((got.len() as u32) < n);
+        let mut rest = [0u8; 1];
+        strict
+            .set_read_timeout(Some(Duration::from_secs(1)))
+            .unwrap();
+        assert_eq!(strict.read(&mut rest).unwrap_or(0), 0);
+    }
+
+    #[test]
+    fn publish_never_blocks_on_stalled_consumers() {
+        let (hub, addr) = start_local();
+        // 20 consumer macet: writer masing-masing tertahan di write_all
+        let _clients: Vec<TcpStream> = (0..20)
+            .map(|_| subscribe(addr, "SUBSCRIBE queue=64 batch_ms=0"))
+            .collect();
+        wait_subscribers(&hub, 20);
+
+        let start = Instant::now();
+        let mut worst = Duration::ZERO;
+        for seq in 0..200_000 {
+            let t = Instant::now();
+            hub.publish(&frame(1, seq));
+            worst = worst.max(t.elapsed());
+        }
+        // Kalau publish menunggu socket, satu panggilan akan tertahan sampai
+        // WRITE_TIMEOUT_SECS; stage store hanya boleh kena lock antrean sebentar
+        assert!(
+            worst < Duration::from_millis(200),
+            "publish terlama {:?}",
+            worst
+        );
+        assert!(start.elapsed() < Duration::from_secs(WRITE_TIMEOUT_SECS));
+        assert_eq!(hub.subscribers.read().len(), 20);
+    }
+}
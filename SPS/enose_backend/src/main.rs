@@ -3,32 +3,50 @@
  //  Arduino → Rust → GUI → InfluxDB 2 + STATUS BROADCAST
 // ===============================
 
-use std::io::{self, BufRead, BufReader, Write, Read};
-use std::net::{TcpListener, TcpStream};
-use std::sync::{mpsc, Arc, Mutex};
+use std::fs::OpenOptions;
+use std::io::Write;
+use std::path::{Path, PathBuf};
+use std::sync::atomic::Ordering;
+use std::sync::{mpsc, Arc, OnceLock};
 use std::thread;
-use std::time::Duration;
+use std::time::{Duration, Instant};
 
-use chrono::Utc;
 use serde::{Deserialize, Serialize};
 use reqwest::blocking::Client;
+use tokio::io::{AsyncReadExt, AsyncWriteExt};
+use tokio::net::{TcpListener, TcpStream};
+
+mod bench;
+mod config;
+mod frame;
+mod history;
+mod hub;
+mod metrics;
+mod pipeline;
+mod serial;
+mod wal;
+mod web;
+use history::History;
+use hub::Hub;
+use pipeline::Sinks;
+use wal::Wal;
+use web::Web;
 
 // ------------------------------
-// KONFIGURASI (DITAMBAH PORT STATUS)
+// KONFIGURASI
 // ------------------------------
-const ARDUINO_WIFI_ADDR: &str = "0.0.0.0:8081";
-const GUI_DATA_ADDR:     &str = "127.0.0.1:8085";  // Diubah jadi 8085 biar match GUI terbaru
-const GUI_CMD_ADDR:      &str = "0.0.0.0:8082";
-const GUI_STATUS_ADDR:   &str = "127.0.0.1:8087";  // PORT BARU BUAT STATUS INFLUXDB
+// Alamat, port serial, kredensial InfluxDB dan knob performa (batch size,
+// flush interval, retention) ada di config.json, lihat config.rs.
 
-const SERIAL_PORT:       &str = "COM12";  
-const BAUD_RATE: u32 = 9600;
+// WRITE-AHEAD QUEUE (record antre di disk sebelum ke InfluxDB)
+const INFLUX_RETRY_MAX_SECS: u64 = 30;          // backoff maksimum saat Influx mati
+const INFLUX_REJECTED_FILE: &str = "rejected.lp"; // batch yang ditolak Influx (4xx), di wal_dir
+const WAL_METRICS_SECS: u64 = 5;                // kirim depth/lag ke GUI tiap 5 detik
 
-// INFLUXDB v2 CONFIG
-const INFLUX_URL:   &str = "http://localhost:8086/api/v2/write";
-const INFLUX_TOKEN: &str = "jOeyQdgu58KLPoPOiMhGcnUZVjIKU80HT7umg30mU0z5V6wdzKpfSeT4X_g-MGLpuBaL_kmfZxznSs9irQfaUA==";
-const INFLUX_ORG:   &str = "ITS";
-const INFLUX_BUCKET:&str = "Cuz";
+// STATUS + COMMAND (tidak boleh menahan pipeline / client lain)
+const STATUS_QUEUE: usize = 64;                 // pesan status yang menunggu dikirim ke GUI
+const STATUS_CONNECT_MS: u64 = 500;             // GUI status port tidak menjawab -> pesan dibuang
+const COMMAND_READ_SECS: u64 = 5;               // client command yang tidak menutup koneksi diputus
 
 // ===============================
 //    STRUCT RECORD SENSOR
@@ -45,213 +63,479 @@ struct SensorRecord {
     state: i32,
     level: i32,
     timestamp: i128,
+    #[serde(default)]
+    seq: u32,       // nomor urut relay (lihat ingest); seq device hanya untuk deteksi hilang
+    #[serde(default)]
+    device_id: u8,
 }
 
 // ===============================
-//   TULIS KE INFLUXDB V2 + BROADCAST STATUS
+//   LINE PROTOCOL + BROADCAST STATUS
 // ===============================
-fn write_influx(record: &SensorRecord) -> bool {
-    let line = format!(
+fn influx_line(record: &SensorRecord) -> String {
+    format!(
         "gas_data no2_gm={},ethanol_gm={},voc_gm={},co_gm={},co_mics={},ethanol_mics={},voc_mics={},state={},level={} {}",
         record.no2_gm, record.ethanol_gm, record.voc_gm, record.co_gm,
         record.co_mics, record.ethanol_mics, record.voc_mics,
         record.state, record.level, record.timestamp
-    );
+    )
+}
 
-    let client = Client::new();
-    let url = format!("{}?org={}&bucket={}&precision=ns", INFLUX_URL, INFLUX_ORG, INFLUX_BUCKET);
+static STATUS: OnceLock<tokio::sync::mpsc::Sender<String>> = OnceLock::new();
 
-    let success = client
+/// Antrekan pesan status ke GUI tanpa menunggu; antrean penuh = pesan dibuang.
+fn send_status(msg: &str) {
+    if let Some(tx) = STATUS.get() {
+        match tx.try_send(msg.to_string()) {
+            Ok(()) => metrics::STAGE_STATUS.enqueue(),
+            Err(_) => metrics::STAGE_STATUS.overflow(),
+        }
+    }
+}
+
+async fn status_sender(mut rx: tokio::sync::mpsc::Receiver<String>) {
+    while let Some(msg) = rx.recv().await {
+        metrics::STAGE_STATUS.dequeue();
+        let addr = config::get().gui_status_addr();
+        let connect = tokio::time::timeout(
+            Duration::from_millis(STATUS_CONNECT_MS),
+            TcpStream::connect(addr),
+        );
+        if let Ok(Ok(mut stream)) = connect.await {
+            let _ = stream.write_all(msg.as_bytes()).await;
+        }
+    }
+}
+
+// ===============================
+//   INFLUX WRITER (WAL → InfluxDB, BATCH)
+// ===============================
+enum WriteError {
+    Retry(String),    // Influx mati / timeout / 5xx / 401 / 429: antre, coba lagi
+    Rejected(String), // 4xx lain: isi batch tidak akan pernah diterima
+}
+
+fn write_influx_batch(client: &Client, lines: &[String]) -> Result<(), WriteError> {
+    let (url, token) = {
+        let cfg = config::get();
+        (cfg.influx_write_url(), cfg.influx.token.clone())
+    };
+    let resp = client
         .post(&url)
-        .header("Authorization", format!("Token {}", INFLUX_TOKEN))
+        .header("Authorization", format!("Token {}", token))
         .header("Content-Type", "text/plain")
-        .body(line.clone())
+        .body(lines.join("\n"))
         .send()
-        .map(|r| r.status().is_success())
-        .unwrap_or(false);
+        .map_err(|e| WriteError::Retry(e.to_string()))?;
+    let status = resp.status();
+    if status.is_success() {
+        return Ok(());
+    }
+    if status.is_client_error() && status.as_u16() != 401 && status.as_u16() != 429 {
+        let body = resp.text().unwrap_or_default();
+        return Err(WriteError::Rejected(format!("HTTP {}: {}", status, body.trim())));
+    }
+    Err(WriteError::Retry(format!("HTTP {}", status)))
+}
 
-    // BROADCAST STATUS KE GUI (real-time)
-    let status_msg = if success { "INFLUX:OK" } else { "INFLUX:ERROR" };
-    if let Ok(mut stream) = TcpStream::connect(GUI_STATUS_ADDR) {
-        let _ = stream.write_all(status_msg.as_bytes());
+/// Simpan batch yang ditolak supaya WAL tetap jalan (bisa diperbaiki lalu ditulis manual).
+fn dead_letter(path: &Path, lines: &[String]) -> std::io::Result<()> {
+    let mut f = OpenOptions::new().create(true).append(true).open(path)?;
+    for line in lines {
+        writeln!(f, "{}", line)?;
     }
+    f.sync_data()
+}
 
-    if success {
-        println!("InfluxDB: Data saved");
-    } else {
-        eprintln!("InfluxDB: Failed to save this point");
+fn influx_writer(wal: Arc<Wal>, rejected_path: PathBuf) {
+    let client = Client::builder()
+        .timeout(Duration::from_secs(10))
+        .build()
+        .unwrap_or_else(|_| Client::new());
+    let mut backoff = 1;
+    let mut healthy = true;
+
+    loop {
+        // Dibaca ulang tiap batch supaya hot reload langsung berlaku
+        let (batch_size, flush_ms) = {
+            let perf = &config::get().performance;
+            (perf.influx_batch_size, perf.influx_flush_ms)
+        };
+        let batch = match wal.read_batch(batch_size, Duration::from_millis(flush_ms)) {
+            Ok(b) => b,
+            Err(e) => {
+                eprintln!("WAL: read error: {}", e);
+                thread::sleep(Duration::from_secs(1));
+                continue;
+            }
+        };
+        if batch.lines.is_empty() {
+            continue;
+        }
+
+        let started = Instant::now();
+        let result = write_influx_batch(&client, &batch.lines);
+        metrics::INFLUX_LATENCY.observe(started.elapsed());
+        match result {
+            Ok(()) => {
+                metrics::inc(&metrics::INFLUX_BATCHES_OK);
+                metrics::INFLUX_POINTS.fetch_add(batch.lines.len() as u64, Ordering::Relaxed);
+                if let Err(e) = wal.commit(batch.end_seq) {
+                    eprintln!("WAL: commit error: {}", e);
+                }
+                if !healthy {
+                    println!("InfluxDB: back online, draining queue");
+                }
+                healthy = true;
+                backoff = 1;
+                send_status(&format!("INFLUX:OK:{}", batch.lines.len()));
+            }
+            // Batch beracun: jangan di-retry selamanya (head WAL macet, disk terus tumbuh)
+            Err(WriteError::Rejected(e)) => {
+                metrics::INFLUX_POINTS_REJECTED.fetch_add(batch.lines.len() as u64, Ordering::Relaxed);
+                metrics::log(
+                    "error",
+                    "influx_rejected",
+                    &format!(
+                        "{} point(s) ditolak ({}), dipindah ke {}",
+                        batch.lines.len(), e, rejected_path.display()
+                    ),
+                );
+                if let Err(e) = dead_letter(&rejected_path, &batch.lines) {
+                    eprintln!("WAL: cannot write {}: {}", rejected_path.display(), e);
+                }
+                if let Err(e) = wal.commit(batch.end_seq) {
+                    eprintln!("WAL: commit error: {}", e);
+                }
+            }
+            Err(WriteError::Retry(e)) => {
+                metrics::inc(&metrics::INFLUX_BATCHES_FAILED);
+                if healthy {
+                    eprintln!("InfluxDB: write failed ({}), queueing to disk", e);
+                }
+                healthy = false;
+                send_status("INFLUX:ERROR");
+                wal.retry();
+                thread::sleep(Duration::from_secs(backoff));
+                backoff = (backoff * 2).min(INFLUX_RETRY_MAX_SECS);
+            }
+        }
+    }
+}
+
+fn wal_metrics(wal: Arc<Wal>) {
+    let mut last_report = Instant::now();
+    loop {
+        thread::sleep(Duration::from_secs(WAL_METRICS_SECS));
+        let st = wal.stats();
+        send_status(&format!("WAL:{},{:.1}", st.depth, st.lag_secs));
+        if st.depth > 0 && last_report.elapsed() >= Duration::from_secs(60) {
+            println!(
+                "WAL: depth={} lag={:.1}s segments={} bytes={}",
+                st.depth, st.lag_secs, st.segments, st.bytes
+            );
+            last_report = Instant::now();
+        }
     }
-    success
 }
 
 // ===============================
 //            MAIN
 // ===============================
-fn main() {
+#[tokio::main]
+async fn main() {
+    let args: Vec<String> = std::env::args().skip(1).collect();
+    if args.first().map(String::as_str) == Some("bench-history") {
+        bench::history(&args[1..]);
+        return;
+    }
     println!("=== RUST E-NOSE BACKEND v2.1 + INFLUXDB STATUS ===");
 
-    let history = Arc::new(Mutex::new(Vec::<SensorRecord>::new()));
+    let config_path = config::default_path();
+    if let Err(e) = config::init(config_path.clone()) {
+        eprintln!("CONFIG: {}", e);
+        return;
+    }
+    println!("CONFIG: loaded {}", config_path.display());
+    if config::get().influx.token.is_empty() {
+        eprintln!(
+            "CONFIG: influx.token kosong; isi ENOSE_INFLUX_TOKEN atau {}",
+            config::local_path(&config_path).display()
+        );
+    }
+    let wal_dir = config::get().backend.wal_dir.clone();
+
+    let history = Arc::new(History::new());
     let (tx_cmd, rx_cmd) = mpsc::channel::<String>();
+    let (tx_status, rx_status) = tokio::sync::mpsc::channel(STATUS_QUEUE);
+    metrics::STAGE_STATUS.open(STATUS_QUEUE);
+    let _ = STATUS.set(tx_status);
+    tokio::spawn(status_sender(rx_status));
+
+    let wal = match Wal::open(&wal_dir) {
+        Ok(w) => Arc::new(w),
+        Err(e) => {
+            eprintln!("WAL: cannot open {}: {}", wal_dir, e);
+            return;
+        }
+    };
+    let st = wal.stats();
+    println!("WAL: {} queued record(s) in {} segment(s)", st.depth, st.segments);
 
-    // SENSOR SERVER
+    // INFLUX WRITER + METRICS WAL + ENDPOINT /metrics
     {
-        let h = history.clone();
-        thread::spawn(move || { 
-            if let Err(e) = sensor_server(h) { 
-                eprintln!("Sensor server error: {}", e); 
-            } 
-        });
+        let w = wal.clone();
+        let rejected = Path::new(&wal_dir).join(INFLUX_REJECTED_FILE);
+        thread::spawn(move || influx_writer(w, rejected));
+        let w = wal.clone();
+        thread::spawn(move || wal_metrics(w));
+        metrics::start(config::get().backend.metrics_addr.clone(), wal.clone());
     }
 
+    // HUB PUB/SUB (consumer tambahan selain GUI utama)
+    let hub_addr = config::get().backend.hub_addr.clone();
+    let hub = if hub_addr.is_empty() {
+        None
+    } else {
+        match Hub::start(&hub_addr) {
+            Ok(h) => Some(h),
+            Err(e) => {
+                eprintln!("Hub error: cannot bind {}: {}", hub_addr, e);
+                None
+            }
+        }
+    };
+
+    // WEBSOCKET STREAM + HISTORY HTTP (dashboard tanpa GUI PyQt)
+    let web_addr = config::get().backend.web_addr.clone();
+    let web = if web_addr.is_empty() {
+        None
+    } else {
+        match Web::start(&web_addr, history.clone()) {
+            Ok(w) => Some(w),
+            Err(e) => {
+                eprintln!("Web error: {}", e);
+                None
+            }
+        }
+    };
+
+    // SENSOR PIPELINE (ingest → parser → store → GUI, lihat pipeline.rs)
+    let sinks = Sinks {
+        history: history.clone(),
+        wal: wal.clone(),
+        hub,
+        web,
+        rate: serial::RateControl::new(tx_cmd.clone()),
+    };
+    let ingest = match pipeline::start(sinks).await {
+        Ok(i) => Some(i),
+        Err(e) => {
+            eprintln!("Sensor server error: {}", e);
+            None
+        }
+    };
+
     // COMMAND SERVER
-    {
-        let tx = tx_cmd.clone();
-        let h = history.clone();
-        thread::spawn(move || { 
-            if let Err(e) = command_server(tx, h) { 
-                eprintln!("Command server error: {}", e); 
-            } 
-        });
-    }
+    tokio::spawn(command_server(tx_cmd, history, wal));
 
-    // SERIAL WRITER (ke Arduino)
-    thread::spawn(move || { 
-        if let Err(e) = serial_sender(rx_cmd) { 
-            eprintln!("Serial error: {}", e); 
-        } 
-    });
+    // SERIAL (command ke Arduino; sampel juga dibaca kalau serial_mode = ingest)
+    let ingest = ingest.filter(|_| config::get().backend.serial_mode == "ingest");
+    serial::start(rx_cmd, ingest);
 
-    loop { thread::sleep(Duration::from_secs(60)); }
+    std::future::pending::<()>().await;
 }
 
+
 // ===============================
-//     SENSOR SERVER (Arduino → Rust)
+//   KONVERSI RECORD <-> TEKS / FRAME
 // ===============================
-fn sensor_server(history: Arc<Mutex<Vec<SensorRecord>>>) -> io::Result<()> {
-    let listener = TcpListener::bind(ARDUINO_WIFI_ADDR)?;
-    println!("SENSOR: Listening on {}", ARDUINO_WIFI_ADDR);
-
-    for stream in listener.incoming() {
-        let s = stream?;
-        let h = history.clone();
-        thread::spawn(move || {
-            if let Err(e) = forward_to_gui_and_store(s, h) {
-                eprintln!("forward error: {}", e);
-            }
-        });
+fn parse_sensor(raw: &str) -> Option<SensorRecord> {
+    let mut parts = raw.strip_prefix("SENSOR:")?.split(',').map(str::trim);
+    let mut values = [0f64; 7];
+    for v in values.iter_mut() {
+        // "nan" / "inf" dari Arduino ditolak: InfluxDB menolak field non-finite
+        *v = parts.next()?.parse().ok().filter(|x: &f64| x.is_finite())?;
     }
-    Ok(())
-}
-
-fn forward_to_gui_and_store(stream: TcpStream, history: Arc<Mutex<Vec<SensorRecord>>>) -> io::Result<()> {
-    let mut reader = BufReader::new(stream);
-    let mut line = String::new();
+    let state = parts.next()?.parse().ok()?;
+    let level = parts.next()?.parse().ok()?;
 
-    while reader.read_line(&mut line)? > 0 {
-        let data = line.trim().to_string();
-        if data.starts_with("SENSOR:") {
-            println!("DATA: {}", data);
-
-            if let Some(rec) = parse_sensor(&data) {
-                // Simpan ke history
-                {
-                    let mut h = history.lock().unwrap();
-                    h.push(rec.clone());
-                }
-
-                // AUTO SAVE + BROADCAST STATUS
-                write_influx(&rec);
+    Some(SensorRecord {
+        no2_gm: values[0],
+        ethanol_gm: values[1],
+        voc_gm: values[2],
+        co_gm: values[3],
+        co_mics: values[4],
+        ethanol_mics: values[5],
+        voc_mics: values[6],
+        state,
+        level,
+        timestamp: 0, // diisi parser pipeline (waktu terima)
+        seq: 0,
+        device_id: 0,
+    })
+}
 
-                // Kirim ke GUI
-                if let Ok(mut gui) = TcpStream::connect(GUI_DATA_ADDR) {
-                    let _ = gui.write_all(format!("{}\n", data).as_bytes());
-                } else {
-                    eprintln!("Could not connect to GUI at {}", GUI_DATA_ADDR);
-                }
-            }
-        }
-        line.clear();
-    }
-    Ok(())
+fn record_values(rec: &SensorRecord) -> [f64; 7] {
+    [
+        rec.no2_gm, rec.ethanol_gm, rec.voc_gm, rec.co_gm,
+        rec.co_mics, rec.ethanol_mics, rec.voc_mics,
+    ]
 }
 
-// ===============================
-//      PARSE SENSOR STRING
-// ===============================
-fn parse_sensor(raw: &str) -> Option<SensorRecord> {
-    let parts: Vec<&str> = raw.split(':').nth(1)?.split(',').collect();
-    if parts.len() < 9 { return None; }
+fn sensor_line(rec: &SensorRecord) -> String {
+    let v = record_values(rec);
+    format!(
+        "SENSOR:{},{},{},{},{},{},{},{},{}\n",
+        v[0], v[1], v[2], v[3], v[4], v[5], v[6], rec.state, rec.level
+    )
+}
 
+/// None = ada nilai non-finite (sensor error), diperlakukan seperti frame rusak.
+fn record_from_frame(f: &frame::Frame) -> Option<SensorRecord> {
+    if f.values.iter().any(|x| !x.is_finite()) {
+        return None;
+    }
+    let v = f.values.map(|x| x as f64);
     Some(SensorRecord {
-        no2_gm: parts[0].parse().ok()?,
-        ethanol_gm: parts[1].parse().ok()?,
-        voc_gm: parts[2].parse().ok()?,
-        co_gm: parts[3].parse().ok()?,
-        co_mics: parts[4].parse().ok()?,
-        ethanol_mics: parts[5].parse().ok()?,
-        voc_mics: parts[6].parse().ok()?,
-        state: parts[7].parse().ok()?,
-        level: parts[8].parse().ok()?,
-        timestamp: Utc::now().timestamp_nanos_opt()? as i128,
+        no2_gm: v[0],
+        ethanol_gm: v[1],
+        voc_gm: v[2],
+        co_gm: v[3],
+        co_mics: v[4],
+        ethanol_mics: v[5],
+        voc_mics: v[6],
+        state: f.state as i32,
+        level: f.level as i32,
+        // 0 = device tidak punya jam, diisi parser pipeline (waktu terima)
+        timestamp: f.timestamp_ns as i128,
+        seq: f.seq,
+        device_id: f.device_id,
     })
 }
 
+fn record_frame(rec: &SensorRecord) -> frame::Frame {
+    frame::Frame {
+        device_id: rec.device_id,
+        seq: rec.seq,
+        timestamp_ns: rec.timestamp as i64,
+        values: record_values(rec).map(|x| x as f32),
+        state: rec.state as i8,
+        level: rec.level as i8,
+    }
+}
+
 // ===============================
 //     COMMAND SERVER (GUI → Rust)
 // ===============================
-fn command_server(tx: mpsc::Sender<String>, history: Arc<Mutex<Vec<SensorRecord>>>) -> io::Result<()> {
-    let listener = TcpListener::bind(GUI_CMD_ADDR)?;
-    println!("COMMAND: Listening on {}", GUI_CMD_ADDR);
-
-    for stream in listener.incoming() {
-        let mut stream = stream?;
-        let mut buf = String::new();
-        stream.read_to_string(&mut buf)?;
-        let cmd = buf.trim().to_uppercase();
-
-        match cmd.as_str() {
-            "START_SAMPLING" | "STOP_SAMPLING" => {
-                let _ = tx.send(cmd.to_string());
-                println!("Command sent to Arduino: {}", cmd);
+async fn command_server(tx: mpsc::Sender<String>, history: Arc<History>, wal: Arc<Wal>) {
+    let addr = config::get().backend.command_addr.clone();
+    let listener = match TcpListener::bind(&addr).await {
+        Ok(l) => l,
+        Err(e) => {
+            eprintln!("Command server error: {}", e);
+            return;
+        }
+    };
+    println!("COMMAND: Listening on {}", addr);
+
+    // Satu task per client: client yang macet tidak menahan command lain
+    loop {
+        match listener.accept().await {
+            Ok((stream, _)) => {
+                tokio::spawn(handle_command(stream, tx.clone(), history.clone(), wal.clone()));
             }
-            "SAVE_INFLUX" | "SAVE_DATABASE" => {
-                println!("FORCE SAVE TO INFLUXDB triggered from GUI");
-                let data = history.lock().unwrap().clone();
-                let mut success_count = 0;
-                for rec in data.iter() {
-                    if write_influx(rec) {
-                        success_count += 1;
-                    }
-                }
-                // Kirim status akhir ke GUI
-                let final_status = if success_count == data.len() { "INFLUX:OK" } else { "INFLUX:ERROR" };
-                if let Ok(mut s) = TcpStream::connect(GUI_STATUS_ADDR) {
-                    let _ = s.write_all(final_status.as_bytes());
+            Err(e) => metrics::log_limited("warn", "command_accept", &e.to_string()),
+        }
+    }
+}
+
+async fn handle_command(mut stream: TcpStream, tx: mpsc::Sender<String>, history: Arc<History>, wal: Arc<Wal>) {
+    let mut buf = String::new();
+    let read = tokio::time::timeout(
+        Duration::from_secs(COMMAND_READ_SECS),
+        stream.read_to_string(&mut buf),
+    );
+    match read.await {
+        Ok(Ok(_)) => {}
+        Ok(Err(e)) => {
+            metrics::log_limited("warn", "command", &e.to_string());
+            return;
+        }
+        Err(_) => {
+            metrics::log_limited("warn", "command", "client did not close connection, dropped");
+            return;
+        }
+    }
+    let cmd = buf.trim().to_uppercase();
+
+    match cmd.as_str() {
+        "START_SAMPLING" | "STOP_SAMPLING" => {
+            let _ = tx.send(cmd.to_string());
+            println!("Command sent to Arduino: {}", cmd);
+        }
+        set if set.starts_with("SET_RATE") => {
+            // SET_RATE <hz>: rate sampling board, bertahan sampai fase berikutnya
+            // kalau performance.phase_rates aktif
+            match set["SET_RATE".len()..].trim().parse::<u32>() {
+                Ok(hz) if (1..=config::MAX_SAMPLE_RATE).contains(&hz) => {
+                    serial::set_rate(&tx, hz);
+                    println!("Command sent to Arduino: SET_RATE {}", hz);
                 }
-                println!("FORCE SAVE complete: {}/{} points saved", success_count, data.len());
+                _ => println!("Invalid SET_RATE (1..={} Hz): {}", config::MAX_SAMPLE_RATE, set),
             }
-            other => println!("Unknown command: {}", other),
         }
+        "SAVE_INFLUX" | "SAVE_DATABASE" => {
+            println!("FORCE SAVE TO INFLUXDB triggered from GUI");
+            // Append WAL blocking, jangan di worker async
+            let _ = tokio::task::spawn_blocking(move || save_influx(&history, &wal)).await;
+        }
+        other => println!("Unknown command: {}", other),
     }
-    Ok(())
 }
 
-// ===============================
-//   SERIAL WRITER (Rust → Arduino)
-// ===============================
-fn serial_sender(rx: mpsc::Receiver<String>) -> Result<(), Box<dyn std::error::Error>> {
-    println!("SERIAL: Opening {}...", SERIAL_PORT);
-    let mut port = serialport::new(SERIAL_PORT, BAUD_RATE)
-        .timeout(Duration::from_millis(100))
-        .open()?;
-
-    println!("SERIAL: Connected to Arduino!");
-
-    while let Ok(cmd) = rx.recv() {
-        let line = format!("{}\n", cmd);
-        port.write_all(line.as_bytes())?;
-        port.flush()?;
-        println!("→ Arduino: {}", cmd);
+fn save_influx(history: &History, wal: &Wal) {
+    // Semua record history diantrekan ulang; timestamp sama jadi
+    // point yang sudah ada di Influx hanya ditimpa, tidak dobel.
+    // Snapshot tidak menyalin record dan tidak menahan ingest.
+    let data = history.snapshot();
+    let mut queued = 0;
+    for rec in data.iter() {
+        if wal.append(&influx_line(rec)).is_ok() {
+            queued += 1;
+        }
+    }
+    if queued < data.len() {
+        send_status("INFLUX:ERROR");
+    }
+    println!("FORCE SAVE queued: {}/{} points", queued, data.len());
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn non_finite_samples_never_reach_influx() {
+        let rec = parse_sensor("SENSOR:1,2,3,4,5,6,7,2,1").unwrap();
+        assert_eq!((rec.co_gm, rec.voc_mics, rec.state), (4.0, 7.0, 2));
+        for bad in ["nan", "NaN", "inf", "-inf"] {
+            let line = format!("SENSOR:1,2,3,{},5,6,7,2,1", bad);
+            assert!(parse_sensor(&line).is_none(), "{}", line);
+        }
+
+        let mut f = frame::Frame {
+            device_id: 0,
+            seq: 1,
+            timestamp_ns: 1_700_000_000_000_000_000,
+            values: [1.0; 7],
+            state: 2,
+            level: 1,
+        };
+        assert!(record_from_frame(&f).is_some());
+        for bad in [f32::NAN, f32::INFINITY, f32::NEG_INFINITY] {
+            f.values[3] = bad;
+            assert!(record_from_frame(&f).is_none());
+        }
     }
-    Ok(())
-}
\ No newline at end of file
+}
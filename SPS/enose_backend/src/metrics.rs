@@ -0,0 +1,500 @@
+// ===============================
+//  METRICS (/metrics, FORMAT TEKS PROMETHEUS) + LOG RATE-LIMITED
+// ===============================
+// Counter global berbasis atomic supaya jalur per-sampel tidak perlu lock.
+// Endpoint GET /metrics di backend.metrics_addr (kosong = nonaktif) dilayani
+// thread std sendiri; GUI punya endpoint yang sama (metrics.py) dengan
+// prefix enose_gui_.
+
+use std::collections::HashMap;
+use std::io::{Read, Write};
+use std::net::{TcpListener, TcpStream};
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::{Arc, Mutex, OnceLock};
+use std::thread;
+use std::time::{Duration, Instant};
+
+use chrono::Utc;
+
+use crate::wal::Wal;
+
+const RATE_WINDOW_SECS: u64 = 5; // jendela hitung ingest_rate_hz
+const LOG_INTERVAL_SECS: u64 = 5; // minimum jarak log untuk event yang sama
+const SUMMARY_SECS: u64 = 60; // ringkasan ingest di log (pengganti log per sampel)
+
+pub static SAMPLES: AtomicU64 = AtomicU64::new(0);
+pub static PARSE_ERRORS: AtomicU64 = AtomicU64::new(0);
+pub static SAMPLES_LOST: AtomicU64 = AtomicU64::new(0);
+pub static GUI_SEND_ERRORS: AtomicU64 = AtomicU64::new(0);
+pub static GUI_BACKFILL: AtomicU64 = AtomicU64::new(0);
+pub static WAL_APPEND_ERRORS: AtomicU64 = AtomicU64::new(0);
+pub static INFLUX_BATCHES_OK: AtomicU64 = AtomicU64::new(0);
+pub static INFLUX_BATCHES_FAILED: AtomicU64 = AtomicU64::new(0);
+pub static INFLUX_POINTS: AtomicU64 = AtomicU64::new(0);
+pub static INFLUX_POINTS_REJECTED: AtomicU64 = AtomicU64::new(0);
+pub static HUB_SUBSCRIBERS: AtomicU64 = AtomicU64::new(0); // gauge
+pub static HUB_FRAMES_SENT: AtomicU64 = AtomicU64::new(0);
+pub static HUB_DROPPED: AtomicU64 = AtomicU64::new(0);
+pub static HUB_DISCONNECTS: AtomicU64 = AtomicU64::new(0);
+pub static WEB_CLIENTS: AtomicU64 = AtomicU64::new(0); // gauge
+pub static WEB_RECORDS_SENT: AtomicU64 = AtomicU64::new(0);
+pub static WEB_DROPPED: AtomicU64 = AtomicU64::new(0);
+pub static INGEST_CONNECTIONS: AtomicU64 = AtomicU64::new(0); // gauge
+pub static SERIAL_CONNECTS: AtomicU64 = AtomicU64::new(0);
+pub static REQUESTED_RATE: AtomicU64 = AtomicU64::new(0); // gauge, Hz (0 = default firmware)
+pub static INFLUX_LATENCY: Histogram = Histogram::new();
+
+// Antrean antar stage pipeline relay (pipeline.rs) + antrean status ke GUI
+pub static STAGE_PARSER: Stage = Stage::new("parser");
+pub static STAGE_STORE: Stage = Stage::new("store");
+pub static STAGE_GUI: Stage = Stage::new("gui");
+pub static STAGE_STATUS: Stage = Stage::new("status");
+static STAGES: [&Stage; 4] = [&STAGE_PARSER, &STAGE_STORE, &STAGE_GUI, &STAGE_STATUS];
+
+static INGEST_RATE_BITS: AtomicU64 = AtomicU64::new(0); // f64 sebagai bit
+
+pub fn inc(counter: &AtomicU64) {
+    counter.fetch_add(1, Ordering::Relaxed);
+}
+
+// ------------------------------
+// HISTOGRAM LATENCY (detik)
+// ------------------------------
+const BUCKETS: [f64; 10] = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0];
+#[allow(clippy::declare_interior_mutable_const)]
+const ZERO: AtomicU64 = AtomicU64::new(0);
+
+pub struct Histogram {
+    counts: [AtomicU64; BUCKETS.len() + 1],
+    sum_us: AtomicU64,
+}
+
+impl Histogram {
+    const fn new() -> Self {
+        Histogram {
+            counts: [ZERO; BUCKETS.len() + 1],
+            sum_us: AtomicU64::new(0),
+        }
+    }
+
+    pub fn observe(&self, elapsed: Duration) {
+        let secs = elapsed.as_secs_f64();
+        let idx = BUCKETS
+            .iter()
+            .position(|&b| secs <= b)
+            .unwrap_or(BUCKETS.len());
+        self.counts[idx].fetch_add(1, Ordering::Relaxed);
+        self.sum_us
+            .fetch_add(elapsed.as_micros() as u64, Ordering::Relaxed);
+    }
+
+    fn render(&self, out: &mut String, name: &str, help: &str) {
+        header(out, name, help, "histogram");
+        let mut cumulative = 0;
+        for (i, count) in self.counts.iter().enumerate() {
+            cumulative += count.load(Ordering::Relaxed);
+            let le = BUCKETS.get(i).map_or("+Inf".to_string(), |b| b.to_string());
+            out.push_str(&format!(
+                "{}_bucket{{le=\"{}\"}} {}\n",
+                name, le, cumulative
+            ));
+        }
+        let sum = self.sum_us.load(Ordering::Relaxed) as f64 / 1e6;
+        out.push_str(&format!(
+            "{}_sum {}\n{}_count {}\n",
+            name, sum, name, cumulative
+        ));
+    }
+}
+
+// ------------------------------
+// STAGE PIPELINE (antrean terbatas)
+// ------------------------------
+/// Hitungan satu antrean: depth = masuk - keluar, dropped = ditolak karena
+/// penuh (hanya stage yang tidak boleh menahan producer).
+pub struct Stage {
+    name: &'static str,
+    capacity: AtomicU64,
+    enqueued: AtomicU64,
+    dequeued: AtomicU64,
+    dropped: AtomicU64,
+}
+
+impl Stage {
+    const fn new(name: &'static str) -> Self {
+        Stage {
+            name,
+            capacity: AtomicU64::new(0),
+            enqueued: AtomicU64::new(0),
+            dequeued: AtomicU64::new(0),
+            dropped: AtomicU64::new(0),
+        }
+    }
+
+    pub fn open(&self, capacity: usize) {
+        self.capacity.store(capacity as u64, Ordering::Relaxed);
+    }
+
+    pub fn enqueue(&self) {
+        inc(&self.enqueued);
+    }
+
+    pub fn dequeue(&self) {
+        inc(&self.dequeued);
+    }
+
+    pub fn overflow(&self) {
+        inc(&self.dropped);
+    }
+
+    fn depth(&self) -> u64 {
+        // dequeue bisa tercatat sebelum enqueue pasangannya
+        let out = self.dequeued.load(Ordering::Relaxed);
+        self.enqueued.load(Ordering::Relaxed).saturating_sub(out)
+    }
+}
+
+fn render_stages(out: &mut String) {
+    let series: [(&str, &str, &str, fn(&Stage) -> u64); 4] = [
+        (
+            "stage_queue_depth",
+            "Pesan yang menunggu di antrean stage",
+            "gauge",
+            |s| s.depth(),
+        ),
+        (
+            "stage_queue_capacity",
+            "Kapasitas antrean stage",
+            "gauge",
+            |s| s.capacity.load(Ordering::Relaxed),
+        ),
+        (
+            "stage_processed_total",
+            "Pesan yang sudah diambil stage dari antreannya",
+            "counter",
+            |s| s.dequeued.load(Ordering::Relaxed),
+        ),
+        (
+            "stage_dropped_total",
+            "Pesan dibuang karena antrean stage penuh",
+            "counter",
+            |s| s.dropped.load(Ordering::Relaxed),
+        ),
+    ];
+    for (name, help, kind, value) in series {
+        let name = format!("enose_backend_{}", name);
+        header(out, &name, help, kind);
+        for stage in STAGES {
+            out.push_str(&format!(
+                "{}{{stage=\"{}\"}} {}\n",
+                name,
+                stage.name,
+                value(stage)
+            ));
+        }
+    }
+}
+
+// ------------------------------
+// RENDER + SERVER
+// ------------------------------
+fn header(out: &mut String, name: &str, help: &str, kind: &str) {
+    out.push_str(&format!(
+        "# HELP {} {}\n# TYPE {} {}\n",
+        name, help, name, kind
+    ));
+}
+
+fn metric(out: &mut String, name: &str, help: &str, kind: &str, value: impl ToString) {
+    header(out, name, help, kind);
+    out.push_str(&format!("{} {}\n", name, value.to_string()));
+}
+
+pub fn render(wal: &Wal) -> String {
+    let load = |c: &AtomicU64| c.load(Ordering::Relaxed);
+    let st = wal.stats();
+    let mut out = String::new();
+    let counters = [
+        (
+            "samples_total",
+            "Sampel SENSOR valid dari Arduino",
+            &SAMPLES,
+        ),
+        (
+            "parse_errors_total",
+            "Baris SENSOR / frame biner yang gagal diparse",
+            &PARSE_ERRORS,
+        ),
+        (
+            "samples_lost_total",
+            "Sampel hilang menurut seq frame biner",
+            &SAMPLES_LOST,
+        ),
+        (
+            "gui_send_errors_total",
+            "Sampel yang gagal dikirim ke GUI",
+            &GUI_SEND_ERRORS,
+        ),
+        (
+            "gui_backfill_records_total",
+            "Record yang disusulkan ke GUI saat reconnect",
+            &GUI_BACKFILL,
+        ),
+        (
+            "wal_append_errors_total",
+            "Record yang gagal ditulis ke WAL",
+            &WAL_APPEND_ERRORS,
+        ),
+        (
+            "influx_batches_total",
+            "Batch yang berhasil ditulis ke InfluxDB",
+            &INFLUX_BATCHES_OK,
+        ),
+        (
+            "influx_batch_failures_total",
+            "Batch InfluxDB yang gagal (di-retry)",
+            &INFLUX_BATCHES_FAILED,
+        ),
+        (
+            "influx_points_total",
+            "Point yang berhasil ditulis ke InfluxDB",
+            &INFLUX_POINTS,
+        ),
+        (
+            "influx_rejected_points_total",
+            "Point yang ditolak InfluxDB (4xx), dipindah ke rejected.lp",
+            &INFLUX_POINTS_REJECTED,
+        ),
+        (
+            "hub_frames_sent_total",
+            "Frame yang terkirim ke subscriber hub",
+            &HUB_FRAMES_SENT,
+        ),
+        (
+            "hub_dropped_total",
+            "Frame dibuang karena antrean subscriber penuh (drop_oldest)",
+            &HUB_DROPPED,
+        ),
+        (
+            "hub_disconnects_total",
+            "Subscriber diputus karena antrean penuh (disconnect)",
+            &HUB_DISCONNECTS,
+        ),
+        (
+            "web_records_sent_total",
+            "Record yang terkirim ke client WebSocket",
+            &WEB_RECORDS_SENT,
+        ),
+        (
+            "web_dropped_total",
+            "Record dilewati client WebSocket yang tertinggal",
+            &WEB_DROPPED,
+        ),
+        (
+            "serial_connects_total",
+            "Port serial berhasil dibuka (termasuk reconnect)",
+            &SERIAL_CONNECTS,
+        ),
+    ];
+    for (name, help, counter) in counters {
+        metric(
+            &mut out,
+            &format!("enose_backend_{}", name),
+            help,
+            "counter",
+            load(counter),
+        );
+    }
+    metric(
+        &mut out,
+        "enose_backend_ingest_rate_hz",
+        "Laju sampel masuk (rata-rata 5 detik)",
+        "gauge",
+        f64::from_bits(INGEST_RATE_BITS.load(Ordering::Relaxed)),
+    );
+    metric(
+        &mut out,
+        "enose_backend_wal_depth",
+        "Record di WAL yang belum masuk InfluxDB",
+        "gauge",
+        st.depth,
+    );
+    metric(
+        &mut out,
+        "enose_backend_wal_lag_seconds",
+        "Umur record tertua di WAL",
+        "gauge",
+        st.lag_secs,
+    );
+    metric(
+        &mut out,
+        "enose_backend_wal_bytes",
+        "Ukuran segment WAL di disk",
+        "gauge",
+        st.bytes,
+    );
+    metric(
+        &mut out,
+        "enose_backend_hub_subscribers",
+        "Subscriber hub yang terhubung",
+        "gauge",
+        HUB_SUBSCRIBERS.load(Ordering::Relaxed),
+    );
+    metric(
+        &mut out,
+        "enose_backend_web_clients",
+        "Client WebSocket yang terhubung",
+        "gauge",
+        WEB_CLIENTS.load(Ordering::Relaxed),
+    );
+    metric(
+        &mut out,
+        "enose_backend_requested_sample_rate_hz",
+        "Rate sampling terakhir yang diminta ke board (0 = default firmware)",
+        "gauge",
+        REQUESTED_RATE.load(Ordering::Relaxed),
+    );
+    metric(
+        &mut out,
+        "enose_backend_ingest_connections",
+        "Koneksi Arduino yang terhubung (TCP + serial ingest)",
+        "gauge",
+        INGEST_CONNECTIONS.load(Ordering::Relaxed),
+    );
+    render_stages(&mut out);
+    INFLUX_LATENCY.render(
+        &mut out,
+        "enose_backend_influx_batch_seconds",
+        "Latency write batch ke InfluxDB",
+    );
+    out
+}
+
+fn handle(mut stream: TcpStream, wal: &Wal) {
+    let _ = stream.set_read_timeout(Some(Duration::from_secs(2)));
+    let mut buf = [0u8; 1024];
+    let n = stream.read(&mut buf).unwrap_or(0);
+    let request = String::from_utf8_lossy(&buf[..n]);
+    let path = request.split_whitespace().nth(1).unwrap_or("");
+    let response = if request.starts_with("GET ") && path.split('?').next() == Some("/metrics") {
+        let body = render(wal);
+        format!(
+            "HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\nContent-Length: {}\r\nConnection: close\r\n\r\n{}",
+            body.len(),
+            body
+        )
+    } else {
+        "HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".to_string()
+    };
+    let _ = stream.write_all(response.as_bytes());
+}
+
+/// Endpoint /metrics + thread hitung ingest rate. Alamat kosong = nonaktif.
+pub fn start(addr: String, wal: Arc<Wal>) {
+    thread::spawn(rate_loop);
+    if addr.is_empty() {
+        return;
+    }
+    let listener = match TcpListener::bind(&addr) {
+        Ok(l) => l,
+        Err(e) => {
+            log(
+                "warn",
+                "metrics_server",
+                &format!("bind {} failed: {}", addr, e),
+            );
+            return;
+        }
+    };
+    log(
+        "info",
+        "metrics_server",
+        &format!("listening on http://{}/metrics", addr),
+    );
+    thread::spawn(move || {
+        for stream in listener.incoming().flatten() {
+            handle(stream, &wal);
+        }
+    });
+}
+
+fn rate_loop() {
+    let mut last = SAMPLES.load(Ordering::Relaxed);
+    let mut at = Instant::now();
+    let mut summary = (last, Instant::now());
+    loop {
+        thread::sleep(Duration::from_secs(RATE_WINDOW_SECS));
+        let now = SAMPLES.load(Ordering::Relaxed);
+        let rate = (now - last) as f64 / at.elapsed().as_secs_f64();
+        INGEST_RATE_BITS.store(rate.to_bits(), Ordering::Relaxed);
+        last = now;
+        at = Instant::now();
+
+        if summary.1.elapsed() >= Duration::from_secs(SUMMARY_SECS) {
+            if now > summary.0 {
+                log(
+                    "info",
+                    "ingest",
+                    &format!(
+                        "samples={} rate_hz={:.1} parse_errors={} gui_send_errors={}",
+                        now - summary.0,
+                        rate,
+                        PARSE_ERRORS.load(Ordering::Relaxed),
+                        GUI_SEND_ERRORS.load(Ordering::Relaxed)
+                    ),
+                );
+            }
+            summary = (now, Instant::now());
+        }
+    }
+}
+
+// ------------------------------
+// LOG TERSTRUKTUR
+// ------------------------------
+/// Satu baris key=value: ts=... level=... event=... msg="..."
+pub fn log(level: &str, event: &str, msg: &str) {
+    let ts = Utc::now().format("%Y-%m-%dT%H:%M:%S%.6fZ");
+    if msg.is_empty() {
+        println!("ts={} level={} event={}", ts, level, event);
+    } else {
+        println!("ts={} level={} event={} msg={:?}", ts, level, event, msg);
+    }
+}
+
+static LAST_LOG: OnceLock<Mutex<HashMap<String, (Instant, u64)>>> = OnceLock::new();
+
+/// Seperti log(), tapi maksimal satu baris per 5 detik per event; baris
+/// berikutnya menyebut berapa yang di-suppress.
+pub fn log_limited(level: &str, event: &str, msg: &str) {
+    let interval = Duration::from_secs(LOG_INTERVAL_SECS);
+    let suppressed = {
+        let mut last = LAST_LOG
+            .get_or_init(|| Mutex::new(HashMap::new()))
+            .lock()
+            .unwrap();
+        match last.get_mut(event) {
+            Some((at, count)) if at.elapsed() < interval => {
+                *count += 1;
+                return;
+            }
+            Some((at, count)) => {
+                *at = Instant::now();
+                std::mem::take(count)
+            }
+            None => {
+                last.insert(event.to_string(), (Instant::now(), 0));
+                0
+            }
+        }
+    };
+    if suppressed > 0 {
+        log(
+            level,
+            event,
+            &format!("{} (suppressed={})", msg, suppressed),
+        );
+    } else {
+        log(level, event, msg);
+    }
+}
@@ -0,0 +1,648 @@
+// ===============================
+//  PIPELINE RELAY (tokio + channel terbatas)
+// ===============================
+//   ingest (task per koneksi Arduino / thread serial) --chunk--> parser --batch--> store --batch--> gui
+//   store: WAL (dibaca influx_writer) + seq relay + history + hub/web + rate per fase
+//
+// Tiap panah adalah mpsc terbatas dengan metrics sendiri (enose_backend_stage_*
+// di /metrics). Ingest TCP dan parser adalah task async, jadi menambah rig tidak
+// menambah thread; port serial (serial.rs) masuk lewat Ingest yang sama. Store (append + fsync WAL) dan GUI publisher (socket GUI)
+// melakukan I/O blocking di thread masing-masing.
+//
+// Antrean parser / store penuh = backpressure sampai ke socket Arduino, tidak
+// ada sampel yang dibuang. Antrean GUI penuh = batch dibuang; GUI publisher
+// menyusulkan seq yang bolong dari history (seperti backfill saat reconnect),
+// jadi GUI yang lambat tidak pernah menahan WAL / Influx.
+
+use std::collections::HashMap;
+use std::io::{self, BufRead, BufReader, Write};
+use std::net::TcpStream;
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::Arc;
+use std::thread;
+use std::time::{Duration, Instant};
+
+use chrono::Utc;
+use tokio::io::{AsyncBufReadExt, AsyncReadExt, AsyncWriteExt};
+use tokio::net::TcpListener;
+use tokio::sync::mpsc;
+
+use crate::history::History;
+use crate::hub::Hub;
+use crate::metrics::{self, Stage};
+use crate::serial::RateControl;
+use crate::wal::Wal;
+use crate::web::Web;
+use crate::{
+    config, frame, influx_line, parse_sensor, record_frame, record_from_frame, sensor_line,
+    SensorRecord,
+};
+
+const PARSER_QUEUE: usize = 1024; // chunk dari semua koneksi Arduino
+const STORE_QUEUE: usize = 1024; // batch record hasil parse
+const GUI_QUEUE: usize = 256; // batch record yang menunggu dikirim ke GUI
+const READ_CHUNK: usize = 4096;
+const MAX_LINE: usize = 64 * 1024; // baris teks tanpa newline sepanjang ini dibuang
+const STAMP_SPREAD_MS: i128 = 1000; // jeda antar chunk lebih dari ini = tidak disebar
+
+// KONEKSI DATA KE GUI (persisten; frame biner dinegosiasikan saat connect)
+const GUI_HANDSHAKE_MS: u64 = 500; // tunggu ACK GUI sebelum fallback ke teks
+const GUI_RECONNECT_MS: u64 = 1000; // jeda connect ulang saat GUI belum jalan
+const GUI_WRITE_TIMEOUT_SECS: u64 = 10; // GUI macet lebih lama dari ini diputus
+const GUI_BACKFILL_MAX: usize = 1_000_000; // record maksimum yang disusulkan saat reconnect
+const GUI_BATCH_MAX: usize = 4096; // record per write ke GUI
+
+/// Tujuan tiap sampel; dipakai bersama semua koneksi Arduino.
+pub struct Sinks {
+    pub history: Arc<History>,
+    pub wal: Arc<Wal>,
+    pub hub: Option<Arc<Hub>>,
+    pub web: Option<Arc<Web>>,
+    pub rate: RateControl, // SET_RATE per fase dari field state
+}
+
+enum Chunk {
+    Data {
+        conn: u64,
+        binary: bool,
+        bytes: Vec<u8>,
+    },
+    Closed {
+        conn: u64,
+    },
+}
+
+/// Pintu masuk byte mentah ke parser, dipakai listener TCP dan reader serial.
+/// Tiap koneksi (id dari `open`) punya state parser sendiri.
+#[derive(Clone)]
+pub struct Ingest {
+    tx: mpsc::Sender<Chunk>,
+    next_conn: Arc<AtomicU64>,
+}
+
+impl Ingest {
+    pub fn open(&self) -> u64 {
+        metrics::INGEST_CONNECTIONS.fetch_add(1, Ordering::Relaxed);
+        self.next_conn.fetch_add(1, Ordering::Relaxed) + 1
+    }
+
+    async fn data(&self, conn: u64, binary: bool, bytes: Vec<u8>) -> bool {
+        let chunk = Chunk::Data {
+            conn,
+            binary,
+            bytes,
+        };
+        send(&self.tx, &metrics::STAGE_PARSER, chunk).await
+    }
+
+    async fn close(&self, conn: u64) {
+        metrics::INGEST_CONNECTIONS.fetch_sub(1, Ordering::Relaxed);
+        send(&self.tx, &metrics::STAGE_PARSER, Chunk::Closed { conn }).await;
+    }
+
+    /// Seperti `data`, untuk thread di luar runtime tokio (serial).
+    pub fn data_blocking(&self, conn: u64, binary: bool, bytes: Vec<u8>) -> bool {
+        let chunk = Chunk::Data {
+            conn,
+            binary,
+            bytes,
+        };
+        let ok = self.tx.blocking_send(chunk).is_ok();
+        if ok {
+            metrics::STAGE_PARSER.enqueue();
+        }
+        ok
+    }
+
+    pub fn close_blocking(&self, conn: u64) {
+        metrics::INGEST_CONNECTIONS.fetch_sub(1, Ordering::Relaxed);
+        if self.tx.blocking_send(Chunk::Closed { conn }).is_ok() {
+            metrics::STAGE_PARSER.enqueue();
+        }
+    }
+}
+
+/// Bind backend.arduino_addr lalu jalankan semua stage. Harus dipanggil di
+/// dalam runtime tokio. Hasil: Ingest untuk sumber lain (port serial).
+pub async fn start(sinks: Sinks) -> io::Result<Ingest> {
+    let addr = config::get().backend.arduino_addr.clone();
+    let listener = TcpListener::bind(&addr).await?;
+    println!("SENSOR: Listening on {}", addr);
+
+    let (chunk_tx, chunk_rx) = mpsc::channel(PARSER_QUEUE);
+    let (store_tx, store_rx) = mpsc::channel(STORE_QUEUE);
+    let (gui_tx, gui_rx) = mpsc::channel(GUI_QUEUE);
+    metrics::STAGE_PARSER.open(PARSER_QUEUE);
+    metrics::STAGE_STORE.open(STORE_QUEUE);
+    metrics::STAGE_GUI.open(GUI_QUEUE);
+
+    let history = sinks.history.clone();
+    thread::Builder::new()
+        .name("enose-gui".into())
+        .spawn(move || gui_publisher(gui_rx, history))?;
+    thread::Builder::new()
+        .name("enose-store".into())
+        .spawn(move || store(store_rx, gui_tx, sinks))?;
+    tokio::spawn(parser(chunk_rx, store_tx));
+    let ingest = Ingest {
+        tx: chunk_tx,
+        next_conn: Arc::new(AtomicU64::new(0)),
+    };
+    tokio::spawn(accept(listener, ingest.clone()));
+    Ok(ingest)
+}
+
+/// Ingest yang hanya diteruskan ke parser (tanpa store / WAL / GUI), untuk test
+/// reader serial. Harus dipanggil di dalam runtime tokio.
+#[cfg(test)]
+pub fn parse_only() -> (Ingest, mpsc::Receiver<Vec<SensorRecord>>) {
+    let (chunk_tx, chunk_rx) = mpsc::channel(PARSER_QUEUE);
+    let (store_tx, store_rx) = mpsc::channel(STORE_QUEUE);
+    tokio::spawn(parser(chunk_rx, store_tx));
+    let ingest = Ingest {
+        tx: chunk_tx,
+        next_conn: Arc::new(AtomicU64::new(0)),
+    };
+    (ingest, store_rx)
+}
+
+/// Kirim ke stage berikutnya; menunggu kalau antrean penuh (backpressure).
+/// false = stage berikutnya sudah berhenti.
+async fn send<T>(tx: &mpsc::Sender<T>, stage: &Stage, item: T) -> bool {
+    let ok = tx.send(item).await.is_ok();
+    if ok {
+        stage.enqueue();
+    }
+    ok
+}
+
+// ------------------------------
+// INGEST TCP (task per koneksi Arduino)
+// ------------------------------
+async fn accept(listener: TcpListener, ingest: Ingest) {
+    loop {
+        let stream = match listener.accept().await {
+            Ok((stream, _)) => stream,
+            Err(e) => {
+                metrics::log_limited("warn", "sensor_accept", &e.to_string());
+                tokio::time::sleep(Duration::from_millis(100)).await;
+                continue;
+            }
+        };
+        let ingest = ingest.clone();
+        tokio::spawn(async move {
+            let conn = ingest.open();
+            if let Err(e) = forward(stream, conn, &ingest).await {
+                eprintln!("forward error: {}", e);
+            }
+            ingest.close(conn).await;
+        });
+    }
+}
+
+async fn forward(stream: tokio::net::TcpStream, conn: u64, ingest: &Ingest) -> io::Result<()> {
+    let mut reader = tokio::io::BufReader::new(stream);
+    let mut line = Vec::new();
+
+    // Baris pertama menentukan protokol: HELLO -> frame biner, selain itu teks SENSOR:
+    if reader.read_until(b'\n', &mut line).await? == 0 {
+        return Ok(());
+    }
+    let binary = String::from_utf8_lossy(&line).trim() == frame::HELLO;
+    if binary {
+        let ack = format!("{}\n", frame::ACK);
+        reader.get_mut().write_all(ack.as_bytes()).await?;
+        metrics::log("info", "sensor_protocol", "binary frames");
+        line.clear();
+    }
+
+    // Byte mentah diteruskan apa adanya; pemecahan baris / frame di parser
+    let mut bytes = line;
+    loop {
+        if !bytes.is_empty() && !ingest.data(conn, binary, bytes).await {
+            return Ok(());
+        }
+        bytes = Vec::with_capacity(READ_CHUNK);
+        if reader.read_buf(&mut bytes).await? == 0 {
+            return Ok(());
+        }
+    }
+}
+
+// ------------------------------
+// PARSER (satu task untuk semua koneksi)
+// ------------------------------
+enum Conn {
+    Text(Vec<u8>), // sisa baris yang belum lengkap
+    Binary(frame::Decoder, frame::SeqTracker),
+}
+
+/// Waktu terima untuk sampel tanpa timestamp device (baris teks, frame dengan
+/// timestamp 0). Sampel satu chunk disebar rata sejak chunk sebelumnya dari
+/// koneksi yang sama, bukan diberi waktu yang sama, supaya jarak antar sampel
+/// tetap mengikuti rate board (rate bisa berubah per fase, lihat serial.rs).
+#[derive(Default)]
+struct Clock {
+    last: Option<i128>,
+}
+
+impl Clock {
+    fn stamp(&mut self, recs: &mut [SensorRecord]) {
+        let n = recs.iter().filter(|r| r.timestamp <= 0).count() as i128;
+        if n == 0 {
+            return;
+        }
+        let now = Utc::now().timestamp_nanos_opt().unwrap_or(0) as i128;
+        // Tanpa acuan (chunk pertama / setelah jeda): tetap unik dan urut,
+        // timestamp sama = point Influx saling menimpa
+        let from = match self.last {
+            Some(last) if last < now && now - last < STAMP_SPREAD_MS * 1_000_000 => last,
+            _ => now - n,
+        };
+        let mut i = 0;
+        for rec in recs.iter_mut().filter(|r| r.timestamp <= 0) {
+            i += 1;
+            rec.timestamp = from + (now - from) * i / n;
+        }
+        self.last = Some(now);
+    }
+}
+
+async fn parser(mut rx: mpsc::Receiver<Chunk>, tx: mpsc::Sender<Vec<SensorRecord>>) {
+    let mut conns: HashMap<u64, (Conn, Clock)> = HashMap::new();
+    let mut frames = Vec::new();
+
+    while let Some(chunk) = rx.recv().await {
+        metrics::STAGE_PARSER.dequeue();
+        let mut batch = Vec::new();
+        match chunk {
+            Chunk::Data {
+                conn,
+                binary,
+                bytes,
+            } => {
+                let (state, clock) = conns.entry(conn).or_insert_with(|| {
+                    let state = if binary {
+                        Conn::Binary(frame::Decoder::default(), frame::SeqTracker::default())
+                    } else {
+                        Conn::Text(Vec::new())
+                    };
+                    (state, Clock::default())
+                });
+                match state {
+                    Conn::Text(pending) => parse_lines(pending, &bytes, &mut batch),
+                    Conn::Binary(decoder, tracker) => {
+                        parse_frames(decoder, tracker, &bytes, &mut frames, &mut batch)
+                    }
+                }
+                clock.stamp(&mut batch);
+            }
+            // Baris terakhir tanpa newline tetap dipakai, seperti read_line
+            Chunk::Closed { conn } => {
+                if let Some((Conn::Text(pending), mut clock)) = conns.remove(&conn) {
+                    parse_line(&pending, &mut batch);
+                    clock.stamp(&mut batch);
+                }
+            }
+        }
+        if !batch.is_empty() && !send(&tx, &metrics::STAGE_STORE, batch).await {
+            return;
+        }
+    }
+}
+
+fn parse_lines(pending: &mut Vec<u8>, bytes: &[u8], out: &mut Vec<SensorRecord>) {
+    pending.extend_from_slice(bytes);
+    let Some(end) = pending.iter().rposition(|&b| b == b'\n') else {
+        if pending.len() > MAX_LINE {
+            pending.clear();
+            metrics::inc(&metrics::PARSE_ERRORS);
+            metrics::log_limited("warn", "parse_error", "line too long");
+        }
+        return;
+    };
+    for line in pending[..end].split(|&b| b == b'\n') {
+        parse_line(line, out);
+    }
+    pending.drain(..=end);
+}
+
+fn parse_line(line: &[u8], out: &mut Vec<SensorRecord>) {
+    let line = String::from_utf8_lossy(line);
+    let data = line.trim();
+    if data.starts_with("SENSOR:") {
+        // Tidak ada log per sampel; jumlah/laju ada di /metrics + ringkasan berkala
+        match parse_sensor(data) {
+            Some(rec) => out.push(rec),
+            None => {
+                metrics::inc(&metrics::PARSE_ERRORS);
+                metrics::log_limited("warn", "parse_error", data);
+            }
+        }
+    }
+}
+
+fn parse_frames(
+    decoder: &mut frame::Decoder,
+    tracker: &mut frame::SeqTracker,
+    bytes: &[u8],
+    frames: &mut Vec<frame::Frame>,
+    out: &mut Vec<SensorRecord>,
+) {
+    let corrupt = decoder.feed(bytes, frames);
+    if corrupt > 0 {
+        metrics::PARSE_ERRORS.fetch_add(corrupt, Ordering::Relaxed);
+        metrics::log_limited(
+            "warn",
+            "frame_corrupt",
+            &format!("{} frame(s) skipped", corrupt),
+        );
+    }
+    for f in frames.drain(..) {
+        let lost = tracker.update(f.seq);
+        if lost > 0 {
+            metrics::SAMPLES_LOST.fetch_add(lost, Ordering::Relaxed);
+            metrics::log_limited(
+                "warn",
+                "sample_loss",
+                &format!("{} sample(s) missing before seq {}", lost, f.seq),
+            );
+        }
+        match record_from_frame(&f) {
+            Some(rec) => out.push(rec),
+            None => {
+                metrics::inc(&metrics::PARSE_ERRORS);
+                metrics::log_limited(
+                    "warn",
+                    "parse_error",
+                    &format!("non-finite value in frame seq {}", f.seq),
+                );
+            }
+        }
+    }
+}
+
+// ------------------------------
+// STORE (thread sendiri: WAL fsync blocking)
+// ------------------------------
+fn store(
+    mut rx: mpsc::Receiver<Vec<SensorRecord>>,
+    gui: mpsc::Sender<Vec<SensorRecord>>,
+    mut sinks: Sinks,
+) {
+    let mut next_seq: u32 = 0;
+    while let Some(mut batch) = rx.blocking_recv() {
+        metrics::STAGE_STORE.dequeue();
+        metrics::SAMPLES.fetch_add(batch.len() as u64, Ordering::Relaxed);
+
+        for rec in batch.iter_mut() {
+            // AUTO SAVE: antre di WAL, dikirim ke Influx oleh influx_writer
+            if let Err(e) = sinks.wal.append(&influx_line(rec)) {
+                metrics::inc(&metrics::WAL_APPEND_ERRORS);
+                metrics::log_limited("error", "wal_append", &e.to_string());
+            }
+            // Seq relay hanya diberi di sini: urutan seq = urutan history =
+            // urutan antrean GUI, jadi backfill tidak dobel dan tidak bolong.
+            rec.seq = next_seq;
+            next_seq = next_seq.wrapping_add(1);
+        }
+        let retention = config::get().performance.history_retention;
+        sinks.history.extend(&batch, retention);
+        sinks.rate.observe(&batch);
+
+        // Subscriber hub + client WebSocket (tidak pernah menunggu consumer)
+        for rec in &batch {
+            if let Some(hub) = &sinks.hub {
+                hub.publish(&record_frame(rec));
+            }
+            if let Some(web) = &sinks.web {
+                web.publish(rec);
+            }
+        }
+
+        // Antrean GUI penuh: buang, GUI publisher menyusulkan dari history
+        match gui.try_send(batch) {
+            Ok(()) => metrics::STAGE_GUI.enqueue(),
+            Err(_) => metrics::STAGE_GUI.overflow(),
+        }
+    }
+}
+
+// ------------------------------
+// GUI PUBLISHER (thread sendiri: socket GUI blocking)
+// ------------------------------
+fn gui_publisher(mut rx: mpsc::Receiver<Vec<SensorRecord>>, history: Arc<History>) {
+    let mut gui = GuiLink::new(history);
+    while let Some(mut batch) = rx.blocking_recv() {
+        metrics::STAGE_GUI.dequeue();
+        // Gabungkan batch yang sudah menunggu jadi satu write
+        while batch.len() < GUI_BATCH_MAX {
+            match rx.try_recv() {
+                Ok(more) => {
+                    metrics::STAGE_GUI.dequeue();
+                    batch.extend(more);
+                }
+                Err(_) => break,
+            }
+        }
+        gui.send(&batch);
+        if rx.is_empty() {
+            gui.catch_up();
+        }
+    }
+}
+
+struct GuiLink {
+    stream: Option<TcpStream>,
+    binary: bool,
+    next_attempt: Instant,
+    last_sent: Option<u32>, // seq terakhir yang sudah dimiliki GUI (None = belum tahu)
+    session: u64,           // id sesi relay; seq hanya bermakna dalam satu sesi
+    history: Arc<History>,
+}
+
+impl GuiLink {
+    fn new(history: Arc<History>) -> Self {
+        GuiLink {
+            stream: None,
+            binary: false,
+            next_attempt: Instant::now(),
+            last_sent: None,
+            session: Utc::now().timestamp_millis() as u64,
+            history,
+        }
+    }
+
+    fn connect(&mut self, addr: &str) -> io::Result<()> {
+        let mut stream = TcpStream::connect(addr)?;
+        stream.set_nodelay(true)?;
+        // Tawarkan frame biner; GUI versi lama tidak membalas -> tetap teks
+        stream.write_all(format!("{}\n", frame::HELLO).as_bytes())?;
+        stream.set_read_timeout(Some(Duration::from_millis(GUI_HANDSHAKE_MS)))?;
+        let mut reply = String::new();
+        let mut resume = String::new();
+        let binary = {
+            // GUI yang mendukung backfill mengirim RESUME langsung setelah ACK
+            let mut reader = BufReader::new(&stream);
+            let binary = reader.read_line(&mut reply).is_ok() && reply.trim() == frame::ACK;
+            if binary && reader.read_line(&mut resume).is_err() {
+                resume.clear();
+            }
+            binary
+        };
+        stream.set_read_timeout(None)?;
+        stream.set_write_timeout(Some(Duration::from_secs(GUI_WRITE_TIMEOUT_SECS)))?;
+        self.last_sent = None;
+        let backfill = if resume.starts_with(frame::RESUME) {
+            self.backfill(&mut stream, resume.trim())?
+        } else {
+            0
+        };
+        metrics::log(
+            "info",
+            "gui_connected",
+            &format!(
+                "{} ({}, backfill {})",
+                addr,
+                if binary { "binary" } else { "text" },
+                backfill
+            ),
+        );
+        self.stream = Some(stream);
+        self.binary = binary;
+        Ok(())
+    }
+
+    /// Balas RESUME: baris SESSION lalu semua record setelah seq terakhir GUI
+    /// dalam satu write. Sesi beda (relay restart) / GUI baru = tanpa backfill.
+    fn backfill(&mut self, stream: &mut TcpStream, resume: &str) -> io::Result<usize> {
+        let mut words = resume.split_whitespace().skip(1);
+        let session = words.next().and_then(|w| w.parse::<u64>().ok());
+        let since = words.next().and_then(|w| w.parse::<u32>().ok());
+        let h = self.history.snapshot();
+        let (from, to) = match since {
+            Some(seq) if session == Some(self.session) => {
+                let from = h.partition_point(|r| r.seq <= seq);
+                let from = from.max(h.len().saturating_sub(GUI_BACKFILL_MAX));
+                let to = h.len();
+                self.last_sent = Some(if to > from { h.get(to - 1).seq } else { seq });
+                (from, to)
+            }
+            _ => (0, 0),
+        };
+        let n = to - from;
+        let mut out = format!("{} {} {}\n", frame::SESSION, self.session, n).into_bytes();
+        out.reserve(n * frame::FRAME_SIZE);
+        for rec in h.range(from, to) {
+            out.extend_from_slice(&record_frame(rec).encode());
+        }
+        stream.write_all(&out)?;
+        metrics::GUI_BACKFILL.fetch_add(n as u64, Ordering::Relaxed);
+        Ok(n)
+    }
+
+    fn encode(&self, rec: &SensorRecord, out: &mut Vec<u8>) {
+        if self.binary {
+            out.extend_from_slice(&record_frame(rec).encode());
+        } else {
+            out.extend_from_slice(sensor_line(rec).as_bytes());
+        }
+    }
+
+    fn send(&mut self, batch: &[SensorRecord]) {
+        let addr = config::get().gui_data_addr();
+        // Batch ke socket yang sudah ditutup GUI tidak error di write pertama;
+        // cek dulu supaya langsung reconnect + backfill
+        if self.stream.as_ref().is_some_and(peer_closed) {
+            self.stream = None;
+            metrics::log_limited("warn", "gui_send", &format!("GUI at {} disconnected", addr));
+        }
+        if self.stream.is_none() {
+            // Jangan coba connect tiap batch saat GUI belum jalan
+            if Instant::now() < self.next_attempt {
+                metrics::GUI_SEND_ERRORS.fetch_add(batch.len() as u64, Ordering::Relaxed);
+                return;
+            }
+            if let Err(e) = self.connect(&addr) {
+                self.next_attempt = Instant::now() + Duration::from_millis(GUI_RECONNECT_MS);
+                metrics::GUI_SEND_ERRORS.fetch_add(batch.len() as u64, Ordering::Relaxed);
+                metrics::log_limited(
+                    "warn",
+                    "gui_send",
+                    &format!("could not connect to GUI at {}: {}", addr, e),
+                );
+                return;
+            }
+        }
+
+        self.write(batch, &addr);
+    }
+
+    /// Susulkan record history yang belum dimiliki GUI (batch dibuang saat
+    /// antrean GUI penuh). Dipanggil saat antrean kosong.
+    fn catch_up(&mut self) {
+        if self.stream.is_some() {
+            let addr = config::get().gui_data_addr();
+            self.write(&[], &addr);
+        }
+    }
+
+    /// Tulis `batch` dalam satu write. Record yang sudah ikut backfill
+    /// dilewati; seq yang bolong sejak last_sent diambil dari history.
+    fn write(&mut self, batch: &[SensorRecord], addr: &str) {
+        let fresh = match self.last_sent {
+            Some(last) => &batch[batch.partition_point(|r| r.seq <= last)..],
+            None => batch,
+        };
+        let first = fresh.first().map(|r| r.seq);
+        let mut last = fresh.last().map(|r| r.seq);
+        let mut out = Vec::with_capacity(fresh.len() * frame::FRAME_SIZE);
+        if let Some(since) = self.last_sent {
+            if first.map_or(true, |f| f > since.wrapping_add(1)) {
+                let h = self.history.snapshot();
+                let from = h.partition_point(|r| r.seq <= since);
+                let to = first
+                    .map_or(h.len(), |f| h.partition_point(|r| r.seq < f))
+                    .max(from);
+                for rec in h.range(from, to) {
+                    self.encode(rec, &mut out);
+                }
+                if first.is_none() && to > from {
+                    last = Some(h.get(to - 1).seq);
+                }
+                metrics::GUI_BACKFILL.fetch_add((to - from) as u64, Ordering::Relaxed);
+            }
+        }
+        for rec in fresh {
+            self.encode(rec, &mut out);
+        }
+        if out.is_empty() {
+            return;
+        }
+
+        let result = self.stream.as_mut().unwrap().write_all(&out);
+        match result {
+            Ok(()) => self.last_sent = last,
+            Err(e) => {
+                self.stream = None;
+                metrics::GUI_SEND_ERRORS.fetch_add(fresh.len() as u64, Ordering::Relaxed);
+                metrics::log_limited(
+                    "warn",
+                    "gui_send",
+                    &format!("GUI at {} disconnected: {}", addr, e),
+                );
+            }
+        }
+    }
+}
+
+/// GUI tidak mengirim apa-apa setelah RESUME, jadi read 0 byte = koneksi ditutup.
+fn peer_closed(stream: &TcpStream) -> bool {
+    let mut buf = [0u8; 1];
+    if stream.set_nonblocking(true).is_err() {
+        return false;
+    }
+    let closed = matches!(stream.peek(&mut buf), Ok(0));
+    let _ = stream.set_nonblocking(false);
+    closed
+}
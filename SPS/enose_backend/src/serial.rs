@@ -0,0 +1,464 @@
+// ===============================
+//  LINK SERIAL (Rust <-> Arduino lewat USB)
+// ===============================
+// Satu thread memegang port: menulis command dari command_server dan, kalau
+// backend.serial_mode = "ingest", membaca sampel sensor lalu meneruskannya ke
+// pipeline yang sama dengan koneksi TCP (pipeline::Ingest). Port yang hilang
+// (USB dicabut, board reset) dibuka ulang tiap SERIAL_RECONNECT_MS.
+//
+// Negosiasi seperti koneksi TCP tapi relay yang menawarkan: setelah port
+// dibuka relay mengirim HELLO; board yang mendukung frame biner membalas ACK
+// lalu mengirim frame, board lama tetap mengirim baris SENSOR: teks. Byte
+// dibaca per blok dan dikumpulkan sampai SERIAL_BUFFER byte / SERIAL_FLUSH_MS;
+// pemecahan frame / baris tetap di parser pipeline.
+//
+// Rate sampling board diatur dengan command `SET_RATE <hz>`: manual lewat
+// command server, atau otomatis oleh RateControl di stage store setiap state
+// berpindah fase (performance.phase_rates). Rate terakhir dikirim ulang setelah
+// port dibuka ulang karena board kembali ke rate default saat reset.
+
+use std::io::{self, Read, Write};
+use std::sync::atomic::Ordering;
+use std::sync::mpsc::{self, RecvTimeoutError, TryRecvError};
+use std::thread;
+use std::time::{Duration, Instant};
+
+use serialport::SerialPort;
+
+use crate::pipeline::Ingest;
+use crate::{config, frame, metrics, SensorRecord};
+
+const SERIAL_READ_MS: u64 = 20; // timeout satu read; juga jeda maksimum command menunggu
+const SERIAL_FLUSH_MS: u64 = 20; // byte yang terkumpul diteruskan paling lambat sejauh ini
+const SERIAL_BUFFER: usize = 4096;
+const SERIAL_HANDSHAKE_MS: u64 = 2000; // Arduino reset saat port dibuka (DTR), bootloader ~1.5 s
+const SERIAL_HELLO_MS: u64 = 250; // HELLO diulang selama handshake
+const SERIAL_RECONNECT_MS: u64 = 1000;
+
+/// Minta board sampling di `hz`; dicatat di gauge requested_sample_rate_hz.
+pub fn set_rate(commands: &mpsc::Sender<String>, hz: u32) {
+    metrics::REQUESTED_RATE.store(hz as u64, Ordering::Relaxed);
+    let _ = commands.send(format!("SET_RATE {}", hz));
+}
+
+/// Rate per fase protokol, dijalankan stage store untuk tiap batch.
+pub struct RateControl {
+    commands: mpsc::Sender<String>,
+    state: Option<i32>,
+}
+
+impl RateControl {
+    pub fn new(commands: mpsc::Sender<String>) -> RateControl {
+        RateControl {
+            commands,
+            state: None,
+        }
+    }
+
+    /// Kirim SET_RATE saat state berpindah ke fase yang punya rate di
+    /// performance.phase_rates (di-reload tanpa restart).
+    pub fn observe(&mut self, batch: &[SensorRecord]) {
+        for rec in batch {
+            if self.state == Some(rec.state) {
+                continue;
+            }
+            self.state = Some(rec.state);
+            let rates = config::phase_rates(&config::get().performance.phase_rates);
+            let hz = match (rates, usize::try_from(rec.state)) {
+                (Some(rates), Ok(i)) if i < rates.len() => rates[i],
+                _ => 0,
+            };
+            if hz > 0 && metrics::REQUESTED_RATE.load(Ordering::Relaxed) != hz as u64 {
+                metrics::log(
+                    "info",
+                    "sample_rate",
+                    &format!("{} -> {} Hz", config::PHASES[rec.state as usize], hz),
+                );
+                set_rate(&self.commands, hz);
+            }
+        }
+    }
+}
+
+/// Jalankan thread serial. `ingest` None = hanya kirim command (mode lama).
+pub fn start(commands: mpsc::Receiver<String>, ingest: Option<Ingest>) {
+    let spawned = thread::Builder::new()
+        .name("enose-serial".into())
+        .spawn(move || run(commands, ingest, configured_port));
+    if let Err(e) = spawned {
+        eprintln!("Serial error: {}", e);
+    }
+}
+
+struct Link {
+    port: Box<dyn SerialPort>,
+    conn: Option<(u64, bool)>, // koneksi ingest + frame biner
+    pending: Vec<u8>,
+    since: Instant, // byte pertama di `pending`
+}
+
+/// Path + baud rate dari config (dibaca ulang tiap kali port dibuka).
+fn configured_port() -> (String, u32) {
+    let cfg = config::get();
+    (cfg.backend.serial_port.clone(), cfg.backend.baud_rate)
+}
+
+fn run(commands: mpsc::Receiver<String>, ingest: Option<Ingest>, port: impl Fn() -> (String, u32)) {
+    let mut link: Option<Link> = None;
+    let mut next_attempt = Instant::now();
+    loop {
+        if link.is_none() && Instant::now() >= next_attempt {
+            let (path, baud_rate) = port();
+            match open(&path, baud_rate, ingest.as_ref()) {
+                Ok(l) => link = Some(l),
+                Err(e) => {
+                    next_attempt = Instant::now() + Duration::from_millis(SERIAL_RECONNECT_MS);
+                    metrics::log_limited("warn", "serial", &format!("cannot open port: {}", e));
+                }
+            }
+        }
+
+        // Mode ingest: baca terus (read ber-timeout), command dicek di sela read.
+        // Mode command: cukup tunggu command.
+        let cmd = match (&mut link, &ingest) {
+            (Some(l), Some(ingest)) => {
+                if let Err(e) = l.read(ingest) {
+                    disconnect(&mut link, ingest, &e);
+                    next_attempt = Instant::now() + Duration::from_millis(SERIAL_RECONNECT_MS);
+                }
+                match commands.try_recv() {
+                    Ok(cmd) => Some(cmd),
+                    Err(TryRecvError::Empty) => None,
+                    Err(TryRecvError::Disconnected) => return,
+                }
+            }
+            _ => match commands.recv_timeout(Duration::from_millis(SERIAL_RECONNECT_MS)) {
+                Ok(cmd) => Some(cmd),
+                Err(RecvTimeoutError::Timeout) => None,
+                Err(RecvTimeoutError::Disconnected) => return,
+            },
+        };
+
+        if let Some(cmd) = cmd {
+            let Some(l) = link.as_mut() else {
+                metrics::log_limited(
+                    "warn",
+                    "serial",
+                    &format!("Arduino not connected, command dropped: {}", cmd),
+                );
+                continue;
+            };
+            match l.command(&cmd) {
+                Ok(()) => println!("→ Arduino: {}", cmd),
+                Err(e) => {
+                    metrics::log_limited(
+                        "warn",
+                        "serial",
+                        &format!("command dropped: {}: {}", cmd, e),
+                    );
+                    if let Some(ingest) = &ingest {
+                        disconnect(&mut link, ingest, &e);
+                    } else {
+                        link = None;
+                    }
+                    next_attempt = Instant::now() + Duration::from_millis(SERIAL_RECONNECT_MS);
+                }
+            }
+        }
+    }
+}
+
+fn open(path: &str, baud_rate: u32, ingest: Option<&Ingest>) -> io::Result<Link> {
+    println!("SERIAL: Opening {} ({} baud)...", path, baud_rate);
+    let port = serialport::new(path, baud_rate)
+        .timeout(Duration::from_millis(SERIAL_READ_MS))
+        .open()?;
+    let mut link = Link {
+        port,
+        conn: None,
+        pending: Vec::with_capacity(SERIAL_BUFFER),
+        since: Instant::now(),
+    };
+    if let Some(ingest) = ingest {
+        link.handshake(ingest)?;
+    }
+    let hz = metrics::REQUESTED_RATE.load(Ordering::Relaxed);
+    if hz > 0 {
+        link.command(&format!("SET_RATE {}", hz))?;
+    }
+    metrics::inc(&metrics::SERIAL_CONNECTS);
+    println!("SERIAL: Connected to Arduino!");
+    Ok(link)
+}
+
+fn disconnect(link: &mut Option<Link>, ingest: &Ingest, e: &io::Error) {
+    if let Some(mut l) = link.take() {
+        l.flush(ingest);
+        if let Some((conn, _)) = l.conn {
+            ingest.close_blocking(conn);
+        }
+    }
+    metrics::log_limited("warn", "serial", &format!("Arduino disconnected: {}", e));
+}
+
+impl Link {
+    /// Tawarkan frame biner sampai ACK datang atau SERIAL_HANDSHAKE_MS lewat.
+    /// Baris teks sebelum ACK tetap diteruskan.
+    fn handshake(&mut self, ingest: &Ingest) -> io::Result<()> {
+        let ack = format!("{}\n", frame::ACK);
+        let deadline = Instant::now() + Duration::from_millis(SERIAL_HANDSHAKE_MS);
+        let mut next_hello = Instant::now();
+        let mut buf = [0u8; SERIAL_BUFFER];
+        let mut seen = Vec::new();
+        let mut binary = false;
+        while Instant::now() < deadline {
+            if Instant::now() >= next_hello {
+                self.command(frame::HELLO)?;
+                next_hello = Instant::now() + Duration::from_millis(SERIAL_HELLO_MS);
+            }
+            match self.port.read(&mut buf) {
+                Ok(0) => return Err(io::ErrorKind::UnexpectedEof.into()),
+                Ok(n) => seen.extend_from_slice(&buf[..n]),
+                Err(e) if is_timeout(&e) => continue,
+                Err(e) => return Err(e),
+            }
+            if let Some(pos) = find(&seen, ack.as_bytes()) {
+                let rest = seen.split_off(pos + ack.len());
+                seen.truncate(pos);
+                if !seen.is_empty() {
+                    let conn = ingest.open();
+                    ingest.data_blocking(conn, false, std::mem::take(&mut seen));
+                    ingest.close_blocking(conn);
+                }
+                seen = rest;
+                binary = true;
+                break;
+            }
+        }
+        metrics::log(
+            "info",
+            "sensor_protocol",
+            if binary {
+                "serial binary frames"
+            } else {
+                "serial text"
+            },
+        );
+        self.conn = Some((ingest.open(), binary));
+        self.since = Instant::now();
+        self.pending = seen;
+        Ok(())
+    }
+
+    fn command(&mut self, cmd: &str) -> io::Result<()> {
+        self.port.write_all(format!("{}\n", cmd).as_bytes())?;
+        self.port.flush()
+    }
+
+    /// Satu read (menunggu paling lama SERIAL_READ_MS). Error = port hilang.
+    fn read(&mut self, ingest: &Ingest) -> io::Result<()> {
+        let start = self.pending.len();
+        if start == 0 {
+            self.since = Instant::now();
+        }
+        self.pending.resize(start + SERIAL_BUFFER, 0);
+        let result = self.port.read(&mut self.pending[start..]);
+        let n = match &result {
+            Ok(n) => *n,
+            Err(_) => 0,
+        };
+        self.pending.truncate(start + n);
+        match result {
+            // Port serial tidak pernah EOF; 0 byte = device hilang
+            Ok(0) => return Err(io::ErrorKind::UnexpectedEof.into()),
+            Ok(_) => {}
+            Err(e) if is_timeout(&e) => {}
+            Err(e) => return Err(e),
+        }
+        if self.pending.len() >= SERIAL_BUFFER
+            || self.since.elapsed() >= Duration::from_millis(SERIAL_FLUSH_MS)
+        {
+            self.flush(ingest);
+        }
+        Ok(())
+    }
+
+    fn flush(&mut self, ingest: &Ingest) {
+        if let Some((conn, binary)) = self.conn {
+            if !self.pending.is_empty() {
+                let bytes = std::mem::replace(&mut self.pending, Vec::with_capacity(SERIAL_BUFFER));
+                ingest.data_blocking(conn, binary, bytes);
+            }
+        }
+    }
+}
+
+fn is_timeout(e: &io::Error) -> bool {
+    matches!(
+        e.kind(),
+        io::ErrorKind::TimedOut | io::ErrorKind::WouldBlock | io::ErrorKind::Interrupted
+    )
+}
+
+fn find(haystack: &[u8], needle: &[u8]) -> Option<usize> {
+    haystack.windows(needle.len()).position(|w| w == needle)
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::pipeline;
+    use std::io::{BufRead, BufReader};
+    use std::path::{Path, PathBuf};
+    use std::process::{Child, Command, Stdio};
+    use std::sync::{Arc, Mutex};
+
+    const DEVICE: u8 = 3;
+
+    /// simulator.py --pty (SPS/) di symlink sementara; stdout dikumpulkan per baris.
+    struct Simulator {
+        child: Child,
+        link: PathBuf,
+        output: Arc<Mutex<Vec<String>>>,
+    }
+
+    impl Drop for Simulator {
+        fn drop(&mut self) {
+            let _ = self.child.kill();
+            let _ = self.child.wait();
+            let _ = std::fs::remove_file(&self.link);
+        }
+    }
+
+    /// None = test dilewati (ENOSE_SKIP_PTY=1). Tanpa opt-out itu, python
+    /// (ENOSE_PYTHON, default python3) + numpy wajib ada: test gagal, bukan lolos diam-diam.
+    fn simulator(name: &str, args: &[&str]) -> Option<Simulator> {
+        if std::env::var("ENOSE_SKIP_PTY").is_ok_and(|v| v == "1") {
+            eprintln!("ENOSE_SKIP_PTY=1, test pty dilewati");
+            return None;
+        }
+        let python = std::env::var("ENOSE_PYTHON").unwrap_or_else(|_| "python3".into());
+        let sps = Path::new(env!("CARGO_MANIFEST_DIR")).join("..");
+        let usable = Command::new(&python)
+            .args(["-c", "import numpy"])
+            .status()
+            .is_ok_and(|s| s.success());
+        assert!(
+            usable,
+            "{} + numpy tidak ada (set ENOSE_PYTHON, atau ENOSE_SKIP_PTY=1 untuk melewati test pty)",
+            python
+        );
+        let link = std::env::temp_dir().join(format!("enose-{}-{}", name, std::process::id()));
+        let mut child = Command::new(&python)
+            .arg("simulator.py")
+            .arg("--pty")
+            .arg("--link")
+            .arg(&link)
+            .args(["--rate", "100", "--device", &DEVICE.to_string()])
+            .args(args)
+            .current_dir(&sps)
+            .stdout(Stdio::piped())
+            .spawn()
+            .unwrap();
+        let output = Arc::new(Mutex::new(Vec::new()));
+        let stdout = child.stdout.take().unwrap();
+        let lines = output.clone();
+        thread::spawn(move || {
+            for line in BufReader::new(stdout).lines().map_while(Result::ok) {
+                lines.lock().unwrap().push(line);
+            }
+        });
+        let deadline = Instant::now() + Duration::from_secs(10);
+        while !link.exists() {
+            assert!(Instant::now() < deadline, "simulator tidak membuat pty");
+            thread::sleep(Duration::from_millis(20));
+        }
+        Some(Simulator {
+            child,
+            link,
+            output,
+        })
+    }
+
+    /// Jalankan loop serial (mode ingest) pada pty simulator selama `secs`;
+    /// hasil: record dari parser pipeline, urut kedatangan.
+    fn collect(sim: &Simulator, secs: u64) -> Vec<SensorRecord> {
+        let rt = tokio::runtime::Runtime::new().unwrap();
+        let (ingest, mut rx) = rt.block_on(async { pipeline::parse_only() });
+        let (tx, commands) = mpsc::channel();
+        let path = sim.link.to_string_lossy().into_owned();
+        let reader = thread::spawn(move || {
+            run(commands, Some(ingest), move || (path.clone(), 115_200));
+        });
+        let mut records = Vec::new();
+        let deadline = Instant::now() + Duration::from_secs(secs);
+        while let Some(left) = deadline.checked_duration_since(Instant::now()) {
+            match rt.block_on(async { tokio::time::timeout(left, rx.recv()).await }) {
+                Ok(Some(batch)) => records.extend(batch),
+                Ok(None) => break,
+                Err(_) => {}
+            }
+        }
+        drop(tx);
+        reader.join().unwrap();
+        records
+    }
+
+    #[test]
+    fn pty_binary_frames() {
+        let Some(sim) = simulator("binary", &[]) else {
+            return;
+        };
+        let records = collect(&sim, 3);
+        // Baris teks sebelum ACK boleh ada; setelah frame pertama semuanya frame
+        let first = records.iter().position(|r| r.device_id == DEVICE);
+        let frames = &records[first.expect("tidak ada frame biner")..];
+        assert!(frames.len() >= 100, "{} frame", frames.len());
+        for w in frames.windows(2) {
+            assert_eq!(w[1].device_id, DEVICE);
+            assert_eq!(w[1].seq, w[0].seq.wrapping_add(1));
+            assert!(w[1].timestamp > w[0].timestamp);
+        }
+        assert!(frames.iter().all(|r| (r.co_mics - 2.2).abs() < 1.0));
+    }
+
+    #[test]
+    fn pty_text_lines() {
+        let Some(sim) = simulator("text", &["--format", "text"]) else {
+            return;
+        };
+        let records = collect(&sim, 3);
+        assert!(records.len() >= 100, "{} record", records.len());
+        // Firmware lama: HELLO tidak dibalas, relay tetap membaca baris SENSOR:
+        assert!(records.iter().all(|r| r.device_id == 0 && r.seq == 0));
+        assert!(records.windows(2).all(|w| w[1].timestamp >= w[0].timestamp));
+        assert!(records.iter().all(|r| (r.co_mics - 2.2).abs() < 1.0));
+    }
+
+    #[test]
+    fn pty_reconnect_after_unplug() {
+        let Some(sim) = simulator("unplug", &["--unplug-every", "1.5"]) else {
+            return;
+        };
+        let records = collect(&sim, 7);
+        let unplugged: Vec<u32> = sim
+            .output
+            .lock()
+            .unwrap()
+            .iter()
+            .filter_map(|l| l.strip_prefix("PTY: dicabut setelah "))
+            .filter_map(|l| l.split_whitespace().next()?.parse().ok())
+            .collect();
+        assert!(!unplugged.is_empty(), "simulator tidak pernah dicabut");
+        let frames: Vec<&SensorRecord> = records.iter().filter(|r| r.device_id == DEVICE).collect();
+        assert!(frames.windows(2).all(|w| w[1].seq > w[0].seq));
+        // Seq board jalan terus antar colokan: frame dengan seq setelah cabut
+        // pertama = port dibuka ulang dan frame biner dinegosiasikan lagi
+        assert!(
+            frames.iter().any(|r| r.seq >= unplugged[0]),
+            "tidak ada frame setelah cabut di {} (seq terakhir {:?})",
+            unplugged[0],
+            frames.last().map(|r| r.seq)
+        );
+    }
+}
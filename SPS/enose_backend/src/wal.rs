@@ -0,0 +1,356 @@
+// ===============================
+//  WRITE-AHEAD QUEUE (DISK) UNTUK INFLUXDB
+// ===============================
+// Setiap record sensor ditulis dulu ke segment file di WAL_DIR sebagai satu
+// baris line protocol, baru kemudian thread writer mengirimnya ke InfluxDB
+// dalam batch. File `commit` menyimpan sequence pertama yang BELUM masuk
+// Influx; segment yang semua recordnya sudah di-commit dihapus (compaction).
+//
+// Layout:
+//   wal/seg-00000000000000000000.log   (nama = sequence record pertama)
+//   wal/seg-00000000000000012345.log
+//   wal/commit                         (satu angka, ditulis atomic)
+//
+// Ingestion hanya melakukan append ke file (tidak pernah menunggu Influx),
+// jadi saat Influx mati data menumpuk di disk dan dikuras begitu Influx
+// kembali. Posisi reader punya lock sendiri dan hanya dipakai thread writer
+// Influx (read_batch / commit / retry); baca segment dilakukan di luar lock
+// `inner`, jadi append tidak pernah menunggu I/O baca.
+
+use std::collections::VecDeque;
+use std::fs::{self, File, OpenOptions};
+use std::io::{self, BufRead, BufReader, Seek, SeekFrom, Write};
+use std::path::{Path, PathBuf};
+use std::sync::{Condvar, Mutex};
+use std::time::Duration;
+
+const SEGMENT_BYTES: u64 = 4 * 1024 * 1024; // rotasi segment tiap ~4 MB
+const SYNC_EVERY: u64 = 10; // fsync tiap 10 record (1 s data @ 10 Hz, 0.2 s @ 50 Hz)
+
+pub struct WalStats {
+    pub depth: u64,    // record yang belum masuk Influx
+    pub lag_secs: f64, // umur record tertua yang belum masuk Influx
+    pub segments: usize,
+    pub bytes: u64,
+}
+
+pub struct Batch {
+    pub end_seq: u64, // sequence setelah record terakhir di batch
+    pub lines: Vec<String>,
+}
+
+struct Reader {
+    segment: u64, // first_seq segment yang sedang dibaca
+    offset: u64,  // posisi byte di segment
+    seq: u64,     // sequence record di posisi offset
+}
+
+struct Inner {
+    segments: VecDeque<u64>, // first_seq tiap segment, urut
+    active: File,
+    active_bytes: u64,
+    next_seq: u64,
+    commit: u64,
+    unsynced: u64,
+    head_ns: Option<i128>, // timestamp record tertua yang belum di-commit (kalau diketahui)
+}
+
+pub struct Wal {
+    dir: PathBuf,
+    inner: Mutex<Inner>,
+    reader: Mutex<Reader>,
+    appended: Condvar,
+}
+
+fn segment_path(dir: &Path, first_seq: u64) -> PathBuf {
+    dir.join(format!("seg-{:020}.log", first_seq))
+}
+
+fn line_timestamp(line: &str) -> Option<i128> {
+    line.rsplit(' ').next()?.trim().parse().ok()
+}
+
+fn now_ns() -> i128 {
+    chrono::Utc::now().timestamp_nanos_opt().unwrap_or(0) as i128
+}
+
+impl Wal {
+    /// Buka (atau buat) WAL di `dir`; record yang belum di-commit dari sesi sebelumnya tetap antre.
+    pub fn open<P: AsRef<Path>>(dir: P) -> io::Result<Wal> {
+        let dir = dir.as_ref().to_path_buf();
+        fs::create_dir_all(&dir)?;
+
+        let mut segments: Vec<u64> = fs::read_dir(&dir)?
+            .filter_map(|e| e.ok())
+            .filter_map(|e| {
+                let name = e.file_name().into_string().ok()?;
+                name.strip_prefix("seg-")?
+                    .strip_suffix(".log")?
+                    .parse()
+                    .ok()
+            })
+            .collect();
+        segments.sort_unstable();
+
+        let commit = fs::read_to_string(dir.join("commit"))
+            .ok()
+            .and_then(|s| s.trim().parse().ok())
+            .unwrap_or_else(|| segments.first().copied().unwrap_or(0));
+
+        if segments.is_empty() {
+            File::create(segment_path(&dir, commit))?;
+            segments.push(commit);
+        }
+
+        // Hitung record di segment terakhir; buang baris terakhir yang terpotong (crash saat append)
+        let last = *segments.last().unwrap();
+        let last_path = segment_path(&dir, last);
+        let mut count = 0u64;
+        let mut valid_bytes = 0u64;
+        {
+            let mut reader = BufReader::new(File::open(&last_path)?);
+            let mut buf = Vec::new();
+            loop {
+                buf.clear();
+                let n = reader.read_until(b'\n', &mut buf)?;
+                if n == 0 || buf.last() != Some(&b'\n') {
+                    break;
+                }
+                valid_bytes += n as u64;
+                count += 1;
+            }
+        }
+        let active = OpenOptions::new().read(true).write(true).open(&last_path)?;
+        active.set_len(valid_bytes)?;
+        let mut active = active;
+        active.seek(SeekFrom::End(0))?;
+        let next_seq = (last + count).max(commit);
+
+        let wal = Wal {
+            dir,
+            inner: Mutex::new(Inner {
+                segments: segments.into_iter().collect(),
+                active,
+                active_bytes: valid_bytes,
+                next_seq,
+                commit,
+                unsynced: 0,
+                head_ns: None,
+            }),
+            reader: Mutex::new(Reader {
+                segment: 0,
+                offset: 0,
+                seq: 0,
+            }),
+            appended: Condvar::new(),
+        };
+        wal.rewind_reader(&mut wal.reader.lock().unwrap());
+        wal.compact(&mut wal.inner.lock().unwrap());
+        Ok(wal)
+    }
+
+    /// Tambah satu record (satu baris line protocol). Dipanggil dari thread ingestion.
+    pub fn append(&self, line: &str) -> io::Result<u64> {
+        let mut inner = self.inner.lock().unwrap();
+        if inner.active_bytes >= SEGMENT_BYTES {
+            self.rotate(&mut inner)?;
+        }
+        let mut buf = Vec::with_capacity(line.len() + 1);
+        buf.extend_from_slice(line.trim_end().as_bytes());
+        buf.push(b'\n');
+        inner.active.write_all(&buf)?;
+        inner.active_bytes += buf.len() as u64;
+        inner.unsynced += 1;
+        if inner.unsynced >= SYNC_EVERY {
+            inner.active.sync_data()?;
+            inner.unsynced = 0;
+        }
+        let seq = inner.next_seq;
+        inner.next_seq += 1;
+        if inner.head_ns.is_none() && seq == inner.commit {
+            inner.head_ns = line_timestamp(line);
+        }
+        drop(inner);
+        self.appended.notify_all();
+        Ok(seq)
+    }
+
+    fn rotate(&self, inner: &mut Inner) -> io::Result<()> {
+        inner.active.sync_data()?;
+        let first = inner.next_seq;
+        inner.active = OpenOptions::new()
+            .create(true)
+            .append(true)
+            .read(true)
+            .open(segment_path(&self.dir, first))?;
+        inner.active_bytes = 0;
+        inner.unsynced = 0;
+        inner.segments.push_back(first);
+        Ok(())
+    }
+
+    /// Posisikan reader di record `commit` (saat open, atau setelah batch gagal dikirim).
+    /// Hanya pencarian segment yang memegang lock `inner`; scan file di luar lock.
+    fn rewind_reader(&self, reader: &mut Reader) {
+        let (commit, segment) = {
+            let inner = self.inner.lock().unwrap();
+            let segment = inner
+                .segments
+                .iter()
+                .rev()
+                .find(|&&s| s <= inner.commit)
+                .copied()
+                .unwrap_or_else(|| *inner.segments.front().unwrap());
+            (inner.commit, segment)
+        };
+        *reader = Reader {
+            segment,
+            offset: 0,
+            seq: segment,
+        };
+        // Lewati record < commit di segment ini
+        if let Ok(file) = File::open(segment_path(&self.dir, segment)) {
+            let mut file = BufReader::new(file);
+            let mut buf = Vec::new();
+            while reader.seq < commit {
+                buf.clear();
+                match file.read_until(b'\n', &mut buf) {
+                    Ok(n) if n > 0 && buf.last() == Some(&b'\n') => {
+                        reader.offset += n as u64;
+                        reader.seq += 1;
+                    }
+                    _ => break,
+                }
+            }
+        }
+        reader.seq = reader.seq.max(commit);
+    }
+
+    /// Ambil sampai `max` record berikutnya yang belum dikirim. Menunggu paling lama
+    /// `wait` kalau antrean kosong. Batch kosong = tidak ada data baru.
+    pub fn read_batch(&self, max: usize, wait: Duration) -> io::Result<Batch> {
+        let mut reader = self.reader.lock().unwrap();
+        // Snapshot batas antrean + daftar segment, lalu lepas lock sebelum baca file
+        let (next_seq, segments) = {
+            let mut inner = self.inner.lock().unwrap();
+            if reader.seq >= inner.next_seq {
+                inner = self.appended.wait_timeout(inner, wait).unwrap().0;
+            }
+            (
+                inner.next_seq,
+                inner.segments.iter().copied().collect::<Vec<u64>>(),
+            )
+        };
+        // Reader di ujung segment yang sudah dihapus compaction: lompat ke segment berikutnya
+        if let Some(&s) = segments
+            .iter()
+            .rev()
+            .find(|&&s| s > reader.segment && s <= reader.seq)
+        {
+            *reader = Reader {
+                segment: s,
+                offset: 0,
+                seq: s,
+            };
+        }
+
+        let mut lines = Vec::new();
+        while lines.len() < max && reader.seq < next_seq {
+            let path = segment_path(&self.dir, reader.segment);
+            let mut file = BufReader::new(File::open(&path)?);
+            file.seek(SeekFrom::Start(reader.offset))?;
+            let mut line = String::new();
+            while lines.len() < max && reader.seq < next_seq {
+                line.clear();
+                let n = file.read_line(&mut line)?;
+                if n == 0 || !line.ends_with('\n') {
+                    break;
+                }
+                reader.offset += n as u64;
+                reader.seq += 1;
+                lines.push(line.trim_end().to_string());
+            }
+            if lines.len() >= max || reader.seq >= next_seq {
+                break;
+            }
+            // Segment habis: pindah ke segment berikutnya
+            let current = reader.segment;
+            match segments.iter().find(|&&s| s > current).copied() {
+                Some(next) => {
+                    *reader = Reader {
+                        segment: next,
+                        offset: 0,
+                        seq: next,
+                    }
+                }
+                None => break,
+            }
+        }
+        if !lines.is_empty() {
+            let mut inner = self.inner.lock().unwrap();
+            if inner.head_ns.is_none() && reader.seq - lines.len() as u64 == inner.commit {
+                inner.head_ns = line_timestamp(&lines[0]);
+            }
+        }
+        Ok(Batch {
+            end_seq: reader.seq,
+            lines,
+        })
+    }
+
+    /// Batch sampai `end_seq` sudah tersimpan di Influx: geser commit pointer lalu compaction.
+    pub fn commit(&self, end_seq: u64) -> io::Result<()> {
+        let mut inner = self.inner.lock().unwrap();
+        if end_seq <= inner.commit {
+            return Ok(());
+        }
+        let tmp = self.dir.join("commit.tmp");
+        {
+            let mut f = File::create(&tmp)?;
+            writeln!(f, "{}", end_seq)?;
+            f.sync_data()?;
+        }
+        fs::rename(&tmp, self.dir.join("commit"))?;
+        inner.commit = end_seq;
+        inner.head_ns = None;
+        self.compact(&mut inner);
+        Ok(())
+    }
+
+    /// Batch gagal dikirim: baca ulang mulai dari commit pointer.
+    pub fn retry(&self) {
+        self.rewind_reader(&mut self.reader.lock().unwrap());
+    }
+
+    /// Hapus segment (selain yang aktif) yang seluruh recordnya < commit.
+    fn compact(&self, inner: &mut Inner) {
+        while inner.segments.len() > 1 && inner.segments[1] <= inner.commit {
+            // Reader yang masih menunjuk segment ini dipindah oleh read_batch berikutnya
+            let old = inner.segments.pop_front().unwrap();
+            if let Err(e) = fs::remove_file(segment_path(&self.dir, old)) {
+                eprintln!("WAL: failed to remove segment {}: {}", old, e);
+            }
+        }
+    }
+
+    pub fn stats(&self) -> WalStats {
+        let inner = self.inner.lock().unwrap();
+        let depth = inner.next_seq - inner.commit;
+        let lag_secs = match (depth, inner.head_ns) {
+            (0, _) | (_, None) => 0.0,
+            (_, Some(ts)) => ((now_ns() - ts) as f64 / 1e9).max(0.0),
+        };
+        let bytes = inner
+            .segments
+            .iter()
+            .filter_map(|&s| fs::metadata(segment_path(&self.dir, s)).ok())
+            .map(|m| m.len())
+            .sum();
+        WalStats {
+            depth,
+            lag_secs,
+            segments: inner.segments.len(),
+            bytes,
+        }
+    }
+}
@@ -0,0 +1,382 @@
+// ===============================
+//  WEB: WEBSOCKET LIVE STREAM + HISTORY HTTP (warp)
+// ===============================
+// Untuk dashboard ringan (browser / remote) tanpa GUI PyQt, di
+// backend.web_addr:
+//
+//   GET /ws/stream?format=json&device=1&channels=co_gm,voc_mics&decimate=10&batch_ms=100
+//     WebSocket; satu pesan = satu batch record. format=json (default) ->
+//     teks JSON array objek record (kanal yang tidak dipilih tidak ikut),
+//     format=binary -> frame biner frame.rs berurutan (kanal lain NaN).
+//   GET /api/history?start=<ns>&end=<ns>&limit=5000
+//     Record dari history RAM (performance.history_retention) dengan
+//     start <= timestamp < end, paling banyak `limit` dari awal range.
+//     Tanpa start: `limit` record terakhir sebelum end. "more" = masih ada
+//     record lain di range. Urutan = urutan masuk relay (sama dengan seq).
+//
+// Server warp jalan sebagai task di runtime tokio relay (main.rs). Stage store
+// hanya memanggil broadcast::Sender::send, jadi tidak pernah menunggu client;
+// client yang tertinggal lebih dari BROADCAST_CAPACITY record melewati record.
+
+use std::collections::VecDeque;
+use std::net::SocketAddr;
+use std::sync::atomic::Ordering;
+use std::sync::Arc;
+use std::time::Duration;
+
+use futures_util::{SinkExt, StreamExt};
+use serde::{Deserialize, Serialize};
+use serde_json::{Map, Value};
+use tokio::sync::broadcast;
+use tokio::time::MissedTickBehavior;
+use warp::http::StatusCode;
+use warp::ws::{Message, WebSocket, Ws};
+use warp::{Filter, Reply};
+
+use crate::frame::FRAME_SIZE;
+use crate::history::{History, Snapshot};
+use crate::hub::CHANNELS;
+use crate::{metrics, record_frame, record_values, SensorRecord};
+
+const BROADCAST_CAPACITY: usize = 8192; // record per client sebelum tertinggal
+const DEFAULT_BATCH_MS: u64 = 100;
+const MAX_BATCH_MS: u64 = 10_000;
+const DEFAULT_HISTORY_LIMIT: usize = 5000;
+const MAX_HISTORY_LIMIT: usize = 100_000;
+
+pub struct Web {
+    tx: broadcast::Sender<SensorRecord>,
+}
+
+impl Web {
+    /// Bind `addr` lalu jalankan server warp sebagai task. Harus dipanggil di
+    /// dalam runtime tokio.
+    pub fn start(addr: &str, history: Arc<History>) -> Result<Arc<Web>, String> {
+        let addr: SocketAddr = addr.parse().map_err(|e| format!("{}: {}", addr, e))?;
+        let (tx, _) = broadcast::channel(BROADCAST_CAPACITY);
+        // Bind di sini supaya port terpakai langsung jadi error di main()
+        let (bound, server) = warp::serve(routes(tx.clone(), history))
+            .try_bind_ephemeral(addr)
+            .map_err(|e| format!("{}: {}", addr, e))?;
+        metrics::log("info", "web", &format!("listening on {}", bound));
+        tokio::spawn(server);
+        Ok(Arc::new(Web { tx }))
+    }
+
+    pub fn publish(&self, rec: &SensorRecord) {
+        // Err = belum ada client, record cukup dibuang
+        let _ = self.tx.send(rec.clone());
+    }
+}
+
+fn routes(
+    tx: broadcast::Sender<SensorRecord>,
+    history: Arc<History>,
+) -> impl Filter<Extract = (impl Reply,), Error = warp::Rejection> + Clone {
+    let stream_route = warp::path!("ws" / "stream")
+        .and(warp::ws())
+        .and(warp::query::<StreamQuery>())
+        .map(move |ws: Ws, q: StreamQuery| match q.filter() {
+            Ok(filter) => {
+                let rx = tx.subscribe();
+                ws.on_upgrade(move |socket| stream_client(socket, filter, rx))
+                    .into_response()
+            }
+            Err(e) => warp::reply::with_status(e, StatusCode::BAD_REQUEST).into_response(),
+        });
+    let history_route = warp::path!("api" / "history")
+        .and(warp::get())
+        .and(warp::query::<HistoryQuery>())
+        .and_then(move |q: HistoryQuery| {
+            let history = history.clone();
+            async move {
+                // Scan + serialisasi bisa lama (retention tanpa batas): jalan di
+                // thread blocking, bukan di worker tokio yang melayani ingest/WS
+                let job = tokio::task::spawn_blocking(move || history_page(&history, &q));
+                let reply = match job.await {
+                    Ok(page) => page.into_response(),
+                    Err(e) => warp::reply::with_status(
+                        format!("history query failed: {}", e),
+                        StatusCode::INTERNAL_SERVER_ERROR,
+                    )
+                    .into_response(),
+                };
+                Ok::<_, warp::Rejection>(reply)
+            }
+        });
+    stream_route.or(history_route)
+}
+
+fn history_page(history: &History, q: &HistoryQuery) -> warp::reply::Json {
+    // Snapshot tidak menahan ingest, jadi JSON langsung dibuat dari record
+    let snapshot = history.snapshot();
+    let (records, more) = select_history(&snapshot, q);
+    let page = HistoryPage {
+        count: records.len(),
+        more,
+        records: records
+            .into_iter()
+            .map(|r| record_json(r, &[true; 7]))
+            .collect(),
+    };
+    warp::reply::json(&page)
+}
+
+// ------------------------------
+// WEBSOCKET LIVE STREAM
+// ------------------------------
+#[derive(Deserialize)]
+struct StreamQuery {
+    format: Option<String>,
+    device: Option<u8>,
+    channels: Option<String>,
+    decimate: Option<u64>,
+    batch_ms: Option<u64>,
+}
+
+struct StreamFilter {
+    binary: bool,
+    device: Option<u8>,
+    channels: [bool; 7],
+    decimate: u64,
+    batch: Duration,
+}
+
+impl StreamQuery {
+    fn filter(&self) -> Result<StreamFilter, String> {
+        let binary = match self.format.as_deref() {
+            None | Some("json") => false,
+            Some("binary") => true,
+            Some(other) => return Err(format!("invalid format: {:?}", other)),
+        };
+        let mut channels = [true; 7];
+        if let Some(names) = self.channels.as_deref().filter(|c| *c != "*") {
+            channels = [false; 7];
+            for name in names.split(',') {
+                let idx = CHANNELS
+                    .iter()
+                    .position(|c| *c == name)
+                    .ok_or_else(|| format!("invalid channels: {:?}", name))?;
+                channels[idx] = true;
+            }
+        }
+        let decimate = self.decimate.unwrap_or(1);
+        if decimate == 0 {
+            return Err("invalid decimate: 0".into());
+        }
+        let batch_ms = self.batch_ms.unwrap_or(DEFAULT_BATCH_MS);
+        if !(1..=MAX_BATCH_MS).contains(&batch_ms) {
+            return Err(format!("invalid batch_ms: {}", batch_ms));
+        }
+        Ok(StreamFilter {
+            binary,
+            device: self.device,
+            channels,
+            decimate,
+            batch: Duration::from_millis(batch_ms),
+        })
+    }
+}
+
+impl StreamFilter {
+    fn encode(&self, batch: &[SensorRecord]) -> Message {
+        if self.binary {
+            let mut out = Vec::with_capacity(batch.len() * FRAME_SIZE);
+            for rec in batch {
+                let mut f = record_frame(rec);
+                for (v, keep) in f.values.iter_mut().zip(self.channels) {
+                    if !keep {
+                        *v = f32::NAN;
+                    }
+                }
+                out.extend_from_slice(&f.encode());
+            }
+            Message::binary(out)
+        } else {
+            let rows = batch
+                .iter()
+                .map(|r| record_json(r, &self.channels))
+                .collect();
+            Message::text(Value::Array(rows).to_string())
+        }
+    }
+}
+
+async fn stream_client(
+    socket: WebSocket,
+    filter: StreamFilter,
+    mut rx: broadcast::Receiver<SensorRecord>,
+) {
+    let (mut sink, mut incoming) = socket.split();
+    let mut tick = tokio::time::interval(filter.batch);
+    tick.set_missed_tick_behavior(MissedTickBehavior::Delay);
+    let mut batch = Vec::new();
+    let mut matched: u64 = 0;
+    metrics::WEB_CLIENTS.fetch_add(1, Ordering::Relaxed);
+
+    loop {
+        tokio::select! {
+            received = rx.recv() => match received {
+                Ok(rec) => {
+                    if filter.device.map_or(true, |d| d == rec.device_id) {
+                        if matched % filter.decimate == 0 {
+                            batch.push(rec);
+                        }
+                        matched += 1;
+                    }
+                }
+                Err(broadcast::error::RecvError::Lagged(n)) => {
+                    metrics::WEB_DROPPED.fetch_add(n, Ordering::Relaxed);
+                    metrics::log_limited("warn", "web_lagged", &format!("{} record(s) skipped", n));
+                }
+                Err(broadcast::error::RecvError::Closed) => break,
+            },
+            _ = tick.tick() => {
+                if !batch.is_empty() {
+                    let sent = batch.len() as u64;
+                    let msg = filter.encode(&batch);
+                    batch.clear();
+                    if sink.send(msg).await.is_err() {
+                        break;
+                    }
+                    metrics::WEB_RECORDS_SENT.fetch_add(sent, Ordering::Relaxed);
+                }
+            },
+            // Ping dibalas otomatis; close / error = client pergi
+            msg = incoming.next() => match msg {
+                Some(Ok(m)) if !m.is_close() => {}
+                _ => break,
+            },
+        }
+    }
+    metrics::WEB_CLIENTS.fetch_sub(1, Ordering::Relaxed);
+}
+
+// ------------------------------
+// HISTORY RANGE
+// ------------------------------
+#[derive(Deserialize)]
+struct HistoryQuery {
+    start: Option<i64>,
+    end: Option<i64>,
+    limit: Option<usize>,
+}
+
+#[derive(Serialize)]
+struct HistoryPage {
+    count: usize,
+    more: bool,
+    records: Vec<Value>,
+}
+
+/// Record di range query + apakah masih ada sisa. History urut waktu masuk,
+/// bukan timestamp (backfill, reconnect, jam device bisa mundur), jadi range
+/// disaring linear; hasil tetap urut masuk.
+fn select_history<'a>(history: &'a Snapshot, q: &HistoryQuery) -> (Vec<&'a SensorRecord>, bool) {
+    let limit = q
+        .limit
+        .unwrap_or(DEFAULT_HISTORY_LIMIT)
+        .clamp(1, MAX_HISTORY_LIMIT);
+    let start = q.start.map_or(i128::MIN, |t| t as i128);
+    let end = q.end.map_or(i128::MAX, |t| t as i128);
+    let mut hits = history
+        .iter()
+        .filter(|r| start <= r.timestamp && r.timestamp < end);
+    if q.start.is_some() {
+        let page: Vec<_> = hits.by_ref().take(limit).collect();
+        let more = hits.next().is_some();
+        return (page, more);
+    }
+    // Tanpa start: simpan `limit` record terakhir saja
+    let mut last = VecDeque::with_capacity(limit + 1);
+    let mut more = false;
+    for rec in hits {
+        last.push_back(rec);
+        if last.len() > limit {
+            last.pop_front();
+            more = true;
+        }
+    }
+    (last.into(), more)
+}
+
+fn record_json(rec: &SensorRecord, channels: &[bool; 7]) -> Value {
+    let mut obj = Map::new();
+    obj.insert("timestamp".into(), Value::from(rec.timestamp as i64));
+    obj.insert("seq".into(), rec.seq.into());
+    obj.insert("device_id".into(), rec.device_id.into());
+    for ((name, v), keep) in CHANNELS.iter().zip(record_values(rec)).zip(channels) {
+        if *keep {
+            obj.insert((*name).into(), v.into());
+        }
+    }
+    obj.insert("state".into(), rec.state.into());
+    obj.insert("level".into(), rec.level.into());
+    Value::Object(obj)
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn record(seq: u32, timestamp: i128) -> SensorRecord {
+        SensorRecord {
+            no2_gm: 0.0,
+            ethanol_gm: 0.0,
+            voc_gm: 0.0,
+            co_gm: 0.0,
+            co_mics: 0.0,
+            ethanol_mics: 0.0,
+            voc_mics: 0.0,
+            state: 0,
+            level: 0,
+            timestamp,
+            seq,
+            device_id: 1,
+        }
+    }
+
+    fn query(start: Option<i64>, end: Option<i64>, limit: usize) -> HistoryQuery {
+        HistoryQuery {
+            start,
+            end,
+            limit: Some(limit),
+        }
+    }
+
+    #[test]
+    fn history_range_ignores_arrival_order() {
+        // Urutan masuk: 0..10 lalu backfill / jam mundur 3..6, lalu 10..15
+        let times: Vec<i128> = (0..10).chain(3..6).chain(10..15).collect();
+        let batch: Vec<SensorRecord> = times
+            .iter()
+            .enumerate()
+            .map(|(i, &t)| record(i as u32, t))
+            .collect();
+        let history = History::new();
+        history.extend(&batch, 0);
+        let snap = history.snapshot();
+        let seqs = |(page, more): (Vec<&SensorRecord>, bool)| {
+            (page.iter().map(|r| r.seq).collect::<Vec<_>>(), more)
+        };
+
+        // start <= t < end, urut masuk, termasuk record yang datang terlambat
+        assert_eq!(
+            seqs(select_history(&snap, &query(Some(4), Some(6), 100))),
+            (vec![4, 5, 11, 12], false)
+        );
+        assert_eq!(
+            seqs(select_history(&snap, &query(Some(4), Some(6), 3))),
+            (vec![4, 5, 11], true)
+        );
+        // Tanpa start: `limit` record terakhir sebelum end
+        assert_eq!(
+            seqs(select_history(&snap, &query(None, Some(6), 3))),
+            (vec![10, 11, 12], true)
+        );
+        assert_eq!(
+            seqs(select_history(&snap, &query(None, None, 100))).0.len(),
+            times.len()
+        );
+    }
+}
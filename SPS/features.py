@@ -0,0 +1,252 @@
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from cache import default_cache
+from filters import filter_run
+from preprocess import NORMALIZE_MODES, compensate_run
+from runs import (SENSOR_NAMES, STATE_PRECONDITION, STATE_RAMP, STATE_HOLD,
+                  STATE_PURGE, STATE_RECOVERY, list_runs, load_run)
+
+# ===============================
+# FEATURE EXTRACTION PER LEVEL BAU
+# ===============================
+# Setiap (run, level) menjadi satu baris batch. Semua segmen dipadding ke
+# panjang yang sama dan dihitung sekaligus dalam bentuk (B, N, C), jadi
+# vektorisasi berlaku atas channel, level dan run sekaligus.
+
+FEATURE_NAMES = ['baseline', 'peak', 'delta_r_r0', 'rise_tau', 'decay_tau', 'auc', 'steady_mean']
+
+TAU_FRACTION = 1.0 - np.exp(-1.0)   # 63.2% dari respon (time constant)
+BASELINE_FALLBACK = 50              # sampel awal dipakai kalau tidak ada fase pre-conditioning
+FEATURES_VERSION = 2                # naikkan kalau definisi fitur berubah (invalidasi cache)
+
+
+def level_segments(level):
+    """Pecah array level menjadi list (level, start, stop) yang berurutan"""
+    level = np.asarray(level)
+    if len(level) == 0:
+        return []
+    edges = np.flatnonzero(np.diff(level)) + 1
+    starts = np.r_[0, edges]
+    stops = np.r_[edges, len(level)]
+    return [(int(level[a]), int(a), int(b)) for a, b in zip(starts, stops)]
+
+
+def _first_true(mask):
+    """Index True pertama per baris, -1 kalau tidak ada"""
+    idx = mask.argmax(axis=1)
+    return np.where(mask.any(axis=1), idx, -1)
+
+
+def _masked_mean(x, mask):
+    count = mask.sum(axis=1)
+    total = np.where(mask[..., None], x, 0.0).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count[:, None] > 0, total / np.maximum(count, 1)[:, None], np.nan)
+
+
+def _take(a, idx):
+    """a[b, idx[b, c], c] untuk idx berbentuk (B, C)"""
+    return np.take_along_axis(a, np.maximum(idx, 0)[:, None, :], axis=1)[:, 0, :]
+
+
+def segment_features(t, x, state, valid):
+    """Hitung fitur untuk batch segmen.
+
+    t, state, valid: (B, N); x: (B, N, C). Hasil: (B, len(FEATURE_NAMES), C).
+    """
+    B, N, C = x.shape
+    row_t = t[:, :, None]
+
+    # Baseline: rata-rata fase pre-conditioning, fallback ke sampel awal
+    base_mask = valid & (state == STATE_PRECONDITION)
+    no_base = ~base_mask.any(axis=1)
+    if no_base.any():
+        fallback = valid & (np.cumsum(valid, axis=1) <= BASELINE_FALLBACK)
+        base_mask = np.where(no_base[:, None], fallback, base_mask)
+    baseline = _masked_mean(x, base_mask)
+    dev = x - baseline[:, None, :]
+
+    # Respon: ramp-up + hold, fallback ke seluruh segmen
+    resp_mask = valid & ((state == STATE_RAMP) | (state == STATE_HOLD))
+    no_resp = ~resp_mask.any(axis=1)
+    resp_mask = np.where(no_resp[:, None], valid, resp_mask)
+    resp_dev = np.where(resp_mask[..., None], dev, 0.0)
+    peak_idx = np.abs(resp_dev).argmax(axis=1)
+    peak_dev = _take(dev, peak_idx)
+    peak = baseline + peak_dev
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta_r = np.where(baseline != 0, peak_dev / baseline, np.nan)
+
+    # Rise: waktu dari awal respon sampai 63.2% puncak
+    resp_start = _first_true(resp_mask)
+    reached = resp_mask[..., None] & (np.abs(dev) >= TAU_FRACTION * np.abs(peak_dev)[:, None, :])
+    reached &= peak_dev[:, None, :] != 0
+    rise_idx = np.where(reached.any(axis=1), reached.argmax(axis=1), -1)
+    rise_tau = np.where(rise_idx >= 0,
+                        _take(np.broadcast_to(row_t, x.shape), rise_idx) - t[np.arange(B), np.maximum(resp_start, 0)][:, None],
+                        np.nan)
+
+    # Decay: waktu dari awal purge sampai sisa 36.8% dari deviasi awal purge
+    decay_mask = valid & ((state == STATE_PURGE) | (state == STATE_RECOVERY))
+    decay_start = _first_true(decay_mask)
+    has_decay = decay_start >= 0
+    dev0 = dev[np.arange(B), np.maximum(decay_start, 0), :]
+    settled = decay_mask[..., None] & (np.abs(dev) <= (1.0 - TAU_FRACTION) * np.abs(dev0)[:, None, :])
+    settled &= (dev0 != 0)[:, None, :]
+    decay_idx = np.where(settled.any(axis=1), settled.argmax(axis=1), -1)
+    t_decay0 = t[np.arange(B), np.maximum(decay_start, 0)][:, None]
+    decay_tau = np.where(has_decay[:, None] & (decay_idx >= 0),
+                         _take(np.broadcast_to(row_t, x.shape), decay_idx) - t_decay0,
+                         np.nan)
+
+    # AUC (trapezoid) dari deviasi selama respon
+    pair = resp_mask[:, 1:] & resp_mask[:, :-1]
+    dt = np.diff(t, axis=1)
+    area = 0.5 * (dev[:, 1:, :] + dev[:, :-1, :]) * dt[..., None]
+    auc = np.where(pair[..., None], area, 0.0).sum(axis=1)
+
+    # Steady state: paruh kedua fase hold
+    hold_mask = valid & (state == STATE_HOLD)
+    hold_count = np.cumsum(hold_mask, axis=1)
+    steady_mask = hold_mask & (hold_count > hold_count[:, -1:] / 2.0)
+    steady = _masked_mean(x, steady_mask)
+
+    return np.stack([baseline, peak, delta_r, rise_tau, decay_tau, auc, steady], axis=1)
+
+
+def extract_features_batch(runs):
+    """Fitur untuk banyak run sekaligus.
+
+    Hasil: list of (run, level, array (len(FEATURE_NAMES), C)).
+    """
+    segments = []
+    for run in runs:
+        for level, a, b in level_segments(run.level):
+            segments.append((run, level, a, b))
+    if not segments:
+        return []
+
+    B = len(segments)
+    N = max(b - a for _, _, a, b in segments)
+    C = len(SENSOR_NAMES)
+    t = np.zeros((B, N))
+    x = np.zeros((B, N, C))
+    state = np.full((B, N), -1, dtype=np.int16)
+    valid = np.zeros((B, N), dtype=bool)
+    for i, (run, _, a, b) in enumerate(segments):
+        n = b - a
+        t[i, :n] = run.time[a:b]
+        x[i, :n] = run.values[a:b]
+        state[i, :n] = run.state[a:b]
+        valid[i, :n] = True
+
+    feats = segment_features(t, x, state, valid)
+    return [(run, level, feats[i]) for i, (run, level, _, _) in enumerate(segments)]
+
+
+def feature_header():
+    return ['run', 'sample_type', 'level'] + [
+        f"{feat}:{sensor}" for feat in FEATURE_NAMES for sensor in SENSOR_NAMES
+    ]
+
+
+def feature_rows(results):
+    """Ubah hasil extract_features_batch ke baris tabel (satu baris per run+level)"""
+    rows = []
+    for run, level, feats in results:
+        name = os.path.basename(run.path) if run.path else run.name
+        rows.append([name, run.sample_type, level] + [float(v) for v in feats.ravel()])
+    return rows
+
+
+def _extract_files(paths, compensate=None, filter_spec=None):
+    runs = []
+    for path in paths:
+        try:
+            run = load_run(path)
+        except (OSError, ValueError) as e:
+            print(f"Skipping {path}: {e}")
+            continue
+        if filter_spec:
+            run = filter_run(run, filter_spec)
+        runs.append(compensate_run(run, compensate) if compensate else run)
+    # Baris dikelompokkan per file supaya bisa disimpan ke cache per run
+    by_path = {run.path: [] for run in runs}
+    results = extract_features_batch(runs)
+    for result, row in zip(results, feature_rows(results)):
+        by_path[result[0].path].append(row)
+    return by_path
+
+
+def extract_directory(directory, workers=None, chunk_size=8, compensate=None, filter_spec=None,
+                      cache=None):
+    """Ekstrak fitur semua run di directory secara paralel (process pool).
+
+    compensate: None untuk data raw, atau salah satu NORMALIZE_MODES.
+    filter_spec: spec FilterChain yang dijalankan sebelum kompensasi.
+    cache: ArtifactCache opsional; hanya run yang belum ada di cache yang dihitung.
+    """
+    paths = list_runs(directory)
+    params = f"features:v{FEATURES_VERSION}:{compensate}:{filter_spec}"
+    done = {}
+    if cache is not None:
+        done, todo, keys = cache.lookup(paths, params)
+    else:
+        todo = paths
+
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+    work = partial(_extract_files, compensate=compensate, filter_spec=filter_spec)
+    if workers == 1 or len(chunks) <= 1:
+        results = map(work, chunks)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(work, chunks)
+    try:
+        for by_path in results:
+            done.update(by_path)
+            if cache is not None:
+                for path, rows in by_path.items():
+                    cache.put(keys[path], rows)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if cache is not None:
+            cache.flush()
+
+    # Kolom nama diisi ulang: isi cache bisa berasal dari file yang sama dengan nama lain
+    return [[os.path.basename(path)] + row[1:] for path in paths for row in done.get(path, [])]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ekstrak fitur e-nose per level dari folder rekaman")
+    parser.add_argument('directory')
+    parser.add_argument('-o', '--output', default='features.csv')
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    parser.add_argument('--compensate', choices=NORMALIZE_MODES, default=None,
+                        help="kompensasi drift sebelum ekstraksi (default: raw)")
+    parser.add_argument('--filter', dest='filter_spec', default=None,
+                        help="filter chain (detik), mis. 'hampel:0.7,median:0.5,iir:0.3'")
+    parser.add_argument('--no-cache', action='store_true', help="hitung ulang semua run")
+    args = parser.parse_args(argv)
+
+    rows = extract_directory(args.directory, workers=args.workers, compensate=args.compensate,
+                             filter_spec=args.filter_spec,
+                             cache=None if args.no_cache else default_cache())
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(feature_header())
+        writer.writerows(rows)
+    print(f"{len(rows)} feature rows written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
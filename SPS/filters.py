@@ -0,0 +1,235 @@
+import abc
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from runs import Run, SENSOR_NAMES
+
+# ===============================
+# STREAMING DIGITAL FILTER CHAIN
+# ===============================
+# Setiap stage menyimpan state-nya di array NumPy (ekor history untuk filter
+# window, output terakhir untuk IIR), jadi batch ukuran berapa pun diproses
+# dengan satu panggilan tervektorisasi atas semua kanal. Panjang window dan
+# konstanta waktu IIR diukur dalam detik dari timestamp sampel (seperti
+# stats.py), bukan jumlah sampel, karena rate sampling berubah per fase:
+# window berisi semua sampel dalam `secs` detik terakhir. Filter window
+# bersifat causal dan di awal run hanya memakai sampel yang sudah ada,
+# sehingga hasil live (per sampel) dan offline (satu run) identik; IIR sama
+# sampai pembulatan floating point.
+#
+# Spec chain (detik): "hampel:0.7,median:0.5,iir:0.3" atau per kanal
+# "median:0.5@0+1+2" (index kanal mengikuti SENSOR_NAMES).
+
+DEFAULT_FILTER_SPEC = "hampel:0.7,median:0.5,iir:0.3"
+IIR_BLOCK = 256
+CHAIN_BLOCK = 4096   # run panjang diproses per potongan (batasi memori window)
+MAD_SCALE = 1.4826   # MAD -> sigma untuk distribusi normal
+
+
+def _monotonic(last, t):
+    """Timestamp dibuat tidak turun; sampel yang datang mundur dianggap di waktu sampel sebelumnya"""
+    return np.maximum.accumulate(np.concatenate([[last], t]))[1:]
+
+
+def _nanmedian(win):
+    """Median sumbu terakhir tanpa NaN (slot di luar window); NaN disortir ke belakang"""
+    nan = np.isnan(win)
+    if not nan.any():
+        return np.median(win, axis=-1)
+    n = (~nan).sum(axis=-1, keepdims=True)
+    srt = np.sort(win, axis=-1)
+    lo = np.take_along_axis(srt, np.maximum((n - 1) // 2, 0), axis=-1)
+    hi = np.take_along_axis(srt, n // 2, axis=-1)
+    return ((lo + hi) / 2)[..., 0]
+
+
+class _WindowStage(abc.ABC):
+    """Basis stage causal dengan window geser sepanjang `secs` detik"""
+
+    def __init__(self, secs):
+        if not secs > 0:
+            raise ValueError("window must be > 0 seconds")
+        self.secs = float(secs)
+        self.reset()
+
+    def reset(self):
+        self._tail_t = np.empty(0)
+        self._tail_x = None
+
+    def _windows(self, x, t):
+        """Window tiap sampel: values (N, C, K) dan times (N, K), slot di luar window = NaN
+
+        Slot terakhir = sampel sekarang; K = isi window terpanjang di batch ini.
+        """
+        if self._tail_x is None:
+            self._tail_x = np.empty((0, x.shape[1]))
+        times = np.concatenate([self._tail_t, _monotonic(self._tail_t[-1] if len(self._tail_t) else -np.inf, t)])
+        values = np.concatenate([self._tail_x, x])
+        idx = len(self._tail_t) + np.arange(len(x))
+        count = idx - np.searchsorted(times, times[idx] - self.secs, side='right') + 1
+        k = int(count.max())
+        pad_t = np.concatenate([np.full(k - 1, np.nan), times])
+        pad_x = np.concatenate([np.full((k - 1, x.shape[1]), np.nan), values])
+        win_t = sliding_window_view(pad_t, k)[idx]
+        win_x = sliding_window_view(pad_x, k, axis=0)[idx]
+        if (count < k).any():
+            inside = np.arange(k) >= k - count[:, None]
+            win_t = np.where(inside, win_t, np.nan)
+            win_x = np.where(inside[:, None, :], win_x, np.nan)
+        # Ekor = sampel yang masih bisa masuk window sampel berikutnya
+        keep = np.searchsorted(times, times[-1] - self.secs, side='right')
+        self._tail_t, self._tail_x = times[keep:].copy(), values[keep:].copy()
+        return win_x, win_t
+
+    @abc.abstractmethod
+    def process(self, x, t):
+        """Filter batch x (N, C) dengan timestamp t (N,) detik -> (N, C)"""
+
+
+class MovingMedian(_WindowStage):
+    def process(self, x, t):
+        return _nanmedian(self._windows(x, t)[0])
+
+
+class HampelFilter(_WindowStage):
+    """Ganti outlier (> n_sigmas * MAD dari median window) dengan median"""
+
+    def __init__(self, secs, n_sigmas=3.0):
+        super().__init__(secs)
+        self.n_sigmas = n_sigmas
+
+    def process(self, x, t):
+        win = self._windows(x, t)[0]
+        med = _nanmedian(win)
+        mad = MAD_SCALE * _nanmedian(np.abs(win - med[..., None]))
+        outlier = np.abs(x - med) > self.n_sigmas * mad
+        return np.where(outlier & (mad > 0), med, x)
+
+
+class SavitzkyGolay(_WindowStage):
+    """Fit polinomial (least squares atas waktu sampel) ke window terakhir, dievaluasi di sampel terbaru"""
+
+    def __init__(self, secs, polyorder=2):
+        super().__init__(secs)
+        if polyorder < 0:
+            raise ValueError("polyorder must be >= 0")
+        self.polyorder = polyorder
+
+    def process(self, x, t):
+        win, times = self._windows(x, t)
+        # Waktu relatif sampel terbaru, (N, K) di (-1, 0]; slot di luar window = 0 bobot
+        tau = (times - times[:, -1:]) / self.secs
+        inside = ~np.isnan(tau)
+        tau, win = np.where(inside, tau, 0.0), np.where(inside[:, None, :], win, 0.0)
+        # Normal equation dari power sum: A[p, q] = sum tau^(p+q), B[p] = sum tau^p * x
+        order = self.polyorder + 1
+        powers = [inside.astype(float)]
+        for _ in range(2 * order - 2):
+            powers.append(powers[-1] * tau)
+        sums = np.stack([pw.sum(axis=-1) for pw in powers], axis=-1)
+        lhs = sums[:, np.add.outer(np.arange(order), np.arange(order))]
+        rhs = np.stack([(win * powers[p][:, None, :]).sum(axis=-1) for p in range(order)], axis=1)
+        # pinv: window dengan sampel <= polyorder (awal run) tetap punya solusi
+        return (np.linalg.pinv(lhs) @ rhs)[:, 0]
+
+
+class IIRLowPass:
+    """Low-pass orde satu dengan konstanta waktu `tau` detik:
+    y[n] = y[n-1] + a[n] * (x[n] - y[n-1]), a[n] = 1 - exp(-dt[n] / tau)"""
+
+    def __init__(self, tau):
+        if not tau > 0:
+            raise ValueError("tau must be > 0 seconds")
+        self.tau = float(tau)
+        self.reset()
+
+    def reset(self):
+        self._y = None
+        self._t = None
+
+    def process(self, x, t):
+        if self._y is None:
+            self._y, self._t = x[0].copy(), t[0]
+        t = _monotonic(self._t, t)
+        out = np.empty_like(x)
+        # Rekursi dibuka jadi perkalian matriks per blok (tanpa loop per sampel):
+        # y[n] = sum_j a[j] * exp(-(t[n] - t[j]) / tau) * x[j] + exp(-(t[n] - t0) / tau) * y0
+        for a in range(0, len(x), IIR_BLOCK):
+            tb = t[a:a + IIR_BLOCK]
+            alpha = 1.0 - np.exp(-np.diff(np.concatenate([[self._t], tb])) / self.tau)
+            lag = np.maximum(tb[:, None] - tb[None, :], 0.0)
+            gain = np.tril(alpha * np.exp(-lag / self.tau))
+            carry = np.exp(-(tb - self._t) / self.tau)
+            y = gain @ x[a:a + len(tb)] + carry[:, None] * self._y
+            out[a:a + len(tb)] = y
+            self._y, self._t = y[-1].copy(), tb[-1]
+        return out
+
+
+def _savgol(arg):
+    secs, _, order = (arg or "1.1/2").partition('/')
+    return SavitzkyGolay(float(secs), int(order or 2))
+
+
+STAGES = {
+    'median': lambda arg: MovingMedian(float(arg or 0.5)),
+    'hampel': lambda arg: HampelFilter(float(arg or 0.7)),
+    'savgol': _savgol,
+    'iir': lambda arg: IIRLowPass(float(arg or 0.3)),
+}
+
+
+class FilterChain:
+    def __init__(self, stages, n_channels=len(SENSOR_NAMES)):
+        """stages: list of (stage, channels) dengan channels None = semua kanal"""
+        self.n_channels = n_channels
+        self.stages = stages
+
+    @classmethod
+    def from_spec(cls, spec, n_channels=len(SENSOR_NAMES)):
+        stages = []
+        for item in filter(None, (s.strip() for s in (spec or "").split(','))):
+            channels = None
+            if '@' in item:
+                item, chans = item.split('@', 1)
+                try:
+                    channels = [int(c) for c in chans.split('+')]
+                except ValueError:
+                    raise ValueError(f"Invalid channel list '@{chans}' (use e.g. @0+1+2)")
+                bad = [c for c in channels if not 0 <= c < n_channels]
+                if bad:
+                    raise ValueError(f"Channel index {bad[0]} out of range (0..{n_channels - 1})")
+            name, _, arg = item.partition(':')
+            if name not in STAGES:
+                raise ValueError(f"Unknown filter stage '{name}' (choose from {', '.join(STAGES)})")
+            stages.append((STAGES[name](arg), channels))
+        return cls(stages, n_channels)
+
+    def reset(self):
+        for stage, _ in self.stages:
+            stage.reset()
+
+    def process(self, values, times):
+        """Filter batch values (N, C) dengan timestamp times (N,) dalam detik"""
+        x = np.asarray(values, dtype=float).reshape(-1, self.n_channels)
+        t = np.asarray(times, dtype=float).reshape(-1)
+        if len(x) == 0:
+            return x.copy()
+        if len(x) > CHAIN_BLOCK:
+            return np.concatenate([self.process(x[a:a + CHAIN_BLOCK], t[a:a + CHAIN_BLOCK])
+                                   for a in range(0, len(x), CHAIN_BLOCK)])
+        for stage, channels in self.stages:
+            if channels is None:
+                x = stage.process(x, t)
+            else:
+                x = x.copy()
+                x[:, channels] = stage.process(x[:, channels], t)
+        return x
+
+
+def filter_run(run, spec=DEFAULT_FILTER_SPEC):
+    """Versi offline untuk rekaman tersimpan, hasilnya Run baru"""
+    values = FilterChain.from_spec(spec, run.values.shape[1]).process(run.values, run.time)
+    return Run(run.time, values, run.state, run.level, name=run.name,
+               sample_type=run.sample_type, timestamp=run.timestamp, path=run.path)
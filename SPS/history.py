@@ -0,0 +1,127 @@
+import csv
+import io
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+# ===============================
+# HISTORY VIEW (QUERY INFLUXDB)
+# ===============================
+# Query memakai satu requests.Session (connection pool) dan aggregateWindow
+# di sisi server; lebar window dipilih dari rentang yang sedang terlihat
+# supaya jumlah titik ~ jumlah pixel. Rentang panjang dipecah jadi beberapa
+# halaman sehingga grafik terisi bertahap.
+
+INFLUX_MEASUREMENT = "gas_data"
+
+# Nama field di InfluxDB, urutan sama dengan runs.SENSOR_NAMES
+INFLUX_FIELDS = ['co_mics', 'ethanol_mics', 'voc_mics', 'no2_gm', 'ethanol_gm', 'voc_gm', 'co_gm']
+
+# Pilihan aggregateWindow (detik, durasi Flux)
+WINDOW_CHOICES = [
+    (0.1, '100ms'), (1, '1s'), (5, '5s'), (10, '10s'), (30, '30s'), (60, '1m'),
+    (300, '5m'), (900, '15m'), (3600, '1h'), (6 * 3600, '6h'), (86400, '1d'),
+]
+TARGET_POINTS = 1500        # titik per kanal untuk satu layar
+POINTS_PER_PAGE = 500       # titik per halaman query
+
+
+def choose_window(span_seconds, target_points=TARGET_POINTS):
+    """Window agregasi terkecil yang membuat jumlah titik <= target_points"""
+    for seconds, flux in WINDOW_CHOICES:
+        if span_seconds / seconds <= target_points:
+            return seconds, flux
+    return WINDOW_CHOICES[-1]
+
+
+def rfc3339(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def build_query(start, stop, every, bucket, fields=INFLUX_FIELDS):
+    field_filter = " or ".join(f'r._field == "{f}"' for f in fields)
+    return (
+        f'from(bucket: "{bucket}")\n'
+        f'  |> range(start: {rfc3339(start)}, stop: {rfc3339(stop)})\n'
+        f'  |> filter(fn: (r) => r._measurement == "{INFLUX_MEASUREMENT}")\n'
+        f'  |> filter(fn: (r) => {field_filter})\n'
+        f'  |> aggregateWindow(every: {every}, fn: mean, createEmpty: false)\n'
+        f'  |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")\n'
+    )
+
+
+def parse_time(text):
+    """RFC3339 dari Influx (nanodetik opsional) -> epoch detik"""
+    text = text.strip().rstrip('Z')
+    if '.' in text:
+        head, frac = text.split('.', 1)
+        text = f"{head}.{frac[:6]}"     # fromisoformat maksimal mikrodetik
+    return datetime.fromisoformat(text).replace(tzinfo=timezone.utc).timestamp()
+
+
+def parse_pivot_csv(text, fields=INFLUX_FIELDS):
+    """Annotated CSV hasil pivot -> (time (N,), values (N, len(fields)))"""
+    times, rows = [], []
+    header = None
+    for row in csv.reader(io.StringIO(text)):
+        if not row or row[0].startswith('#'):
+            header = None
+            continue
+        if header is None:
+            header = row
+            t_col = header.index('_time')
+            cols = [header.index(f) if f in header else None for f in fields]
+            continue
+        times.append(parse_time(row[t_col]))
+        rows.append([float(row[c]) if c is not None and row[c] != '' else np.nan for c in cols])
+    if not times:
+        return np.empty(0), np.empty((0, len(fields)))
+    order = np.argsort(times)
+    return np.asarray(times)[order], np.asarray(rows, dtype=float)[order]
+
+
+class InfluxHistory:
+    def __init__(self, url, token, org, bucket, pool_size=4, timeout=30):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.url = url.rstrip('/')
+        self.org = org
+        self.bucket = bucket
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            "Authorization": f"Token {token}",
+            "Content-Type": "application/vnd.flux",
+            "Accept": "application/csv",
+        })
+
+    def query(self, start, stop, every):
+        """Satu query teragregasi untuk [start, stop) (epoch detik)"""
+        resp = self.session.post(f"{self.url}/api/v2/query", params={'org': self.org},
+                                 data=build_query(start, stop, every, self.bucket).encode('utf-8'),
+                                 timeout=self.timeout)
+        resp.raise_for_status()
+        return parse_pivot_csv(resp.text)
+
+    def pages(self, start, stop, target_points=TARGET_POINTS, points_per_page=POINTS_PER_PAGE):
+        """Generator (time, values, flux_every) per halaman, dari awal ke akhir rentang"""
+        seconds, every = choose_window(stop - start, target_points)
+        page_span = seconds * points_per_page
+        t = np.floor(start / seconds) * seconds   # halaman sejajar dengan window agregasi
+        while t < stop:
+            end = min(t + page_span, stop)
+            times, values = self.query(t, end, every)
+            yield times, values, every
+            t = end
+
+    def close(self):
+        self.session.close()
+
+
+def relative_range(hours, now=None):
+    now = now or datetime.now(timezone.utc)
+    return (now - timedelta(hours=hours)).timestamp(), now.timestamp()
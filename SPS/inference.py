@@ -0,0 +1,167 @@
+import json
+import os
+
+import numpy as np
+
+from runs import SENSOR_NAMES
+
+# ===============================
+# MODEL INFERENCE (KLASIFIKASI BAU)
+# ===============================
+# Format model yang didukung:
+#   .npz  -> model NumPy: W0,b0[,W1,b1,...], classes, opsional mean/scale
+#            (standardisasi fitur), activation ('relu'/'tanh'), window, rate,
+#            source ('raw'/'filtered'/'compensated'). Satu layer = linear.
+#   .onnx -> butuh onnxruntime; metadata (classes, window, rate, source)
+#            dibaca dari file .json dengan nama yang sama.
+# Input model selalu hasil window_features() atas window (W, 7) dengan jarak
+# sampel 1/rate detik (rate data training); GUI meresample data live ke rate itu.
+
+WINDOW_FEATURES = ['mean', 'std', 'min', 'max', 'slope']
+N_FEATURES = len(WINDOW_FEATURES) * len(SENSOR_NAMES)
+DEFAULT_WINDOW = 100     # 10 detik @ 10 Hz
+DEFAULT_RATE = 10.0      # Hz, rate default board
+SOURCES = ('raw', 'filtered', 'compensated')
+ACTIVATIONS = {'relu': lambda z: np.maximum(z, 0.0), 'tanh': np.tanh}
+
+
+def _check_meta(classes, window, rate, source):
+    if not len(classes):
+        raise ValueError("Model tidak punya daftar classes")
+    if window < 2:
+        raise ValueError(f"window model harus >= 2 sampel, dapat {window}")
+    if not rate > 0:
+        raise ValueError(f"rate model harus > 0 Hz, dapat {rate}")
+    if source not in SOURCES:
+        raise ValueError(f"source model '{source}' tidak dikenal (pilih {', '.join(SOURCES)})")
+
+
+def window_features(windows):
+    """(B, W, C) -> (B, len(WINDOW_FEATURES) * C), urutan fitur lalu kanal"""
+    x = np.asarray(windows, dtype=float)
+    if x.ndim == 2:
+        x = x[None]
+    w = x.shape[1]
+    pos = np.arange(w, dtype=float) - (w - 1) / 2.0
+    mean = x.mean(axis=1)
+    denom = (pos * pos).sum()
+    slope = np.einsum('w,bwc->bc', pos, x) / denom if denom > 0 else np.zeros_like(mean)
+    feats = [mean, x.std(axis=1), x.min(axis=1), x.max(axis=1), slope]
+    return np.concatenate(feats, axis=1)
+
+
+def softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+class NumpyModel:
+    def __init__(self, layers, classes, mean=None, scale=None, activation='relu',
+                 window=DEFAULT_WINDOW, rate=DEFAULT_RATE, source='raw'):
+        if activation not in ACTIVATIONS:
+            raise ValueError(f"activation '{activation}' tidak dikenal (pilih {', '.join(ACTIVATIONS)})")
+        self.layers = layers
+        self.classes = list(classes)
+        self.mean = mean
+        self.scale = scale
+        self.activation = ACTIVATIONS[activation]
+        self.window = int(window)
+        self.rate = float(rate)
+        self.source = source
+        _check_meta(self.classes, self.window, self.rate, self.source)
+        self._check_shapes()
+
+    def _check_shapes(self):
+        """Bentuk layer harus cocok dengan N_FEATURES fitur window dan jumlah class"""
+        n_in = N_FEATURES
+        for i, (W, b) in enumerate(self.layers):
+            if W.ndim != 2 or W.shape[0] != n_in:
+                raise ValueError(f"W{i} berbentuk {W.shape}, input layer ini harus {n_in} "
+                                 f"(fitur window = {len(WINDOW_FEATURES)} x {len(SENSOR_NAMES)} kanal)")
+            if b.shape != (W.shape[1],):
+                raise ValueError(f"b{i} berbentuk {b.shape}, harus ({W.shape[1]},)")
+            n_in = W.shape[1]
+        if n_in != len(self.classes):
+            raise ValueError(f"Output model {n_in} kelas, tapi classes berisi {len(self.classes)}")
+        for name, v in (('mean', self.mean), ('scale', self.scale)):
+            if v is not None and np.shape(v) not in ((), (1,), (N_FEATURES,)):
+                raise ValueError(f"{name} berbentuk {np.shape(v)}, harus ({N_FEATURES},)")
+        if self.scale is not None and np.any(np.asarray(self.scale) == 0):
+            raise ValueError("scale berisi 0")
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            layers = []
+            i = 0
+            while f"W{i}" in f:
+                layers.append((f[f"W{i}"].astype(float), f[f"b{i}"].astype(float)))
+                i += 1
+            if not layers:
+                raise ValueError(f"No layers (W0, b0) in {path}")
+            return cls(
+                layers,
+                [str(c) for c in f['classes']],
+                mean=f['mean'] if 'mean' in f else None,
+                scale=f['scale'] if 'scale' in f else None,
+                activation=str(f['activation']) if 'activation' in f else 'relu',
+                window=int(f['window']) if 'window' in f else DEFAULT_WINDOW,
+                rate=float(f['rate']) if 'rate' in f else DEFAULT_RATE,
+                source=str(f['source']) if 'source' in f else 'raw',
+            )
+
+    def predict_proba(self, features):
+        z = np.asarray(features, dtype=float)
+        if self.mean is not None:
+            z = z - self.mean
+        if self.scale is not None:
+            z = z / self.scale
+        for i, (W, b) in enumerate(self.layers):
+            z = z @ W + b
+            if i < len(self.layers) - 1:
+                z = self.activation(z)
+        return softmax(z)
+
+
+class OnnxModel:
+    def __init__(self, path):
+        import onnxruntime  # opsional, hanya kalau model .onnx dipakai
+        self.session = onnxruntime.InferenceSession(path)
+        self.input_name = self.session.get_inputs()[0].name
+        meta_path = os.path.splitext(path)[0] + '.json'
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+        self.window = int(meta.get('window', DEFAULT_WINDOW))
+        self.rate = float(meta.get('rate', DEFAULT_RATE))
+        self.source = meta.get('source', 'raw')
+        n_in = self.session.get_inputs()[0].shape[-1]
+        if isinstance(n_in, int) and n_in != N_FEATURES:
+            raise ValueError(f"Input ONNX {n_in} fitur, fitur window = {N_FEATURES}")
+        n_out = self.session.get_outputs()[0].shape[-1]
+        self.classes = meta.get('classes') or [str(i) for i in range(n_out if isinstance(n_out, int) else 0)]
+        if isinstance(n_out, int) and n_out != len(self.classes):
+            raise ValueError(f"Output ONNX {n_out} kelas, tapi classes di {meta_path} berisi {len(self.classes)}")
+        _check_meta(self.classes, self.window, self.rate, self.source)
+
+    def predict_proba(self, features):
+        out = self.session.run(None, {self.input_name: np.asarray(features, dtype=np.float32)})[0]
+        out = np.asarray(out, dtype=float)
+        # Sebagian exporter sudah memberi probabilitas, sebagian logit
+        if np.all(out >= 0) and np.allclose(out.sum(axis=1), 1.0, atol=1e-3):
+            return out
+        return softmax(out)
+
+
+def load_model(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.npz':
+        return NumpyModel.load(path)
+    if ext == '.onnx':
+        try:
+            return OnnxModel(path)
+        except ImportError:
+            raise ValueError("Model ONNX butuh onnxruntime: pip install onnxruntime")
+    raise ValueError(f"Unsupported model format: {path}")
@@ -0,0 +1,331 @@
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from history import INFLUX_FIELDS, INFLUX_MEASUREMENT
+from runs import list_runs, load_run
+
+# ===============================
+# INFLUXDB STAND-IN (OFFLINE TESTING)
+# ===============================
+# Server HTTP kecil yang meniru endpoint InfluxDB v2 yang dipakai proyek ini:
+#   POST /api/v2/write  (line protocol, dipakai backend Rust)
+#   POST /api/v2/query  (subset Flux: range, filter _field, aggregateWindow, pivot)
+#   GET  /health
+# Data awal = rekaman di folder (timestamp dari nama file / metadata), lalu
+# semua write ditambahkan dan disimpan ke <folder>/.enose/influx_writes.lp
+# supaya tetap ada setelah restart. Token tidak dicek.
+
+FIELDS = INFLUX_FIELDS + ['state', 'level']
+WRITES_NAME = os.path.join('.enose', 'influx_writes.lp')
+
+_UNITS_NS = {'ns': 1, 'us': 10 ** 3, 'ms': 10 ** 6, 's': 10 ** 9, 'm': 60 * 10 ** 9,
+             'h': 3600 * 10 ** 9, 'd': 86400 * 10 ** 9, 'w': 7 * 86400 * 10 ** 9}
+_DURATION_RE = re.compile(r'(\d+)(ns|us|ms|s|m|h|d|w)')
+_RANGE_RE = re.compile(r'range\(\s*start:\s*([^,)]+?)\s*(?:,\s*stop:\s*([^)]+?)\s*)?\)')
+_FIELD_RE = re.compile(r'r\._field\s*==\s*"([^"]+)"')
+_AGG_RE = re.compile(r'aggregateWindow\(\s*every:\s*(\w+)\s*,\s*fn:\s*(\w+)')
+_PRECISION_NS = {'ns': 1, 'us': 10 ** 3, 'ms': 10 ** 6, 's': 10 ** 9}
+
+
+class FluxError(ValueError):
+    pass
+
+
+def parse_duration(text):
+    """'10s', '1h30m', '100ms' -> nanodetik"""
+    text = text.strip()
+    parts = _DURATION_RE.findall(text)
+    if not parts or ''.join(n + u for n, u in parts) != text:
+        raise FluxError(f"invalid duration: {text}")
+    return sum(int(n) * _UNITS_NS[u] for n, u in parts)
+
+
+def parse_time_ns(text, now_ns):
+    """RFC3339, 'now()' atau durasi relatif ('-1h') -> epoch nanodetik"""
+    text = text.strip()
+    if text == 'now()':
+        return now_ns
+    if text.startswith('-'):
+        return now_ns - parse_duration(text[1:])
+    try:
+        return int(np.datetime64(text.rstrip('Z'), 'ns').astype(np.int64))
+    except ValueError:
+        raise FluxError(f"invalid time: {text}")
+
+
+def format_times(ns):
+    return [s + 'Z' for s in np.datetime_as_string(np.asarray(ns, dtype='datetime64[ns]'), unit='ns')]
+
+
+# ===============================
+# PENYIMPANAN TITIK (KOLUMNAR, URUT WAKTU)
+# ===============================
+class PointStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.times = np.empty(0, dtype=np.int64)
+        self.values = np.empty((0, len(FIELDS)))
+        self._pending_t, self._pending_v = [], []
+
+    def add(self, times_ns, values):
+        with self.lock:
+            self._pending_t.append(np.asarray(times_ns, dtype=np.int64))
+            self._pending_v.append(np.asarray(values, dtype=float).reshape(-1, len(FIELDS)))
+
+    def _merge(self):
+        if not self._pending_t:
+            return
+        times = np.concatenate([self.times] + self._pending_t)
+        values = np.concatenate([self.values] + self._pending_v)
+        order = np.argsort(times, kind='stable')
+        self.times, self.values = times[order], values[order]
+        self._pending_t, self._pending_v = [], []
+
+    def __len__(self):
+        with self.lock:
+            self._merge()
+            return len(self.times)
+
+    def select(self, start_ns, stop_ns, columns):
+        with self.lock:
+            self._merge()
+            a, b = np.searchsorted(self.times, [start_ns, stop_ns])
+            return self.times[a:b], self.values[a:b][:, columns]
+
+
+def load_recordings(store, directory):
+    """Masukkan rekaman di folder ke store; rekaman yang overlap (CSV+JSON run sama) dilewati"""
+    spans = []
+    for path in list_runs(directory):
+        try:
+            run = load_run(path)
+        except (OSError, ValueError) as e:
+            print(f"Skipping {path}: {e}")
+            continue
+        if run.timestamp is None or not len(run):
+            continue
+        # timestamp = waktu simpan (akhir rekaman), sama seperti build_dataset.recording_groups
+        t0 = int((run.timestamp.timestamp() - run.duration) * 1e9)
+        times = t0 + np.round((run.time - run.time[0]) * 1e9).astype(np.int64)
+        if any(a <= times[0] <= b or a <= times[-1] <= b for a, b in spans):
+            continue
+        spans.append((times[0], times[-1]))
+        # SENSOR_NAMES dan INFLUX_FIELDS punya urutan yang sama
+        store.add(times, np.column_stack([run.values, run.state, run.level]))
+    return len(spans)
+
+
+def parse_line_protocol(body, precision='ns'):
+    """Line protocol -> (times ns, values (N, len(FIELDS))); tag & measurement lain diabaikan"""
+    scale = _PRECISION_NS.get(precision, 1)
+    times, rows = [], []
+    for line in body.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        parts = line.split(' ')
+        if len(parts) < 2:
+            raise ValueError(f"invalid line: {line}")
+        if parts[0].split(',')[0] != INFLUX_MEASUREMENT:
+            continue
+        row = np.full(len(FIELDS), np.nan)
+        for pair in parts[1].split(','):
+            key, _, value = pair.partition('=')
+            if key in FIELDS:
+                row[FIELDS.index(key)] = float(value.rstrip('iu'))
+        times.append(int(parts[2]) * scale if len(parts) > 2 else _now_ns())
+        rows.append(row)
+    return np.asarray(times, dtype=np.int64), np.asarray(rows).reshape(-1, len(FIELDS))
+
+
+def _now_ns():
+    return time.time_ns()
+
+
+# ===============================
+# QUERY (SUBSET FLUX)
+# ===============================
+def aggregate(times, values, every_ns, fn, stop_ns):
+    """aggregateWindow(createEmpty: false); _time = akhir window seperti Influx"""
+    if not len(times):
+        return times, values
+    bins = times // every_ns
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    ends = np.r_[starts[1:], len(times)]
+    if fn == 'mean':
+        # NaN (field tidak ditulis) tidak ikut dirata-rata
+        valid = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+        counts = np.add.reduceat(valid.astype(float), starts, axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result = sums / counts
+    elif fn == 'min':
+        result = np.minimum.reduceat(values, starts, axis=0)
+    elif fn == 'max':
+        result = np.maximum.reduceat(values, starts, axis=0)
+    elif fn == 'sum':
+        result = np.add.reduceat(values, starts, axis=0)
+    elif fn == 'count':
+        result = np.add.reduceat((~np.isnan(values)).astype(float), starts, axis=0)
+    elif fn == 'first':
+        result = values[starts]
+    elif fn == 'last':
+        result = values[ends - 1]
+    else:
+        raise FluxError(f"unsupported aggregate fn: {fn}")
+    window_end = np.minimum((bins[starts] + 1) * every_ns, stop_ns)
+    return window_end, result
+
+
+def run_query(store, flux, now_ns=None):
+    """Eksekusi query Flux sederhana -> annotated CSV (format respons Influx)"""
+    now_ns = now_ns or _now_ns()
+    m = _RANGE_RE.search(flux)
+    if not m:
+        raise FluxError("query must contain range(start: ...)")
+    start_ns = parse_time_ns(m.group(1), now_ns)
+    stop_ns = parse_time_ns(m.group(2), now_ns) if m.group(2) else now_ns
+    fields = [f for f in _FIELD_RE.findall(flux) if f in FIELDS] or list(FIELDS)
+    times, values = store.select(start_ns, stop_ns, [FIELDS.index(f) for f in fields])
+
+    agg = _AGG_RE.search(flux)
+    if agg:
+        times, values = aggregate(times, values, parse_duration(agg.group(1)), agg.group(2), stop_ns)
+    if not len(times):
+        return ''
+
+    bounds = f"{format_times([start_ns])[0]},{format_times([stop_ns])[0]}"
+    stamps = format_times(times)
+    lines = []
+    if 'pivot(' in flux:
+        lines += ['#group,false,false,true,true,false,true' + ',false' * len(fields),
+                  '#datatype,string,long,dateTime:RFC3339,dateTime:RFC3339,dateTime:RFC3339,string'
+                  + ',double' * len(fields),
+                  '#default,_result,,,,,' + ',' * len(fields),
+                  ',result,table,_start,_stop,_time,_measurement,' + ','.join(fields)]
+        for stamp, row in zip(stamps, values):
+            cells = ','.join('' if np.isnan(v) else repr(float(v)) for v in row)
+            lines.append(f",,0,{bounds},{stamp},{INFLUX_MEASUREMENT},{cells}")
+    else:
+        # Satu tabel per field, seperti export "Robusta Database.csv"
+        lines += ['#group,false,false,true,true,false,false,true,true',
+                  '#datatype,string,long,dateTime:RFC3339,dateTime:RFC3339,dateTime:RFC3339,double,string,string',
+                  '#default,_result,,,,,,,',
+                  ',result,table,_start,_stop,_time,_value,_field,_measurement']
+        for table, field in enumerate(fields):
+            for stamp, v in zip(stamps, values[:, table]):
+                if not np.isnan(v):
+                    lines.append(f",,{table},{bounds},{stamp},{float(v)!r},{field},{INFLUX_MEASUREMENT}")
+    return '\r\n'.join(lines) + '\r\n\r\n'
+
+
+# ===============================
+# HTTP SERVER
+# ===============================
+class StandinHandler(BaseHTTPRequestHandler):
+    server_version = 'enose-influx-standin/1'
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _reply(self, code, body=b'', content_type='application/json'):
+        self.send_response(code)
+        if body:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _error(self, code, message):
+        self._reply(code, json.dumps({'code': 'invalid', 'message': message}).encode('utf-8'))
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path in ('/health', '/ready'):
+            self._reply(200, json.dumps({'name': 'influxdb', 'status': 'pass',
+                                         'points': len(self.server.store)}).encode('utf-8'))
+        elif path == '/ping':
+            self._reply(204)
+        else:
+            self._error(404, 'not found')
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode('utf-8')
+        try:
+            if url.path == '/api/v2/write':
+                times, values = parse_line_protocol(body, params.get('precision', 'ns'))
+                self.server.store.add(times, values)
+                self.server.append_writes(times, values)
+                self._reply(204)
+            elif url.path == '/api/v2/query':
+                if 'json' in (self.headers.get('Content-Type') or ''):
+                    body = json.loads(body).get('query', '')
+                csv_text = run_query(self.server.store, body)
+                self._reply(200, csv_text.encode('utf-8'), 'text/csv; charset=utf-8')
+            else:
+                self._error(404, 'not found')
+        except (ValueError, KeyError) as e:
+            self._error(400, str(e))
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, directory=None, load=True):
+        super().__init__(address, StandinHandler)
+        self.store = PointStore()
+        self.writes_path = None
+        self._write_lock = threading.Lock()
+        if directory:
+            if load:
+                load_recordings(self.store, directory)
+            self.writes_path = os.path.join(directory, WRITES_NAME)
+            if os.path.exists(self.writes_path):
+                with open(self.writes_path, 'r', encoding='utf-8') as f:
+                    self.store.add(*parse_line_protocol(f.read()))
+
+    def append_writes(self, times, values):
+        """Simpan write ke file line protocol (presisi ns) untuk dimuat ulang saat restart"""
+        if not self.writes_path or not len(times):
+            return
+        lines = []
+        for t, row in zip(times, values):
+            pairs = ','.join(f"{f}={float(v)!r}" for f, v in zip(FIELDS, row) if not np.isnan(v))
+            lines.append(f"{INFLUX_MEASUREMENT} {pairs} {int(t)}\n")
+        os.makedirs(os.path.dirname(self.writes_path), exist_ok=True)
+        with self._write_lock, open(self.writes_path, 'a', encoding='utf-8') as f:
+            f.writelines(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="InfluxDB stand-in lokal di atas folder rekaman")
+    parser.add_argument('directory', nargs='?', default=None)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8086)
+    parser.add_argument('--no-recordings', action='store_true', help="hanya data hasil write")
+    args = parser.parse_args(argv)
+
+    server = StandinServer((args.host, args.port), args.directory, load=not args.no_recordings)
+    print(f"Influx stand-in on http://{args.host}:{args.port} ({len(server.store)} points)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,96 +2,306 @@ import sys
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLabel, QPushButton, QLineEdit, 
                              QComboBox, QGroupBox, QGridLayout, QFileDialog, 
-                             QMessageBox, QScrollArea)
+                             QMessageBox, QScrollArea, QListWidget, QAbstractItemView)
 from PyQt6.QtCore import QTimer, Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QFont
 import pyqtgraph as pg
 import numpy as np
 from datetime import datetime
+import bisect
 import csv
 import json
 import os
 import socket
-import requests
+import queue
+import time
 
-# InfluxDB imports
-try:
-    from influxdb_client import InfluxDBClient, Point
-    from influxdb_client.client.write_api import SYNCHRONOUS
-    INFLUXDB_AVAILABLE = True
-except ImportError:
-    INFLUXDB_AVAILABLE = False
-    print("Warning: influxdb-client not installed. Run: pip install influxdb-client")
+# Hanya modul yang dipakai jalur live (terima data -> filter -> grafik) yang
+# di-import di sini. requests (upload Edge Impulse), query history, run browser
+# dan model klasifikasi di-import saat pertama kali dipakai supaya window
+# tampil secepat mungkin (cek dengan bench_startup.py).
+from config import ConfigError, get_config
+from filters import FilterChain, DEFAULT_FILTER_SPEC
+from metrics import MetricsServer, Registry, log, log_limited
+from preprocess import BaselineCompensator, NORMALIZE_MODES
+from protocol import (ACK, FRAME_SIZE, HELLO, RESUME, SENSOR_PREFIX, SESSION, FrameDecoder,
+                      SequenceTracker, parse_sensor_lines, stream_ws)
+from runs import SENSOR_NAMES, WIRE_ORDER
+from stats import RollingStats
 
 # ===============================
-# RUST BACKEND CONFIGURATION
+# KONFIGURASI
 # ===============================
-RUST_DATA_PORT = 8085      # Terima data dari Rust
-RUST_CMD_PORT = 8082       # Kirim command ke Rust
-RUST_STATUS_PORT = 8087    # Terima status InfluxDB dari Rust
+# Port Rust, kredensial InfluxDB/Edge Impulse dan render FPS ada di config.json
+# (lihat config.py). Section performance di-reload otomatis tiap CONFIG_POLL_MS.
+CONFIG_POLL_MS = 2000
+
+# ===============================
+# RENDER CONFIGURATION
+# ===============================
+LIVE_WINDOW_SECS = 6.0     # Auto-scroll grafik live: detik terakhir yang terlihat
+DEFAULT_SAMPLE_DT = 0.1    # detik antar sampel (10 Hz) sebelum ingest rate terukur
+
+# ===============================
+# INFERENCE CONFIGURATION
+# ===============================
+INFER_STRIDE_SECS = 1.0    # Satu window klasifikasi tiap 1 detik waktu relay
+INFER_MAX_BATCH = 32       # Window yang menumpuk diproses sekaligus
+
+# ===============================
+# POSISI STREAM RELAY (BACKFILL)
+# ===============================
+# Sesi + seq terakhir disimpan di folder cache supaya GUI yang di-restart
+# tetap bisa minta backfill (RESUME <sesi> <seq>) ke relay yang sama.
+POSITION_FILE = 'relay_position.json'
+POSITION_SAVE_SECS = 1.0   # Paling sering sekali per detik saat data mengalir
 
 # ===============================
 # THREAD UNTUK TERIMA DATA DARI RUST
 # ===============================
 class DataReceiverThread(QThread):
-    data_received = pyqtSignal(str)
+    rows_received = pyqtSignal(object, object)   # batch teks: rows (N, 9), baris rusak
+    frames_received = pyqtSignal(object)         # batch frame biner (protocol.FRAME_DTYPE)
+    backfill_received = pyqtSignal(object)       # frame yang terlewat, disusulkan relay saat reconnect
     
-    def __init__(self):
+    def __init__(self, host, port, dropped=None, lost=None, position_path=None):
         super().__init__()
+        self.host = host
+        self.port = port
+        self.dropped = dropped    # Counter frame yang dibuang (CRC salah)
+        self.lost = lost          # Counter sampel hilang menurut seq frame biner
         self.running = True
+        # Posisi terakhir di stream relay, bertahan antar koneksi (dan antar
+        # restart GUI kalau position_path diisi) untuk RESUME
+        self.session = None
+        self.tracker = SequenceTracker()
+        self.position_path = position_path
+        self.position_saved_at = 0.0
+        self.position_loaded = False
         
     def run(self):
         try:
             server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            server.bind(('127.0.0.1', RUST_DATA_PORT))
+            server.bind((self.host, self.port))
             server.listen(1)
             server.settimeout(1.0)
-            print(f"Data receiver listening on port {RUST_DATA_PORT}")
+            log('info', 'data_receiver', f"listening on port {self.port}")
             
             while self.running:
                 try:
                     conn, addr = server.accept()
-                    print(f"Rust backend connected: {addr}")
-                    
-                    while self.running:
-                        data = conn.recv(1024).decode('utf-8').strip()
-                        if data:
-                            for line in data.split('\n'):
-                                if line.startswith('SENSOR:'):
-                                    self.data_received.emit(line)
-                        else:
+                    conn.settimeout(1.0)
+                    if not self.position_loaded:
+                        self.load_position()
+                    # Backend membuka HELLO kalau mau kirim frame biner; selain itu teks
+                    first = b''
+                    while len(first) < len(HELLO) and HELLO.startswith(first):
+                        chunk = self.recv(conn)
+                        if not chunk:
                             break
+                        first += chunk
+                    binary = first.startswith(HELLO)
+                    log('info', 'rust_connected', peer=f"{addr[0]}:{addr[1]}",
+                        protocol='binary' if binary else 'text')
+                    if binary:
+                        conn.sendall(ACK + self.resume_line())
+                        self.serve_frames(conn, first[len(HELLO):])
+                    else:
+                        self.serve_text(conn, first)
                     conn.close()
+                    self.save_position()
                 except socket.timeout:
                     continue
                 except Exception as e:
-                    print(f"Data receiver error: {e}")
+                    log_limited('error', 'data_receiver', str(e))
                     
         except Exception as e:
-            print(f"Failed to start data receiver: {e}")
+            log('error', 'data_receiver', f"failed to start: {e}")
+        self.save_position()
+    
+    def recv(self, conn):
+        """recv() yang tetap cek self.running; b'' = koneksi ditutup"""
+        while self.running:
+            try:
+                return conn.recv(65536)
+            except socket.timeout:
+                continue
+        return b''
+    
+    def serve_text(self, conn, data):
+        # Semua baris lengkap di satu recv() diparse sekaligus; baris yang
+        # terpotong di batas recv() disambung dengan chunk berikutnya
+        pending = b''
+        while data:
+            pending += data
+            end = pending.rfind(b'\n') + 1
+            if end:
+                self.emit_rows(pending[:end])
+                pending = pending[end:]
+            data = self.recv(conn)
+        if pending.strip():
+            self.emit_rows(pending)
+    
+    def emit_rows(self, buf):
+        rows, bad = parse_sensor_lines(buf)
+        if len(rows) or bad:
+            self.rows_received.emit(rows, bad)
+    
+    def load_position(self):
+        """Baca sesi + seq terakhir dari run GUI sebelumnya (file rusak/absen = mulai baru)"""
+        self.position_loaded = True
+        if self.position_path is None:
+            return
+        if not os.path.isabs(self.position_path):
+            # Path relatif = di folder cache. Di-resolve saat koneksi pertama
+            # supaya modul cache tidak ter-load sebelum window tampil
+            from cache import cache_dir
+            self.position_path = os.path.join(cache_dir(), self.position_path)
+        try:
+            with open(self.position_path, 'r') as f:
+                pos = json.load(f)
+            self.session, self.tracker.last = int(pos['session']), int(pos['seq'])
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log('warn', 'relay_position', f"posisi relay diabaikan: {e}", path=self.position_path)
+    
+    def save_position(self):
+        if self.position_path is None or self.session is None or self.tracker.last is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.position_path), exist_ok=True)
+            tmp = self.position_path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump({'session': self.session, 'seq': self.tracker.last}, f)
+            os.replace(tmp, self.position_path)
+        except OSError as e:
+            log_limited('error', 'relay_position', str(e), path=self.position_path)
+        self.position_saved_at = time.monotonic()
+    
+    def resume_line(self):
+        """Minta relay menyusulkan sampel setelah seq terakhir yang diterima"""
+        if self.session is None or self.tracker.last is None:
+            return RESUME + b'\n'
+        return b'%s %d %d\n' % (RESUME, self.session, self.tracker.last)
+    
+    def serve_frames(self, conn, data):
+        decoder = FrameDecoder()
+        # Backfill bisa habis tepat di batas recv(); b'' di sini belum berarti putus
+        data = self.read_backfill(conn, decoder, data or self.recv(conn)) or self.recv(conn)
+        while data:
+            frames, corrupt = decoder.feed(data)
+            if corrupt:
+                if self.dropped is not None:
+                    self.dropped.inc(corrupt)
+                log_limited('warn', 'frame_corrupt', f"{corrupt} frame dilewati")
+            if len(frames):
+                self.track(frames)
+                self.frames_received.emit(frames)
+            data = self.recv(conn)
+    
+    def read_backfill(self, conn, decoder, data):
+        """Baca `SESSION <sesi> <n>` + n frame susulan; hasil: sisa data untuk stream live.
+        
+        Relay versi lama tidak membalas RESUME dan langsung mengirim frame.
+        """
+        while len(data) < len(SESSION) and SESSION.startswith(data):
+            chunk = self.recv(conn)
+            if not chunk:
+                return data
+            data += chunk
+        if not data.startswith(SESSION):
+            return data
+        while b'\n' not in data:
+            chunk = self.recv(conn)
+            if not chunk:
+                return b''
+            data += chunk
+        line, data = data.split(b'\n', 1)
+        _, session, count = line.split()
+        session, size = int(session), int(count) * FRAME_SIZE
+        if session != self.session:
+            # Relay restart: seq mulai dari awal lagi
+            self.session, self.tracker = session, SequenceTracker()
+        # Backfill bisa puluhan MB: kumpulkan chunk dulu, gabung sekali
+        chunks, received = [data], len(data)
+        while received < size:
+            chunk = self.recv(conn)
+            if not chunk:
+                return b''
+            chunks.append(chunk)
+            received += len(chunk)
+        data = b''.join(chunks)
+        frames, corrupt = decoder.feed(data[:size])
+        if corrupt and self.dropped is not None:
+            self.dropped.inc(corrupt)
+        if len(frames):
+            self.track(frames)
+            self.backfill_received.emit(frames)
+        return data[size:]
+    
+    def track(self, frames):
+        lost = self.tracker.update(frames['seq'])
+        if lost:
+            if self.lost is not None:
+                self.lost.inc(lost)
+            log_limited('warn', 'sample_loss', f"{lost} sampel hilang", seq=int(frames['seq'][-1]))
+        if time.monotonic() - self.position_saved_at >= POSITION_SAVE_SECS:
+            self.save_position()
     
     def stop(self):
         self.running = False
 
+
+class WebSocketReceiverThread(DataReceiverThread):
+    """Terima data dari WebSocket backend (gui.stream_url), untuk GUI di mesin lain.
+
+    Format binary maupun json masuk lewat frames_received (seq dan timestamp
+    relay ikut, jadi sampel hilang terdeteksi dan tidak di-stamp ulang).
+    """
+    
+    RECONNECT_SECS = 2.0
+    
+    def __init__(self, url, dropped=None, lost=None):
+        super().__init__(None, None, dropped, lost)
+        self.url = url
+    
+    def run(self):
+        while self.running:
+            self.tracker = SequenceTracker()
+            try:
+                log('info', 'ws_connect', url=self.url)
+                for batch in stream_ws(self.url, running=lambda: self.running):
+                    self.track(batch)
+                    self.frames_received.emit(batch)
+            except Exception as e:
+                log_limited('error', 'ws_receiver', str(e), url=self.url)
+            # Backend belum jalan / restart: coba lagi
+            deadline = time.monotonic() + self.RECONNECT_SECS
+            while self.running and time.monotonic() < deadline:
+                time.sleep(0.1)
+
 # ===============================
 # THREAD UNTUK TERIMA STATUS INFLUXDB
 # ===============================
 class StatusReceiverThread(QThread):
     status_received = pyqtSignal(str)
     
-    def __init__(self):
+    def __init__(self, host, port):
         super().__init__()
+        self.host = host
+        self.port = port
         self.running = True
         
     def run(self):
         try:
             server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            server.bind(('127.0.0.1', RUST_STATUS_PORT))
+            server.bind((self.host, self.port))
             server.listen(1)
             server.settimeout(1.0)
-            print(f"Status receiver listening on port {RUST_STATUS_PORT}")
+            log('info', 'status_receiver', f"listening on port {self.port}")
             
             while self.running:
                 try:
@@ -106,14 +316,123 @@ class StatusReceiverThread(QThread):
                 except socket.timeout:
                     continue
                 except Exception as e:
-                    print(f"Status receiver error: {e}")
+                    log_limited('error', 'status_receiver', str(e))
                     
         except Exception as e:
-            print(f"Failed to start status receiver: {e}")
+            log('error', 'status_receiver', f"failed to start: {e}")
     
     def stop(self):
         self.running = False
 
+# ===============================
+# THREAD UNTUK INFERENCE MODEL
+# ===============================
+class InferenceThread(QThread):
+    # (probabilitas window terbaru, latency per window ms, ukuran batch)
+    result_ready = pyqtSignal(object, float, int)
+    
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+        self.running = True
+        self.windows = queue.Queue()
+        
+    def submit(self, window):
+        self.windows.put(window)
+        
+    def run(self):
+        while self.running:
+            try:
+                batch = [self.windows.get(timeout=0.2)]
+            except queue.Empty:
+                continue
+            # Window yang menumpuk selama inference sebelumnya digabung jadi satu batch
+            while len(batch) < INFER_MAX_BATCH:
+                try:
+                    batch.append(self.windows.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                from inference import window_features
+                start = time.perf_counter()
+                probs = self.model.predict_proba(window_features(np.stack(batch)))
+                latency_ms = (time.perf_counter() - start) * 1000.0 / len(batch)
+                self.result_ready.emit(probs[-1], latency_ms, len(batch))
+            except Exception as e:
+                log_limited('error', 'inference', str(e))
+    
+    def stop(self):
+        self.running = False
+
+# ===============================
+# THREAD UNTUK INDEX REKAMAN (RUN BROWSER)
+# ===============================
+class IndexThread(QThread):
+    index_ready = pyqtSignal(object)
+    index_failed = pyqtSignal(str)
+    
+    def __init__(self, directory):
+        super().__init__()
+        self.directory = directory
+        
+    def run(self):
+        try:
+            from cache import default_cache
+            from run_index import RunIndex
+            self.index_ready.emit(RunIndex.build(self.directory, cache=default_cache()))
+        except Exception as e:
+            self.index_failed.emit(str(e))
+
+class OverlayThread(QThread):
+    """Muat data resolusi penuh window terlihat (RunIndex.window) di luar thread GUI"""
+    # (generasi overlay, {path: (time, values)})
+    data_ready = pyqtSignal(int, object)
+    
+    def __init__(self, index, entries, t0, t1, generation):
+        super().__init__()
+        self.index = index
+        self.entries = entries
+        self.t0 = t0
+        self.t1 = t1
+        self.generation = generation
+        
+    def run(self):
+        loaded = {}
+        for entry in self.entries:
+            try:
+                loaded[entry.path] = self.index.window(entry, self.t0, self.t1)
+            except (OSError, ValueError) as e:
+                log_limited('warn', 'overlay', str(e), path=entry.path)
+        self.data_ready.emit(self.generation, loaded)
+
+# ===============================
+# THREAD UNTUK QUERY HISTORY INFLUXDB
+# ===============================
+class HistoryThread(QThread):
+    # (time epoch detik, values (N, 7), window agregasi)
+    page_ready = pyqtSignal(object, object, str)
+    history_failed = pyqtSignal(str)
+    
+    def __init__(self, client, start, stop):
+        super().__init__()
+        self.client = client
+        self.start_ts = start
+        self.stop_ts = stop
+        self.cancelled = False
+        
+    def run(self):
+        try:
+            for t, values, every in self.client.pages(self.start_ts, self.stop_ts):
+                if self.cancelled:
+                    return
+                self.page_ready.emit(t, values, every)
+        except Exception as e:
+            if not self.cancelled:
+                self.history_failed.emit(str(e))
+    
+    def cancel(self):
+        self.cancelled = True
+
 # ===============================
 # MAIN GUI CLASS
 # ===============================
@@ -213,27 +532,129 @@ class ENoseGUI(QMainWindow):
             }
         """)
         
+        self.config = get_config()
         self.is_sampling = False
         self.sample_count = 0
-        self.time_data = []
-        self.sensor_data = {
-            'CO (MCS)': [], 'Ethanol (MCS)': [], 'VOC (MCS)': [],
-            'NO2 (GM)': [], 'Ethanol (GM)': [], 'VOC (GM)': [], 'CO (GM)': []
-        }
+        self.time_data = []        # detik sejak sampel pertama run (timestamp relay, rate bisa berubah per fase)
+        self.run_start_ns = None
+        self.last_text_ns = None
+        self.sensor_data = {sensor: [] for sensor in SENSOR_NAMES}
+        self.state_data = []
+        self.level_data = []
+        
+        # Data hasil filter & kompensasi drift (paralel dengan sensor_data)
+        self.filt_data = {sensor: [] for sensor in SENSOR_NAMES}
+        self.comp_data = {sensor: [] for sensor in SENSOR_NAMES}
+        self.filter_chain = FilterChain.from_spec(DEFAULT_FILTER_SPEC)
+        self.filter_chain_spec = DEFAULT_FILTER_SPEC   # spec valid terakhir (window inference)
+        self.compensator = BaselineCompensator(len(SENSOR_NAMES))
         
         self.influx_record_count = 0
+        self.model = None
+        self.infer_thread = None
+        self.class_labels = []
+        self.run_index = None
+        self.index_thread = None
+        self.browse_mode = False
+        self.overlay_curves = []    # (entry, channel index, curve)
+        self.overlay_markers = []   # garis awal level run pertama yang dipilih
+        self.overlay_thread = None
+        self.overlay_generation = 0 # naik tiap overlay diganti; hasil thread lama dibuang
+        self.overlay_pending = False
+        self.history_client = None
+        self.history_thread = None
+        self.history_stale = set()  # thread lama yang dibatalkan tapi belum selesai
+        self.history_curves = []
+        self.history_span = (0.0, 0.0)
+        self.history_t0 = 0.0       # epoch detik untuk x = 0 di history view
+        self.history_every = None
+        self.history_t = np.empty(0)
+        self.history_values = np.empty((0, len(SENSOR_NAMES)))
+        perf = self.config.performance
+        self.stats = RollingStats(len(self.sensor_data), span=perf.stats_window_s,
+                                  ewma_secs=perf.stats_ewma_s)
+        self.view_dirty = False
+        self.rust_connected = False
         
-        # Start receiver threads
-        self.data_thread = DataReceiverThread()
-        self.data_thread.data_received.connect(self.handle_sensor_data)
-        self.data_thread.start()
+        # Metrics, di-scrape lewat GET /metrics (gui.metrics_port di config.json)
+        self.metrics = Registry('enose_gui_')
+        self.m_samples = self.metrics.counter('samples_total', "Sampel SENSOR yang diterima dari backend")
+        self.m_parse_errors = self.metrics.counter('parse_errors_total', "Baris SENSOR yang gagal diparse")
+        self.m_dropped = self.metrics.counter('dropped_lines_total', "Baris/frame dari backend yang dibuang (bukan SENSOR:, CRC salah)")
+        self.m_lost = self.metrics.counter('samples_lost_total', "Sampel hilang menurut seq frame biner")
+        self.m_backfilled = self.metrics.counter('backfilled_samples_total', "Sampel terlewat yang disusulkan relay saat reconnect")
+        self.m_frame = self.metrics.histogram('frame_seconds', "Durasi refresh grafik + label per render tick")
+        self.m_infer = self.metrics.histogram('inference_seconds', "Latency inference per window")
+        self.m_influx_records = self.metrics.counter('influx_records_total', "Record yang dikonfirmasi tersimpan di InfluxDB")
+        self.metrics.gauge('ingest_rate_hz', "Laju sampel masuk (EWMA)", fn=self.ingest_rate)
+        self.metrics.gauge('inference_queue_depth', "Window yang menunggu inference",
+                           fn=lambda: self.infer_thread.windows.qsize() if self.infer_thread else 0)
+        self.metrics.gauge('backend_wal_depth', "Record di WAL backend yang belum masuk InfluxDB",
+                           fn=lambda: self.wal_depth)
+        self.metrics_server = MetricsServer(self.metrics, self.config.gui.host, self.config.gui.metrics_port)
+        self.last_sample_at = None
+        self.sample_dt = None
+        self.wal_depth = 0
+        
+        # Receiver threads dibuat sekarang, tapi baru di-start setelah window
+        # pertama kali tampil (lihat showEvent)
+        if self.config.gui.stream_url:
+            self.data_thread = WebSocketReceiverThread(self.config.gui.stream_url,
+                                                       self.m_dropped, self.m_lost)
+        else:
+            self.data_thread = DataReceiverThread(self.config.gui.host, self.config.gui.data_port,
+                                                  self.m_dropped, self.m_lost, POSITION_FILE)
+        self.data_thread.rows_received.connect(self.handle_rows)
+        self.data_thread.frames_received.connect(self.handle_frames)
+        self.data_thread.backfill_received.connect(self.handle_backfill)
         
-        self.status_thread = StatusReceiverThread()
+        self.status_thread = StatusReceiverThread(self.config.gui.host, self.config.gui.status_port)
         self.status_thread.status_received.connect(self.handle_influx_status)
-        self.status_thread.start()
+        self.receivers_started = False
         
         self.init_ui()
         
+        self.render_timer = QTimer(self)
+        self.render_timer.timeout.connect(self.refresh_view)
+        self.render_timer.start(self.render_interval_ms())
+        
+        self.config_timer = QTimer(self)
+        self.config_timer.timeout.connect(self.reload_config)
+        self.config_timer.start(CONFIG_POLL_MS)
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.receivers_started:
+            self.receivers_started = True
+            # Antre setelah event paint pertama, jadi window tampil dulu
+            QTimer.singleShot(0, self.start_receivers)
+    
+    def start_receivers(self):
+        self.data_thread.start()
+        self.status_thread.start()
+        self.metrics_server.start()
+    
+    def ingest_rate(self):
+        """Sampel/detik dari EWMA jarak antar sampel; 0 kalau data berhenti"""
+        if self.sample_dt is None or time.monotonic() - self.last_sample_at > 5.0:
+            return 0.0
+        return 1.0 / max(self.sample_dt, 1e-6)
+    
+    def render_interval_ms(self):
+        return max(1, 1000 // self.config.performance.render_fps)
+    
+    def reload_config(self):
+        """Hot reload section performance dari config.json"""
+        changed = self.config.reload_if_changed()
+        if 'render_fps' in changed:
+            self.render_timer.setInterval(self.render_interval_ms())
+        if 'stats_window_s' in changed or 'stats_ewma_s' in changed:
+            perf = self.config.performance
+            self.stats.set_window(perf.stats_window_s, perf.stats_ewma_s)
+            self.view_dirty = True
+        if changed:
+            log('info', 'config_reload', **changed)
+        
     def init_ui(self):
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -332,9 +753,58 @@ class ENoseGUI(QMainWindow):
         self.influx_records.setStyleSheet("color: #b0b0b0;")
         influx_layout.addWidget(self.influx_records)
         
+        self.influx_queue = QLabel("Antrian WAL: 0")
+        self.influx_queue.setStyleSheet("color: #b0b0b0;")
+        influx_layout.addWidget(self.influx_queue)
+        
         influx_group.setLayout(influx_layout)
         left_layout.addWidget(influx_group)
         
+        # Processing
+        processing_group = QGroupBox("Processing")
+        processing_layout = QGridLayout()
+        
+        processing_layout.addWidget(QLabel("Data View:"), 0, 0)
+        self.data_view = QComboBox()
+        self.data_view.addItems(["Raw", "Filtered", "Compensated"])
+        self.data_view.currentIndexChanged.connect(self.on_view_changed)
+        processing_layout.addWidget(self.data_view, 0, 1)
+        
+        processing_layout.addWidget(QLabel("Normalisasi:"), 1, 0)
+        self.norm_mode = QComboBox()
+        self.norm_mode.addItems(list(NORMALIZE_MODES))
+        self.norm_mode.currentTextChanged.connect(self.on_norm_mode_changed)
+        processing_layout.addWidget(self.norm_mode, 1, 1)
+        
+        processing_layout.addWidget(QLabel("Filter:"), 2, 0)
+        self.filter_spec = QLineEdit(DEFAULT_FILTER_SPEC)
+        self.filter_spec.setToolTip("Detik, contoh: hampel:0.7,median:0.5,iir:0.3 atau savgol:1.1/2@0+1+2")
+        self.filter_spec.editingFinished.connect(self.on_filter_spec_changed)
+        processing_layout.addWidget(self.filter_spec, 2, 1)
+        
+        processing_group.setLayout(processing_layout)
+        left_layout.addWidget(processing_group)
+        
+        # Klasifikasi (model inference)
+        infer_group = QGroupBox("Klasifikasi")
+        self.infer_layout = QVBoxLayout()
+        
+        self.load_model_btn = QPushButton("Load Model")
+        self.load_model_btn.setStyleSheet("background-color: #C3B1E1; color: #000000; font-weight: bold;")
+        self.load_model_btn.clicked.connect(self.load_model_file)
+        self.infer_layout.addWidget(self.load_model_btn)
+        
+        self.model_label = QLabel("Model: -")
+        self.model_label.setStyleSheet("color: #b0b0b0;")
+        self.infer_layout.addWidget(self.model_label)
+        
+        self.latency_label = QLabel("Latency: -")
+        self.latency_label.setStyleSheet("color: #b0b0b0;")
+        self.infer_layout.addWidget(self.latency_label)
+        
+        infer_group.setLayout(self.infer_layout)
+        left_layout.addWidget(infer_group)
+        
         # Sensor Readings
         readings_group = QGroupBox("Sensor Readings")
         readings_layout = QVBoxLayout()
@@ -349,6 +819,56 @@ class ENoseGUI(QMainWindow):
         readings_group.setLayout(readings_layout)
         left_layout.addWidget(readings_group)
         
+        # Run Browser (rekaman offline)
+        browser_group = QGroupBox("Run Browser")
+        browser_layout = QVBoxLayout()
+        
+        self.open_runs_btn = QPushButton("Open Runs")
+        self.open_runs_btn.setStyleSheet("background-color: #B5EAD7; color: #000000; font-weight: bold;")
+        self.open_runs_btn.clicked.connect(self.open_runs)
+        browser_layout.addWidget(self.open_runs_btn)
+        
+        self.run_list = QListWidget()
+        self.run_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.run_list.setStyleSheet("background-color: #2a2a2a; color: #e0e0e0; border-radius: 5px;")
+        self.run_list.setMinimumHeight(120)
+        self.run_list.itemSelectionChanged.connect(self.show_selected_runs)
+        browser_layout.addWidget(self.run_list)
+        
+        self.overlay_channel = QComboBox()
+        self.overlay_channel.addItems(["All Channels"] + SENSOR_NAMES)
+        self.overlay_channel.currentIndexChanged.connect(self.show_selected_runs)
+        browser_layout.addWidget(self.overlay_channel)
+        
+        self.live_btn = QPushButton("Back to Live")
+        self.live_btn.setStyleSheet("background-color: #7FFF7F; color: #000000; font-weight: bold;")
+        self.live_btn.clicked.connect(self.back_to_live)
+        self.live_btn.setEnabled(False)
+        browser_layout.addWidget(self.live_btn)
+        
+        browser_group.setLayout(browser_layout)
+        left_layout.addWidget(browser_group)
+        
+        # History (InfluxDB)
+        history_group = QGroupBox("History")
+        history_layout = QVBoxLayout()
+        
+        self.history_range = QComboBox()
+        self.history_range.addItems(["1 Jam Terakhir", "6 Jam Terakhir", "24 Jam Terakhir", "7 Hari Terakhir"])
+        history_layout.addWidget(self.history_range)
+        
+        self.history_btn = QPushButton("Load History")
+        self.history_btn.setStyleSheet("background-color: #C7CEEA; color: #000000; font-weight: bold;")
+        self.history_btn.clicked.connect(self.load_history)
+        history_layout.addWidget(self.history_btn)
+        
+        self.history_label = QLabel("Window: -")
+        self.history_label.setStyleSheet("color: #b0b0b0;")
+        history_layout.addWidget(self.history_label)
+        
+        history_group.setLayout(history_layout)
+        left_layout.addWidget(history_group)
+        
         left_layout.addStretch()
         
         # Set scroll area content
@@ -384,6 +904,7 @@ class ENoseGUI(QMainWindow):
         
         # Warna cantik sesuai referensi
         colors = ['#FF6B8A', '#FFB84D', '#FFE66D', '#4ECDC4', '#A78BFA', '#60A5FA', '#34D399']
+        self.colors = colors
         self.curves = []
         
         for sensor, color in zip(self.sensor_data.keys(), colors):
@@ -391,76 +912,547 @@ class ENoseGUI(QMainWindow):
             self.curves.append(curve)
         
         right_layout.addWidget(self.plot_widget)
+        
+        # Reload resolusi penuh untuk window terlihat (debounce saat zoom/pan)
+        self.overlay_timer = QTimer(self)
+        self.overlay_timer.setSingleShot(True)
+        self.overlay_timer.setInterval(100)
+        self.overlay_timer.timeout.connect(self.update_overlay_data)
+        self.history_timer = QTimer(self)
+        self.history_timer.setSingleShot(True)
+        self.history_timer.setInterval(300)
+        self.history_timer.timeout.connect(self.requery_history)
+        self.plot_widget.sigXRangeChanged.connect(self.on_plot_range_changed)
         main_layout.addWidget(right_panel)
     
     def send_command_to_rust(self, command):
         """Kirim command ke Rust backend"""
         try:
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.connect(('127.0.0.1', RUST_CMD_PORT))
+            sock.connect((self.config.gui.host, self.config.gui.command_port))
             sock.send(command.encode('utf-8'))
             sock.close()
-            print(f"Command sent to Rust: {command}")
+            log('info', 'command_sent', command=command)
             return True
         except Exception as e:
-            print(f"Failed to send command: {e}")
+            log('error', 'command_failed', str(e), command=command)
             QMessageBox.critical(self, "Error", f"Tidak dapat terhubung ke Rust backend:\n{str(e)}")
             return False
     
+    def note_arrival(self, n):
+        """Update EWMA jarak antar sampel (untuk metric ingest_rate_hz)"""
+        now = time.monotonic()
+        if self.last_sample_at is not None:
+            dt = (now - self.last_sample_at) / n
+            self.sample_dt = dt if self.sample_dt is None else 0.9 * self.sample_dt + 0.1 * dt
+        self.last_sample_at = now
+    
     def handle_sensor_data(self, data):
-        """Handle data dari Rust backend"""
-        # Update status koneksi
-        self.rust_status.setText("● Rust Backend: Connected")
-        self.rust_status.setStyleSheet("color: #7FFF7F; font-weight: bold;")
+        """Handle satu atau beberapa baris SENSOR teks dari Rust backend"""
+        self.handle_rows(*parse_sensor_lines(data))
+    
+    def handle_rows(self, rows, bad=()):
+        """Batch hasil parse_sensor_lines: rows (N, 9) urutan wire + state, level"""
+        for offset, line in bad:
+            if line.strip().startswith(SENSOR_PREFIX):
+                self.m_parse_errors.inc()
+                log_limited('warn', 'parse_error', "baris SENSOR rusak", offset=offset, line=repr(line[:80]))
+            else:
+                self.m_dropped.inc()
+        if not len(rows):
+            return
+        self.rust_connected = True
+        self.note_arrival(len(rows))
+        self.add_samples(rows[:, WIRE_ORDER], rows[:, 7].astype(int), rows[:, 8].astype(int),
+                         self.arrival_stamps(len(rows)))
+    
+    def arrival_stamps(self, n):
+        """Timestamp (ns) untuk n baris teks, yang tidak membawa timestamp
+        
+        Disebar rata sejak batch sebelumnya supaya jarak sampel tetap terlihat.
+        """
+        now = time.time_ns()
+        last = self.last_text_ns
+        if last is not None and 0 < now - last < 1_000_000_000:
+            start = last
+        else:
+            # Batch pertama / setelah jeda: mundur dari now dengan jarak sampel
+            # terukur (seperti Clock::stamp di pipeline.rs), tetap setelah batch lalu
+            start = now - int(n * (self.sample_dt or DEFAULT_SAMPLE_DT) * 1e9)
+            if last is not None:
+                start = max(start, last)
+        self.last_text_ns = now
+        return [start + (now - start) * (i + 1) // n for i in range(n)]
+    
+    def handle_frames(self, frames):
+        """Batch frame biner dari Rust backend (sudah lolos CRC di receiver)"""
+        self.note_arrival(len(frames))
+        self.add_frames(frames)
+    
+    def handle_backfill(self, frames):
+        """Sampel yang terlewat selama GUI tidak terhubung, masuk sebelum data live
+        
+        Tidak dihitung ke ingest rate (datang sekaligus).
+        """
+        self.m_backfilled.inc(len(frames))
+        log('info', 'backfill', f"{len(frames)} sampel disusulkan",
+            first_seq=int(frames['seq'][0]), last_seq=int(frames['seq'][-1]))
+        self.add_frames(frames)
+    
+    def add_frames(self, frames):
+        self.rust_connected = True
+        stamps = np.where(frames['timestamp'] > 0, frames['timestamp'], time.time_ns())
+        self.add_samples(frames['values'][:, WIRE_ORDER], frames['state'], frames['level'], stamps)
+    
+    def add_samples(self, values, states, levels, stamps_ns):
+        """Simpan batch sampel (N, 7) urutan SENSOR_NAMES
+        
+        Filter, kompensasi drift dan statistik dipanggil sekali per batch (hasil
+        sama dengan per sampel); list data diperpanjang sekaligus.
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(SENSOR_NAMES))
+        n = len(values)
+        if not n:
+            return
+        stamps_ns = np.asarray(stamps_ns, dtype=np.int64)
+        states = np.asarray(states).astype(int).tolist()
+        first = self.sample_count
+        self.sample_count += n
+        self.m_samples.inc(n)
+        if self.run_start_ns is None:
+            self.run_start_ns = int(stamps_ns[0])
+        t = np.round((stamps_ns - self.run_start_ns) / 1e9, 3)
+        self.time_data.extend(t.tolist())
+        self.state_data.extend(states)
+        self.level_data.extend(np.asarray(levels).astype(int).tolist())
+        
+        filt = self.filter_chain.process(values, t)
+        comp = self.compensator.process(filt, states, t)
+        for i, sensor in enumerate(SENSOR_NAMES):
+            self.sensor_data[sensor].extend(values[:, i].tolist())
+            self.filt_data[sensor].extend(filt[:, i].tolist())
+            self.comp_data[sensor].extend(comp[:, i].tolist())
         
-        # Parse: SENSOR:no2,ethanol,voc,co,co_mics,ethanol_mics,voc_mics,state,level
+        self.stats.update_batch(t, values)
+        self.view_dirty = True
+        
+        if self.infer_thread is not None:
+            # Satu window tiap INFER_STRIDE_SECS detik (berapa pun rate live), berakhir
+            # di sampel pertama tiap detik baru; batch besar (backfill) hanya
+            # mengirim INFER_MAX_BATCH window terbaru
+            ticks = np.floor(t / INFER_STRIDE_SECS)
+            prev = np.floor(self.time_data[first - 1] / INFER_STRIDE_SECS) if first else -1.0
+            ends = first + 1 + np.flatnonzero(np.diff(np.r_[prev, ticks]) > 0)
+            for end in ends[-INFER_MAX_BATCH:]:
+                self.submit_inference_window(int(end))
+    
+    def load_model_file(self):
+        filepath, _ = QFileDialog.getOpenFileName(self, "Load Model", "", "Model Files (*.npz *.onnx)")
+        if not filepath:
+            return
         try:
-            parts = data.split(':')[1].split(',')
-            if len(parts) >= 7:
-                self.sample_count += 1
-                self.time_data.append(self.sample_count * 0.1)
-                
-                # Map data ke sensor yang benar
-                sensor_values = [
-                    float(parts[4]),  # CO (MCS)
-                    float(parts[5]),  # Ethanol (MCS)
-                    float(parts[6]),  # VOC (MCS)
-                    float(parts[0]),  # NO2 (GM)
-                    float(parts[1]),  # Ethanol (GM)
-                    float(parts[2]),  # VOC (GM)
-                    float(parts[3]),  # CO (GM)
-                ]
-                
-                for i, (sensor, value) in enumerate(zip(self.sensor_data.keys(), sensor_values)):
-                    self.sensor_data[sensor].append(value)
-                    self.sensor_labels[sensor].setText(f"{sensor}: {value:.2f}")
-                
-                # Update grafik
-                for sensor, curve in zip(self.sensor_data.keys(), self.curves):
-                    curve.setData(self.time_data, self.sensor_data[sensor])
-                
-                # Auto-scroll
-                if len(self.time_data) > 60:
-                    self.plot_widget.setXRange(self.time_data[-60], self.time_data[-1])
-                
-                self.sample_count_label.setText(f"Samples: {self.sample_count}")
-                
+            from inference import load_model
+            model = load_model(filepath)
         except Exception as e:
-            print(f"Error parsing sensor data: {e}")
+            QMessageBox.critical(self, "Error", f"Gagal load model:\n{str(e)}")
+            return
+        
+        self.stop_inference()
+        self.model = model
+        
+        for label in self.class_labels:
+            self.infer_layout.removeWidget(label)
+            label.deleteLater()
+        self.class_labels = []
+        for cls in model.classes:
+            label = QLabel(f"{cls}: -")
+            label.setStyleSheet("background-color: #2a2a2a; padding: 6px; border-radius: 5px; color: #e0e0e0;")
+            self.infer_layout.addWidget(label)
+            self.class_labels.append(label)
+        
+        self.model_label.setText(f"Model: {os.path.basename(filepath)} (window {model.window} @ {model.rate:g} Hz, {model.source})")
+        self.infer_thread = InferenceThread(model)
+        self.infer_thread.result_ready.connect(self.handle_inference)
+        self.infer_thread.start()
+    
+    def stop_inference(self):
+        if self.infer_thread is not None:
+            self.infer_thread.stop()
+            self.infer_thread.wait()
+            self.infer_thread = None
+    
+    def submit_inference_window(self, end=None):
+        """Kirim window yang berakhir di sampel `end` (default terakhir) ke thread inference
+        
+        Sampel mentah diresample ke rate model (model.window titik, jarak 1/model.rate
+        detik), lalu filter / kompensasi dihitung ulang di grid itu, jadi window model
+        dan window filter sama panjang (detik) dengan data training berapa pun rate
+        live. Window yang belum penuh atau memotong celah data dilewati.
+        """
+        from align import DEFAULT_MAX_GAP, resample
+        end = len(self.time_data) if end is None else end
+        if end < 2:
+            return
+        w = self.model.window
+        # Filter butuh riwayat: grid 2x panjang, separuh awal hanya untuk warmup
+        n = w if self.model.source == 'raw' else 2 * w
+        grid = self.time_data[end - 1] - np.arange(n - 1, -1, -1) / self.model.rate
+        start = max(bisect.bisect_left(self.time_data, grid[0], 0, end) - 1, 0)
+        raw = np.column_stack([self.sensor_data[sensor][start:end] for sensor in SENSOR_NAMES])
+        window = resample(self.time_data[start:end], raw, grid, max_gap=DEFAULT_MAX_GAP)
+        valid = ~np.isnan(window).any(axis=1)
+        if not valid[-w:].all():
+            return
+        if self.model.source != 'raw':
+            # Warmup = bagian valid terakhir yang bersambung
+            bad = np.flatnonzero(~valid)
+            k = bad[-1] + 1 if len(bad) else 0
+            window = FilterChain.from_spec(self.filter_chain_spec).process(window[k:], grid[k:])[-w:]
+            if self.model.source == 'compensated':
+                window = self.compensator.apply(window)
+                if np.isnan(window).any():
+                    return
+        self.infer_thread.submit(window)
+    
+    def handle_inference(self, probs, latency_ms, batch_size):
+        best = int(np.argmax(probs))
+        for i, (label, cls) in enumerate(zip(self.class_labels, self.model.classes)):
+            label.setText(f"{cls}: {probs[i] * 100:.1f}%")
+            color = "#7FFF7F" if i == best else "#e0e0e0"
+            label.setStyleSheet(f"background-color: #2a2a2a; padding: 6px; border-radius: 5px; color: {color};")
+        self.latency_label.setText(f"Latency: {latency_ms:.2f} ms/window (batch {batch_size})")
+        self.m_infer.observe(latency_ms / 1000.0)
+    
+    def open_runs(self):
+        directory = QFileDialog.getExistingDirectory(self, "Open Runs")
+        if not directory:
+            return
+        self.open_runs_btn.setEnabled(False)
+        self.open_runs_btn.setText("Indexing...")
+        self.index_thread = IndexThread(directory)
+        self.index_thread.index_ready.connect(self.handle_run_index)
+        self.index_thread.index_failed.connect(self.handle_index_failed)
+        self.index_thread.start()
+    
+    def handle_run_index(self, index):
+        self.run_index = index
+        self.run_list.clear()
+        for entry in index.entries:
+            self.run_list.addItem(entry.label)
+            levels = [f"L{lv}: {a:.0f}-{b:.0f} s" for lv, a, b in entry.levels if lv >= 0]
+            self.run_list.item(self.run_list.count() - 1).setToolTip(
+                "\n".join(levels) if levels else "Tanpa kolom Level")
+        self.open_runs_btn.setEnabled(True)
+        self.open_runs_btn.setText("Open Runs")
+        if not len(index):
+            QMessageBox.warning(self, "Run Browser", "Tidak ada rekaman di folder ini!")
+    
+    def handle_index_failed(self, error):
+        self.open_runs_btn.setEnabled(True)
+        self.open_runs_btn.setText("Open Runs")
+        QMessageBox.critical(self, "Error", f"Gagal index folder:\n{error}")
+    
+    def clear_overlay(self):
+        for _, _, curve in self.overlay_curves:
+            self.plot_widget.removeItem(curve)
+        for marker in self.overlay_markers:
+            self.plot_widget.removeItem(marker)
+        self.overlay_curves = []
+        self.overlay_markers = []
+        self.overlay_generation += 1
+    
+    def show_selected_runs(self):
+        """Overlay run terpilih (preview dari index, langsung tanpa baca file)"""
+        if self.run_index is None:
+            return
+        rows = sorted(i.row() for i in self.run_list.selectedIndexes())
+        self.clear_overlay()
+        if not rows:
+            return
+        
+        self.browse_mode = True
+        self.live_btn.setEnabled(True)
+        for curve in self.curves:
+            curve.setVisible(False)
+        
+        channel = self.overlay_channel.currentIndex() - 1
+        channels = range(len(SENSOR_NAMES)) if channel < 0 else [channel]
+        styles = [Qt.PenStyle.SolidLine, Qt.PenStyle.DashLine, Qt.PenStyle.DotLine, Qt.PenStyle.DashDotLine]
+        run_colors = ['#FF6B8A', '#4ECDC4', '#FFE66D', '#A78BFA', '#FFB84D', '#60A5FA', '#34D399']
+        
+        t_max = 0.0
+        v_min, v_max = np.inf, -np.inf
+        for n, row in enumerate(rows):
+            entry = self.run_index.entries[row]
+            for c in channels:
+                if channel < 0:
+                    pen = pg.mkPen(color=self.colors[c], width=1.5, style=styles[n % len(styles)])
+                else:
+                    pen = pg.mkPen(color=run_colors[n % len(run_colors)], width=1.5)
+                curve = self.plot_widget.plot(entry.preview_time, entry.preview_values[:, c], pen=pen,
+                                              name=f"{entry.name}: {SENSOR_NAMES[c]}")
+                self.overlay_curves.append((entry, c, curve))
+                v_min = min(v_min, float(entry.ch_min[c]))
+                v_max = max(v_max, float(entry.ch_max[c]))
+            t_max = max(t_max, float(entry.preview_time[-1]))
+        
+        # Batas level (dari index) untuk run pertama yang dipilih
+        for level, start, _ in self.run_index.entries[rows[0]].levels:
+            if level < 0:
+                continue
+            marker = pg.InfiniteLine(start, angle=90, label=f"L{level}",
+                                     pen=pg.mkPen(color='#808080', width=1, style=Qt.PenStyle.DashLine),
+                                     labelOpts={'position': 0.95, 'color': '#b0b0b0'})
+            self.plot_widget.addItem(marker)
+            self.overlay_markers.append(marker)
+        
+        self.plot_widget.setXRange(0, t_max)
+        self.plot_widget.setYRange(v_min, v_max)
+    
+    def on_plot_range_changed(self, *args):
+        if self.overlay_curves:
+            self.overlay_timer.start()
+        elif self.history_curves:
+            self.history_timer.start()
+    
+    def update_overlay_data(self):
+        """Ganti preview dengan data resolusi penuh untuk window terlihat (dimuat di thread)"""
+        if not self.overlay_curves:
+            return
+        if self.overlay_thread is not None and self.overlay_thread.isRunning():
+            # Satu load sekaligus; zoom/pan selama load diproses setelahnya
+            self.overlay_pending = True
+            return
+        t0, t1 = self.plot_widget.getPlotItem().viewRange()[0]
+        entries = list({entry.path: entry for entry, _, _ in self.overlay_curves}.values())
+        self.overlay_thread = OverlayThread(self.run_index, entries, t0, t1, self.overlay_generation)
+        self.overlay_thread.data_ready.connect(self.handle_overlay_data)
+        self.overlay_thread.finished.connect(self.handle_overlay_done)
+        self.overlay_thread.start()
+    
+    def handle_overlay_data(self, generation, loaded):
+        if generation != self.overlay_generation:
+            return
+        for entry, c, curve in self.overlay_curves:
+            if entry.path in loaded:
+                t, values = loaded[entry.path]
+                curve.setData(t, values[:, c])
+    
+    def handle_overlay_done(self):
+        if self.overlay_pending:
+            self.overlay_pending = False
+            self.update_overlay_data()
+    
+    def load_history(self):
+        """Tampilkan data InfluxDB untuk rentang terpilih, diisi bertahap per halaman"""
+        from history import relative_range
+        hours = [1, 6, 24, 24 * 7][self.history_range.currentIndex()]
+        start, stop = relative_range(hours)
+        self.run_list.clearSelection()
+        self.clear_overlay()
+        self.clear_history()
+        
+        self.browse_mode = True
+        self.live_btn.setEnabled(True)
+        for curve in self.curves:
+            curve.setVisible(False)
+        for sensor, color in zip(SENSOR_NAMES, self.colors):
+            curve = self.plot_widget.plot(pen=pg.mkPen(color=color, width=1.5), name=f"History: {sensor}")
+            self.history_curves.append(curve)
+        
+        self.history_t0 = start
+        self.plot_widget.setLabel('bottom', f"Time (s) sejak {datetime.fromtimestamp(start):%Y-%m-%d %H:%M:%S}")
+        self.plot_widget.blockSignals(True)
+        self.plot_widget.setXRange(0, stop - start, padding=0)
+        self.plot_widget.blockSignals(False)
+        self.start_history_query(start, stop)
+    
+    def start_history_query(self, start, stop):
+        from history import InfluxHistory, choose_window
+        if self.history_client is None:
+            influx = self.config.influx
+            self.history_client = InfluxHistory(influx.url, influx.token, influx.org, influx.bucket)
+        self.cancel_history_thread()
+        self.history_every = choose_window(stop - start)[1]
+        self.history_span = (start - self.history_t0, stop - self.history_t0)
+        self.history_t = np.empty(0)
+        self.history_values = np.empty((0, len(SENSOR_NAMES)))
+        self.history_label.setText(f"Window: {self.history_every} (loading...)")
+        self.history_thread = HistoryThread(self.history_client, start, stop)
+        self.history_thread.page_ready.connect(self.handle_history_page)
+        self.history_thread.history_failed.connect(self.handle_history_failed)
+        self.history_thread.finished.connect(self.handle_history_done)
+        self.history_thread.start()
+    
+    def handle_history_page(self, t, values, every):
+        if self.sender() is not self.history_thread or not self.history_curves:
+            return
+        self.history_t = np.concatenate([self.history_t, t - self.history_t0])
+        self.history_values = np.concatenate([self.history_values, values])
+        for i, curve in enumerate(self.history_curves):
+            curve.setData(self.history_t, self.history_values[:, i], connect='finite')
+        if len(self.history_values):
+            finite = self.history_values[np.isfinite(self.history_values)]
+            if len(finite):
+                self.plot_widget.setYRange(float(finite.min()), float(finite.max()))
+        self.history_label.setText(f"Window: {every} ({len(self.history_t)} titik, loading...)")
+    
+    def handle_history_done(self):
+        if self.sender() is self.history_thread and self.history_curves:
+            self.history_label.setText(f"Window: {self.history_every} ({len(self.history_t)} titik)")
+    
+    def handle_history_failed(self, error):
+        if self.sender() is not self.history_thread:
+            return
+        self.history_label.setText("Window: -")
+        QMessageBox.critical(self, "History", f"Gagal query InfluxDB:\n{error}")
+    
+    def requery_history(self):
+        """Zoom/pan: query ulang rentang terlihat dengan window agregasi yang sesuai"""
+        from history import choose_window
+        x0, x1 = self.plot_widget.getPlotItem().viewRange()[0]
+        start, stop = self.history_t0 + x0, self.history_t0 + x1
+        loaded = self.history_span[0] <= x0 and x1 <= self.history_span[1]
+        if loaded and choose_window(stop - start)[1] == self.history_every:
+            return
+        self.start_history_query(start, stop)
+    
+    def cancel_history_thread(self):
+        thread = self.history_thread
+        if thread is None:
+            return
+        thread.cancel()
+        if thread.isRunning():
+            self.history_stale.add(thread)
+            thread.finished.connect(lambda: self.history_stale.discard(thread))
+        self.history_thread = None
+    
+    def clear_history(self):
+        self.cancel_history_thread()
+        for curve in self.history_curves:
+            self.plot_widget.removeItem(curve)
+        self.history_curves = []
+        self.history_label.setText("Window: -")
+    
+    def back_to_live(self):
+        self.run_list.clearSelection()
+        self.clear_overlay()
+        if self.history_curves:
+            self.clear_history()
+            self.plot_widget.setLabel('bottom', 'Time (s)', color='#e0e0e0', **{'font-size': '11pt'})
+        self.browse_mode = False
+        self.live_btn.setEnabled(False)
+        for curve in self.curves:
+            curve.setVisible(True)
+        self.plot_widget.setYRange(0, 25)
+        self.view_dirty = True
+    
+    def display_data(self):
+        """Series yang ditampilkan & diekspor sesuai pilihan Data View"""
+        view = self.data_view.currentText()
+        if view == "Compensated":
+            return self.comp_data
+        if view == "Filtered":
+            return self.filt_data
+        return self.sensor_data
+    
+    def recompute_processing(self):
+        """Hitung ulang filter + kompensasi seluruh run (batch) dari data raw"""
+        self.filter_chain.reset()
+        self.compensator = BaselineCompensator(len(SENSOR_NAMES), mode=self.norm_mode.currentText())
+        if self.time_data:
+            raw = np.column_stack([self.sensor_data[sensor] for sensor in SENSOR_NAMES])
+            filt = self.filter_chain.process(raw, self.time_data)
+            comp = self.compensator.process(filt, self.state_data, self.time_data)
+            for i, sensor in enumerate(SENSOR_NAMES):
+                self.filt_data[sensor] = filt[:, i].tolist()
+                self.comp_data[sensor] = comp[:, i].tolist()
+        else:
+            for sensor in SENSOR_NAMES:
+                self.filt_data[sensor] = []
+                self.comp_data[sensor] = []
+    
+    def on_view_changed(self, index):
+        self.view_dirty = True
+    
+    def on_norm_mode_changed(self, mode):
+        self.recompute_processing()
+        self.view_dirty = True
+    
+    def on_filter_spec_changed(self):
+        try:
+            chain = FilterChain.from_spec(self.filter_spec.text())
+        except ValueError as e:
+            QMessageBox.warning(self, "Filter", f"Spec filter tidak valid:\n{e}")
+            return
+        self.filter_chain = chain
+        self.filter_chain_spec = self.filter_spec.text()
+        self.recompute_processing()
+        self.view_dirty = True
+    
+    def refresh_view(self):
+        """Refresh label & grafik sekali per render tick"""
+        if not self.view_dirty:
+            return
+        self.view_dirty = False
+        frame_start = time.perf_counter()
+        
+        # Update status koneksi
+        if self.rust_connected:
+            self.rust_status.setText("● Rust Backend: Connected")
+            self.rust_status.setStyleSheet("color: #7FFF7F; font-weight: bold;")
+        
+        # Update grafik (dilewati saat run browser sedang menampilkan overlay)
+        if not self.browse_mode:
+            data = self.display_data()
+            for sensor, curve in zip(data.keys(), self.curves):
+                curve.setData(self.time_data, data[sensor])
+            
+            # Auto-scroll
+            if self.time_data and self.time_data[-1] > LIVE_WINDOW_SECS:
+                self.plot_widget.setXRange(self.time_data[-1] - LIVE_WINDOW_SECS, self.time_data[-1])
+        
+        # Statistik bergulir per kanal
+        snap = self.stats.snapshot()
+        for i, sensor in enumerate(self.sensor_data.keys()):
+            if snap['count'] == 0:
+                self.sensor_labels[sensor].setText(f"{sensor}: 0.00")
+                continue
+            self.sensor_labels[sensor].setText(
+                f"{sensor}: {snap['last'][i]:.2f}\n"
+                f"μ {snap['mean'][i]:.2f}  σ {snap['std'][i]:.3f}  "
+                f"min {snap['min'][i]:.2f}  max {snap['max'][i]:.2f}\n"
+                f"slope {snap['slope'][i]:+.4f}/s  EWMA {snap['ewma'][i]:.2f}"
+            )
+        
+        self.sample_count_label.setText(f"Samples: {self.sample_count}")
+        self.m_frame.observe(time.perf_counter() - frame_start)
     
     def handle_influx_status(self, status):
         """Handle status InfluxDB dari Rust"""
         now = datetime.now().strftime("%H:%M:%S")
         
-        if status == "INFLUX:OK":
+        if status.startswith("INFLUX:OK"):
+            # INFLUX:OK:<n> = satu batch n record dari write-ahead queue
+            parts = status.split(":")
+            count = int(parts[2]) if len(parts) > 2 and parts[2].isdigit() else 1
             self.influx_status.setText("● Connected")
             self.influx_status.setStyleSheet("color: #7FFF7F; font-size: 12pt; font-weight: bold;")
             self.influx_last_write.setText(f"Last Write: {now}")
-            self.influx_record_count += 1
+            self.influx_record_count += count
+            self.m_influx_records.inc(count)
             self.influx_records.setText(f"Records Sent: {self.influx_record_count}")
         elif status == "INFLUX:ERROR":
-            self.influx_status.setText("● Write Failed")
+            self.influx_status.setText("● Write Failed (queued)")
             self.influx_status.setStyleSheet("color: #FF6B8A; font-size: 12pt; font-weight: bold;")
+        elif status.startswith("WAL:"):
+            # WAL:<depth>,<lag detik> = record di disk yang belum masuk Influx
+            try:
+                depth, lag = status[4:].split(",")
+                self.wal_depth = int(depth)
+                self.influx_queue.setText(f"Antrian WAL: {int(depth)} (lag {float(lag):.1f} s)")
+            except ValueError:
+                pass
     
     def start_sampling(self):
         if self.send_command_to_rust("START_SAMPLING"):
@@ -468,8 +1460,14 @@ class ENoseGUI(QMainWindow):
             self.sample_count = 0
             self.influx_record_count = 0
             self.time_data = []
+            self.run_start_ns = None
             for key in self.sensor_data:
                 self.sensor_data[key] = []
+            self.state_data = []
+            self.level_data = []
+            self.recompute_processing()
+            self.stats.reset()
+            self.view_dirty = True
             
             self.start_btn.setEnabled(False)
             self.stop_btn.setEnabled(True)
@@ -518,6 +1516,14 @@ class ENoseGUI(QMainWindow):
             self.save_to_csv()
             self.save_to_json()
     
+    def processing_label(self):
+        view = self.data_view.currentText()
+        if view == "Compensated":
+            return f"compensated:{self.norm_mode.currentText()}+filter:{self.filter_spec.text()}"
+        if view == "Filtered":
+            return f"filter:{self.filter_spec.text()}"
+        return "raw"
+    
     def save_to_csv(self):
         if not self.time_data:
             QMessageBox.warning(self, "Warning", "Tidak ada data untuk disimpan!")
@@ -531,15 +1537,17 @@ class ENoseGUI(QMainWindow):
         
         if filepath:
             try:
+                data = self.display_data()
                 with open(filepath, 'w', newline='') as f:
                     writer = csv.writer(f)
-                    header = ['Time(s)'] + list(self.sensor_data.keys())
+                    header = ['Time(s)'] + list(self.sensor_data.keys()) + ['State', 'Level']
                     writer.writerow(header)
                     
                     for i in range(len(self.time_data)):
                         row = [self.time_data[i]]
                         for sensor in self.sensor_data.keys():
-                            row.append(self.sensor_data[sensor][i])
+                            row.append(data[sensor][i])
+                        row += [self.state_data[i], self.level_data[i]]
                         writer.writerow(row)
                 
                 QMessageBox.information(self, "Success", f"CSV saved:\n{filepath}")
@@ -564,15 +1572,18 @@ class ENoseGUI(QMainWindow):
                         "sample_name": self.sample_name.text(),
                         "sample_type": self.sample_type.currentText(),
                         "timestamp": datetime.now().isoformat(),
-                        "total_samples": len(self.time_data)
+                        "total_samples": len(self.time_data),
+                        "processing": self.processing_label()
                     },
                     "data": []
                 }
                 
+                data = self.display_data()
                 for i in range(len(self.time_data)):
-                    data_point = {"time": self.time_data[i], "sensors": {}}
+                    data_point = {"time": self.time_data[i], "sensors": {},
+                                  "state": self.state_data[i], "level": self.level_data[i]}
                     for sensor in self.sensor_data.keys():
-                        data_point["sensors"][sensor] = self.sensor_data[sensor][i]
+                        data_point["sensors"][sensor] = data[sensor][i]
                     data_dict["data"].append(data_point)
                 
                 with open(filepath, 'w') as f:
@@ -587,8 +1598,11 @@ class ENoseGUI(QMainWindow):
             QMessageBox.warning(self, "Warning", "Tidak ada data untuk diupload!")
             return
 
-        EI_API_KEY = "ei_396c0281d6cfea3e2215c4d947e0bc9fdd208e1a7551b20e3b29c94dd5d28bf0"
-        EI_PROJECT_ID = "827201"
+        EI_API_KEY = self.config.edge_impulse.api_key
+        EI_PROJECT_ID = self.config.edge_impulse.project_id
+        if not EI_API_KEY:
+            QMessageBox.warning(self, "Warning", "API key Edge Impulse belum diisi di config.json!")
+            return
         label = self.sample_type.currentText()
         sample_name = self.sample_name.text() or "sample"
 
@@ -597,18 +1611,20 @@ class ENoseGUI(QMainWindow):
         temp_path = os.path.join(os.getcwd(), temp_filename)
 
         numeric_header = ['timestamp'] + [str(i) for i in range(len(self.sensor_data))]
+        data = self.display_data()
 
         try:
             with open(temp_path, 'w', newline='') as f:
                 writer = csv.writer(f)
                 writer.writerow(numeric_header)
 
-                start_time = int(datetime.now().timestamp() * 1000)
+                start_time = (self.run_start_ns // 1_000_000 if self.run_start_ns is not None
+                              else int(datetime.now().timestamp() * 1000))
                 for i in range(len(self.time_data)):
                     ts = start_time + int(self.time_data[i] * 1000)
                     row = [ts]
                     for sensor in self.sensor_data.keys():
-                        row.append(self.sensor_data[sensor][i])
+                        row.append(data[sensor][i])
                     writer.writerow(row)
 
             url = "https://ingestion.edgeimpulse.com/api/training/files"
@@ -621,6 +1637,7 @@ class ENoseGUI(QMainWindow):
                     "x-label": label,
                     "x-project-id": EI_PROJECT_ID
                 }
+                import requests
                 response = requests.post(url, files=files, headers=headers, timeout=60)
 
             if response.status_code == 200:
@@ -637,15 +1654,30 @@ class ENoseGUI(QMainWindow):
                 os.remove(temp_path)
     
     def closeEvent(self, event):
+        self.stop_inference()
+        self.clear_history()
+        for thread in list(self.history_stale):
+            thread.wait()
+        if self.overlay_thread is not None:
+            self.overlay_thread.wait()
+        self.metrics_server.stop()
         self.data_thread.stop()
         self.status_thread.stop()
         self.data_thread.wait()
         self.status_thread.wait()
+        # Batch yang masih antre di sinyal receiver ikut diproses, sesuai posisi
+        # relay yang sudah disimpan receiver
+        QApplication.sendPostedEvents(self)
         event.accept()
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
+    try:
+        get_config()
+    except ConfigError as e:
+        QMessageBox.critical(None, "Config Error", f"config.json tidak valid:\n{e}")
+        sys.exit(1)
     window = ENoseGUI()
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,179 @@
+import bisect
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ===============================
+# METRICS (FORMAT TEKS PROMETHEUS) + LOG RATE-LIMITED
+# ===============================
+# Counter/gauge/histogram sederhana thread-safe, dirender ke format teks
+# Prometheus di GET /metrics (server HTTP lokal di thread daemon). Dipakai
+# GUI; backend Rust punya endpoint yang sama (src/metrics.rs) dengan prefix
+# enose_backend_.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+LOG_INTERVAL = 5.0   # detik minimum antar log untuk event yang sama
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help):
+        self.name, self.help = name, help
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n=1):
+        with self._lock:
+            self.value += n
+
+    def samples(self):
+        return [(self.name, self.value)]
+
+
+class Gauge:
+    kind = 'gauge'
+
+    def __init__(self, name, help, fn=None):
+        self.name, self.help = name, help
+        self.value = 0.0
+        self.fn = fn          # callback dibaca saat scrape (mis. panjang queue)
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self):
+        return [(self.name, self.fn() if self.fn else self.value)]
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name, self.help = name, help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.last = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.last = value
+
+    def samples(self):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        rows, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            rows.append((f'{self.name}_bucket{{le="{le}"}}', cumulative))
+        rows.append((f'{self.name}_sum', total))
+        rows.append((f'{self.name}_count', cumulative))
+        return rows
+
+
+class Registry:
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self.metrics = []
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help):
+        return self._add(Counter(self.prefix + name, help))
+
+    def gauge(self, name, help, fn=None):
+        return self._add(Gauge(self.prefix + name, help, fn))
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(self.prefix + name, help, buckets))
+
+    def render(self):
+        lines = []
+        for m in self.metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            for name, value in m.samples():
+                lines.append(f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer:
+    """GET /metrics di host:port (thread daemon); port 0 = nonaktif"""
+
+    def __init__(self, registry, host='127.0.0.1', port=0):
+        self.registry = registry
+        self.address = (host, port)
+        self.httpd = None
+
+    def start(self):
+        if not self.address[1]:
+            return False
+        try:
+            self.httpd = ThreadingHTTPServer(self.address, _MetricsHandler)
+        except OSError as e:
+            log('warn', 'metrics_server', f"bind {self.address[0]}:{self.address[1]} failed: {e}")
+            return False
+        self.httpd.daemon_threads = True
+        self.httpd.registry = self.registry
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        log('info', 'metrics_server', f"listening on http://{self.address[0]}:{self.address[1]}/metrics")
+        return True
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+
+# ===============================
+# LOG TERSTRUKTUR
+# ===============================
+_last_log = {}       # event -> [waktu log terakhir, jumlah yang di-suppress]
+_log_lock = threading.Lock()
+
+
+def log(level, event, msg='', **fields):
+    """Satu baris key=value: ts=... level=... event=... msg=\"...\" k=v"""
+    ts = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    extra = ''.join(f" {k}={v}" for k, v in fields.items())
+    text = f' msg="{msg}"' if msg else ''
+    print(f"ts={ts} level={level} event={event}{text}{extra}", flush=True)
+
+
+def log_limited(level, event, msg='', interval=LOG_INTERVAL, **fields):
+    """Seperti log(), tapi maksimal satu baris per `interval` detik per event"""
+    now = time.monotonic()
+    with _log_lock:
+        state = _last_log.setdefault(event, [-float('inf'), 0])
+        if now - state[0] < interval:
+            state[1] += 1
+            return
+        suppressed, state[0], state[1] = state[1], now, 0
+    if suppressed:
+        fields['suppressed'] = suppressed
+    log(level, event, msg, **fields)
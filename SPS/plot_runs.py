@@ -0,0 +1,156 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from cache import ArtifactCache, default_cache
+from runs import SENSOR_NAMES, list_runs, load_run
+
+# ===============================
+# BATCH PLOT RENDERER (pengganti plot.gnu)
+# ===============================
+# Setiap file rekaman diparse sekali, digambar dengan pyqtgraph secara
+# headless lalu diekspor ke PNG/SVG. Render dibagi ke beberapa proses, dan
+# run yang hash isinya (+ parameter render) tidak berubah dilewati.
+
+PLOT_SIZE = (1600, 900)
+PLOT_COLORS = ['#FF6B8A', '#FFB84D', '#FFE66D', '#4ECDC4', '#A78BFA', '#60A5FA', '#34D399']
+MANIFEST_NAME = '.plot_manifest.json'
+RENDER_VERSION = 2   # naikkan kalau tampilan plot berubah supaya semua dirender ulang
+
+
+def output_path(path, output_dir, fmt):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(output_dir, f"{stem}_plot.{fmt}")
+
+
+def render_run(run, out_path, fmt='png', size=PLOT_SIZE):
+    """Gambar semua kanal satu run ke file (harus dipanggil di proses dengan QApplication)"""
+    import pyqtgraph as pg
+    import pyqtgraph.exporters
+
+    from PyQt6.QtCore import Qt
+
+    app = pg.mkQApp()
+    plot = pg.PlotWidget()
+    # Widget yang tidak pernah di-show tetap 640x480 dan layout judul/label tidak
+    # dihitung; show() tanpa tampil di layar supaya ukuran & layout berlaku
+    plot.setAttribute(Qt.WidgetAttribute.WA_DontShowOnScreen)
+    plot.resize(*size)
+    plot.setBackground('w')
+    plot.setTitle(f"{run.name} - All Sensor Traces")
+    plot.setLabel('bottom', 'Time (s)')
+    plot.setLabel('left', 'Signal (a.u.)')
+    plot.showGrid(x=True, y=True, alpha=0.3)
+    plot.addLegend(offset=(-10, 10))
+    for i, (sensor, color) in enumerate(zip(SENSOR_NAMES, PLOT_COLORS)):
+        plot.plot(run.time, run.values[:, i], pen=pg.mkPen(color=color, width=1.5), name=sensor)
+
+    plot.show()
+    app.processEvents()
+
+    item = plot.getPlotItem()
+    if fmt == 'svg':
+        exporter = pg.exporters.SVGExporter(item)
+    else:
+        exporter = pg.exporters.ImageExporter(item)
+        # width dan height saling mengunci rasio item, jadi set keduanya
+        exporter.parameters()['width'] = size[0]
+        exporter.parameters()['height'] = size[1]
+    exporter.export(out_path)
+    plot.close()
+    plot.deleteLater()
+
+
+def _render_job(job):
+    path, out_paths, fmts = job
+    try:
+        run = load_run(path)
+        for out_path, fmt in zip(out_paths, fmts):
+            render_run(run, out_path, fmt)
+        return path, None
+    except Exception as e:
+        return path, str(e)
+
+
+def _init_worker():
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+def render_directory(directory, output_dir=None, formats=('png',), workers=None, force=False,
+                     cache=None):
+    """Render semua run di directory. Hasil: (rendered, skipped, errors)
+
+    cache: ArtifactCache untuk memo hash isi file (tanpa membaca ulang file yang tidak berubah).
+    """
+    _init_worker()
+    cache = cache or default_cache()
+    output_dir = output_dir or directory
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = {}
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+
+    params = f"v{RENDER_VERSION}:{PLOT_SIZE}:{','.join(formats)}"
+    jobs, digests, skipped = [], {}, []
+    for path in list_runs(directory):
+        digest = cache.key(path, params)
+        outs = [output_path(path, output_dir, fmt) for fmt in formats]
+        key = os.path.basename(path)
+        if manifest.get(key) == digest and all(os.path.exists(o) for o in outs):
+            skipped.append(path)
+            continue
+        digests[path] = digest
+        jobs.append((path, outs, list(formats)))
+
+    rendered, errors = [], []
+    if jobs:
+        if workers == 1 or len(jobs) == 1:
+            results = map(_render_job, jobs)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+            results = pool.map(_render_job, jobs)
+        try:
+            for path, error in results:
+                if error:
+                    errors.append((path, error))
+                else:
+                    manifest[os.path.basename(path)] = digests[path]
+                    rendered.append(path)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    cache.flush()
+    return rendered, skipped, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render plot semua rekaman di folder (PNG/SVG)")
+    parser.add_argument('directory')
+    parser.add_argument('-o', '--output-dir', default=None)
+    parser.add_argument('-f', '--format', action='append', choices=['png', 'svg'],
+                        help="bisa diulang, default png")
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help="render ulang walau hash sama")
+    parser.add_argument('--cache-dir', default=None, help="lokasi cache hash (default ~/.cache/enose_sps)")
+    args = parser.parse_args(argv)
+
+    cache = ArtifactCache(args.cache_dir) if args.cache_dir else default_cache()
+    rendered, skipped, errors = render_directory(args.directory, args.output_dir,
+                                                 tuple(args.format or ['png']),
+                                                 args.workers, args.force, cache)
+    for path, error in errors:
+        print(f"Failed {path}: {error}")
+    print(f"Rendered {len(rendered)}, up to date {len(skipped)}, failed {len(errors)}")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
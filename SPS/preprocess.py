@@ -0,0 +1,138 @@
+import numpy as np
+
+from runs import Run, STATE_PRECONDITION, STATE_PURGE, STATE_UNKNOWN
+
+# ===============================
+# BASELINE DRIFT COMPENSATION
+# ===============================
+# Baseline per kanal = rata-rata sampel `secs` detik terakhir yang diambil
+# saat fase pre-conditioning / purge (diukur dari timestamp, bukan jumlah
+# sampel, karena rate sampling berubah per fase). Nilai di luar fase itu memakai baseline
+# terakhir (drift subtraction), lalu dinormalisasi:
+#   'none'   -> x - baseline
+#   'zscore' -> (x - baseline) / std baseline
+#   'ratio'  -> (x - baseline) / baseline   (ΔR/R0)
+# process() menerima batch berapa pun ukurannya; hasil live (per sampel) dan
+# batch (satu run utuh) sama sampai pembulatan floating point.
+
+BASELINE_STATES = (STATE_PRECONDITION, STATE_PURGE)
+NORMALIZE_MODES = ('none', 'zscore', 'ratio')
+DEFAULT_BASELINE_SECS = 30.0
+STD_FLOOR = 1e-3                # MOX sering flat, hindari pembagian dengan ~0
+
+
+class BaselineCompensator:
+    def __init__(self, n_channels, mode='none', secs=DEFAULT_BASELINE_SECS,
+                 baseline_states=BASELINE_STATES):
+        if mode not in NORMALIZE_MODES:
+            raise ValueError(f"mode must be one of {NORMALIZE_MODES}")
+        if not secs > 0:
+            raise ValueError("secs must be > 0")
+        self.n_channels = n_channels
+        self.mode = mode
+        self.secs = float(secs)
+        self.baseline_states = tuple(baseline_states)
+        self.reset()
+
+    def reset(self):
+        n = self.n_channels
+        self._hist = np.empty((0, n))
+        self._hist_t = np.empty(0)
+        self._t_last = -np.inf
+        self._start = None        # waktu sampel baseline/tanpa state pertama
+        self._first = None
+        self._baseline = np.full(n, np.nan)
+        self._std = np.full(n, np.nan)
+
+    @property
+    def baseline(self):
+        return self._baseline.copy()
+
+    def _baseline_mask(self, state, t):
+        mask = np.isin(state, self.baseline_states)
+        # Rekaman tanpa state: `secs` detik pertama run dipakai sebagai baseline
+        unknown = state == STATE_UNKNOWN
+        eligible = mask | unknown
+        if self._start is None and eligible.any():
+            self._start = t[np.argmax(eligible)]
+        if self._start is None:
+            return mask
+        return mask | (unknown & (t - self._start < self.secs))
+
+    def process(self, values, state, times):
+        """Kompensasi batch values (N, C) dengan state (N,) dan timestamp times (N,) dalam detik"""
+        values = np.asarray(values, dtype=float).reshape(-1, self.n_channels)
+        state = np.asarray(state).reshape(-1)
+        if len(values) == 0:
+            return values.copy()
+        if self._first is None:
+            self._first = values[0].copy()
+        # Sampel yang datang mundur dianggap di waktu sampel sebelumnya
+        t = np.maximum.accumulate(np.concatenate([[self._t_last], np.asarray(times, dtype=float).reshape(-1)]))[1:]
+        self._t_last = t[-1]
+
+        is_base = self._baseline_mask(state, t)
+        base_rows = values[is_base]
+
+        # Trailing mean/std atas gabungan history + sampel baseline batch ini
+        pool = np.concatenate([self._hist, base_rows])
+        pool_t = np.concatenate([self._hist_t, t[is_base]])
+        h = len(self._hist)
+        m = len(base_rows)
+        if m:
+            c1 = np.concatenate([np.zeros((1, self.n_channels)), np.cumsum(pool, axis=0)])
+            c2 = np.concatenate([np.zeros((1, self.n_channels)), np.cumsum(pool * pool, axis=0)])
+            end = np.arange(h + 1, h + m + 1)
+            start = np.searchsorted(pool_t, pool_t[end - 1] - self.secs, side='right')
+            count = (end - start)[:, None]
+            mean = (c1[end] - c1[start]) / count
+            var = np.maximum((c2[end] - c2[start]) / count - mean * mean, 0.0)
+            std = np.sqrt(var)
+
+        # Baseline per baris: baris baseline terakhir pada/sebelum baris itu
+        prev_base = np.where(np.isnan(self._baseline), self._first, self._baseline)
+        prev_std = np.where(np.isnan(self._std), 0.0, self._std)
+        idx = np.cumsum(is_base) - 1
+        if m:
+            base = np.where((idx >= 0)[:, None], mean[np.maximum(idx, 0)], prev_base)
+            scale = np.where((idx >= 0)[:, None], std[np.maximum(idx, 0)], prev_std)
+        else:
+            base = np.broadcast_to(prev_base, values.shape)
+            scale = np.broadcast_to(prev_std, values.shape)
+
+        if m:
+            self._baseline = mean[-1].copy()
+            self._std = std[-1].copy()
+        keep = np.searchsorted(pool_t, t[-1] - self.secs, side='right')
+        self._hist, self._hist_t = pool[keep:].copy(), pool_t[keep:].copy()
+        return self._normalize(values, base, scale)
+
+    def apply(self, values):
+        """Kompensasi values (N, C) dengan baseline terakhir, tanpa mengubah state
+
+        Dipakai untuk window yang dihitung ulang (mis. diresample untuk model).
+        Belum ada sampel sama sekali -> NaN.
+        """
+        values = np.asarray(values, dtype=float).reshape(-1, self.n_channels)
+        if self._first is None:
+            return np.full_like(values, np.nan)
+        base = np.where(np.isnan(self._baseline), self._first, self._baseline)
+        scale = np.where(np.isnan(self._std), 0.0, self._std)
+        return self._normalize(values, base, scale)
+
+    def _normalize(self, values, base, scale):
+        out = values - base
+        if self.mode == 'zscore':
+            out = out / np.maximum(scale, STD_FLOOR)
+        elif self.mode == 'ratio':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                out = np.where(base != 0, out / base, np.nan)
+        return out
+
+
+def compensate_run(run, mode='none', secs=DEFAULT_BASELINE_SECS):
+    """Versi batch untuk rekaman tersimpan, hasilnya Run baru"""
+    comp = BaselineCompensator(run.values.shape[1], mode=mode, secs=secs)
+    values = comp.process(run.values, run.state, run.time)
+    return Run(run.time, values, run.state, run.level, name=run.name,
+               sample_type=run.sample_type, timestamp=run.timestamp, path=run.path)
@@ -0,0 +1,369 @@
+import numpy as np
+
+# ===============================
+# PROTOKOL DATA SENSOR (Rust backend → GUI)
+# ===============================
+# Dua format: baris teks `SENSOR:...` (parse_sensor_lines, bulk) dan frame
+# biner (FrameDecoder). Keduanya menghasilkan data per batch, bukan per sampel.
+
+SENSOR_PREFIX = b'SENSOR:'
+SENSOR_FIELDS = 9          # 7 nilai urutan wire + state + level
+# Nama kanal urutan wire (= field InfluxDB, hub.rs / web.rs CHANNELS)
+CHANNELS = ('no2_gm', 'ethanol_gm', 'voc_gm', 'co_gm', 'co_mics', 'ethanol_mics', 'voc_mics')
+
+
+def _parse_line(payload):
+    """Satu payload (tanpa prefix) -> list 9 float, atau None kalau rusak"""
+    parts = payload.split(b',')
+    if len(parts) not in (7, SENSOR_FIELDS):
+        return None
+    try:
+        row = [float(p) for p in parts]
+    except ValueError:
+        return None
+    # Format lama tanpa state/level
+    return row + [-1.0, -1.0] if len(row) == 7 else row
+
+
+def parse_sensor_lines(buf):
+    """Buffer berisi baris SENSOR lengkap -> (rows (N, 9) float64, bad)
+
+    rows memakai urutan wire (lihat runs.WIRE_ORDER) + kolom state, level.
+    bad = list (offset byte, baris) untuk baris yang rusak / bukan SENSOR.
+    Jalur cepat: semua baris valid -> satu np.fromstring untuk seluruh buffer;
+    kalau ada yang rusak baru dicek per baris untuk mencari offset-nya.
+    """
+    if isinstance(buf, str):
+        buf = buf.encode('utf-8')
+    body = buf[:-1] if buf.endswith(b'\n') else buf
+    if not body:
+        return np.zeros((0, SENSOR_FIELDS)), []
+
+    n = body.count(b'\n') + 1
+    if body.count(SENSOR_PREFIX) == n and body.startswith(SENSOR_PREFIX):
+        # Tiap baris harus punya tepat 8 koma, bukan cuma totalnya (8 + 10 field = 2 × 9):
+        # koma terakhir baris k < newline k < koma pertama baris k+1
+        raw = np.frombuffer(body, dtype=np.uint8)
+        commas = np.flatnonzero(raw == ord(','))
+        if len(commas) == n * (SENSOR_FIELDS - 1):
+            commas = commas.reshape(n, SENSOR_FIELDS - 1)
+            newlines = np.flatnonzero(raw == ord('\n'))
+            if (commas[:-1, -1] < newlines).all() and (newlines < commas[1:, 0]).all():
+                try:
+                    flat = np.fromstring(body.replace(SENSOR_PREFIX, b'').replace(b'\n', b','),
+                                         dtype=np.float64, sep=',')
+                except ValueError:
+                    flat = ()
+                if len(flat) == n * SENSOR_FIELDS:
+                    return flat.reshape(n, SENSOR_FIELDS), []
+
+    rows, bad, offset = [], [], 0
+    for line in body.split(b'\n'):
+        text = line.strip()
+        row = _parse_line(text[len(SENSOR_PREFIX):]) if text.startswith(SENSOR_PREFIX) else None
+        if row is not None:
+            rows.append(row)
+        elif text:
+            bad.append((offset, line))
+        offset += len(line) + 1
+    return np.array(rows, dtype=np.float64).reshape(len(rows), SENSOR_FIELDS), bad
+
+
+# ===============================
+# FRAME BINER SENSOR
+# ===============================
+# Pasangan dari src/frame.rs. Layout little-endian 50 byte: magic "EN",
+# versi, device id, seq u32, timestamp ns i64 (0 = belum diisi), 7 × f32
+# urutan wire, state i8, level i8, CRC32 (zlib) atas 46 byte pertama.
+#
+# Negosiasi: pengirim mengirim baris HELLO, penerima membalas ACK, lalu
+# stream berisi frame. Decode dilakukan per batch dengan np.frombuffer;
+# CRC juga dihitung vektor (satu operasi tabel per kolom byte).
+#
+# Backfill: GUI menambahkan `RESUME <sesi> <seq terakhir>` setelah ACK, relay
+# membalas `SESSION <sesi> <n>` + n frame yang terlewat sebelum stream live.
+
+MAGIC = b'EN'
+VERSION = 1
+HELLO = b'HELLO ENOSE-BIN/1\n'
+ACK = b'OK ENOSE-BIN/1\n'
+RESUME = b'RESUME'
+SESSION = b'SESSION'
+
+FRAME_DTYPE = np.dtype([
+    ('magic', 'S2'),
+    ('version', 'u1'),
+    ('device', 'u1'),
+    ('seq', '<u4'),
+    ('timestamp', '<i8'),
+    ('values', '<f4', (7,)),
+    ('state', 'i1'),
+    ('level', 'i1'),
+    ('crc', '<u4'),
+])
+FRAME_SIZE = FRAME_DTYPE.itemsize   # 50
+_CRC_SPAN = FRAME_SIZE - 4
+
+
+def _crc_table():
+    c = np.arange(256, dtype=np.uint32)
+    for _ in range(8):
+        c = np.where(c & 1, np.uint32(0xEDB88320) ^ (c >> 1), c >> 1)
+    return c.astype(np.uint32)
+
+
+_CRC_TABLE = _crc_table()
+
+
+def crc32_rows(raw):
+    """CRC32 zlib untuk tiap baris array uint8 (N, L), sekaligus semua baris"""
+    crc = np.full(len(raw), 0xFFFFFFFF, dtype=np.uint32)
+    for j in range(raw.shape[1]):
+        crc = _CRC_TABLE[(crc ^ raw[:, j]) & 0xFF] ^ (crc >> 8)
+    return crc ^ np.uint32(0xFFFFFFFF)
+
+
+def encode_frames(values, state, level, seq, device=0, timestamp=0):
+    """Array nilai (N, 7) urutan wire -> bytes N frame (untuk simulator/relay Python)"""
+    values = np.atleast_2d(np.asarray(values, dtype=np.float32))
+    frames = np.zeros(len(values), dtype=FRAME_DTYPE)
+    frames['magic'] = MAGIC
+    frames['version'] = VERSION
+    frames['device'] = device
+    frames['seq'] = seq
+    frames['timestamp'] = timestamp
+    frames['values'] = values
+    frames['state'] = state
+    frames['level'] = level
+    raw = frames.view(np.uint8).reshape(len(frames), FRAME_SIZE)
+    frames['crc'] = crc32_rows(raw[:, :_CRC_SPAN])
+    return frames.tobytes()
+
+
+def _valid(frames):
+    raw = frames.view(np.uint8).reshape(len(frames), FRAME_SIZE)
+    return ((frames['magic'] == MAGIC) & (frames['version'] == VERSION)
+            & (crc32_rows(raw[:, :_CRC_SPAN]) == frames['crc']))
+
+
+class FrameDecoder:
+    """Decoder stream: feed(bytes) -> (frames, jumlah frame rusak yang dilewati)
+
+    Jalur cepat: buffer yang sejajar dengan batas frame di-decode sekaligus.
+    Setelah frame rusak, decoder mencari magic berikutnya (resync).
+    """
+
+    def __init__(self):
+        self.buf = b''
+
+    def feed(self, data):
+        buf = self.buf + data
+        pos, errors, parts = 0, 0, []
+        while len(buf) - pos >= FRAME_SIZE:
+            n = (len(buf) - pos) // FRAME_SIZE
+            frames = np.frombuffer(buf, dtype=FRAME_DTYPE, count=n, offset=pos)
+            ok = _valid(frames)
+            bad = np.flatnonzero(~ok)
+            good = n if len(bad) == 0 else int(bad[0])
+            if good:
+                parts.append(frames[:good])
+                pos += good * FRAME_SIZE
+            if good < n:
+                errors += 1
+                nxt = buf.find(MAGIC, pos + 1)
+                pos = nxt if nxt >= 0 else len(buf) - 1
+        self.buf = buf[pos:]
+        if not parts:
+            return np.zeros(0, dtype=FRAME_DTYPE), errors
+        return (parts[0] if len(parts) == 1 else np.concatenate(parts)), errors
+
+
+class SequenceTracker:
+    """Hitung sampel hilang dari seq u32 (wraparound; lompatan mundur = device restart)"""
+
+    def __init__(self):
+        self.last = None
+
+    def update(self, seq):
+        seq = np.asarray(seq, dtype=np.int64)
+        if len(seq) == 0:
+            return 0
+        full = seq if self.last is None else np.concatenate(([self.last], seq))
+        diff = (full[1:] - full[:-1]) & 0xFFFFFFFF
+        forward = (diff > 0) & (diff < 1 << 31)
+        self.last = int(seq[-1])
+        return int((diff[forward] - 1).sum())
+
+
+# ===============================
+# CLIENT HUB PUB/SUB BACKEND (src/hub.rs)
+# ===============================
+def subscribe(host, port, device=None, channels=None, decimate=1, policy='drop_oldest',
+              fmt='binary', queue=1024, batch_ms=20, timeout=5.0):
+    """Berlangganan ke hub backend; generator batch sampai koneksi putus.
+
+    fmt='binary' -> tiap item array FRAME_DTYPE; fmt='text' -> (rows (N, 9), bad).
+    channels: list nama kanal wire (no2_gm, ..., voc_mics), kanal lain berisi NaN.
+    """
+    import socket
+
+    words = [f"device={'*' if device is None else device}",
+             f"channels={'*' if not channels else ','.join(channels)}",
+             f"decimate={decimate}", f"policy={policy}", f"format={fmt}", f"queue={queue}",
+             f"batch_ms={batch_ms}"]
+    sock = socket.create_connection((host, port), timeout=timeout)
+    try:
+        sock.sendall(f"SUBSCRIBE {' '.join(words)}\n".encode())
+        reply = b''
+        while not reply.endswith(b'\n'):
+            chunk = sock.recv(1)
+            if not chunk:
+                raise ConnectionError("hub closed the connection")
+            reply += chunk
+        if not reply.startswith(b'OK'):
+            raise ValueError(f"hub menolak subscribe: {reply.decode().strip()}")
+        sock.settimeout(None)
+
+        decoder, pending = FrameDecoder(), b''
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                return
+            if fmt == 'binary':
+                frames, _ = decoder.feed(data)
+                if len(frames):
+                    yield frames
+            else:
+                pending += data
+                end = pending.rfind(b'\n') + 1
+                if end:
+                    yield parse_sensor_lines(pending[:end])
+                    pending = pending[end:]
+    finally:
+        sock.close()
+
+
+# ===============================
+# CLIENT WEBSOCKET BACKEND (src/web.rs)
+# ===============================
+# Client RFC 6455 minimal (tanpa dependency tambahan): cukup untuk membaca
+# /ws/stream; ping dibalas, pesan terfragmentasi disambung.
+
+WS_RECV_TIMEOUT = 1.0      # detik; tiap timeout `running()` dicek
+
+
+def records_to_frames(records):
+    """List record JSON web.rs -> array FRAME_DTYPE (seq & timestamp ikut, kanal absen = NaN)
+
+    Hasilnya diperlakukan sama dengan frame biner (crc tidak diisi, data tidak
+    lewat decoder).
+    """
+    nan = float('nan')
+    frames = np.zeros(len(records), dtype=FRAME_DTYPE)
+    frames['magic'] = MAGIC
+    frames['version'] = VERSION
+    frames['device'] = [r.get('device_id', 0) for r in records]
+    frames['seq'] = [r['seq'] for r in records]
+    frames['timestamp'] = [r['timestamp'] for r in records]
+    frames['values'] = np.array([[r.get(c, nan) for c in CHANNELS] for r in records],
+                                dtype=np.float32).reshape(len(records), len(CHANNELS))
+    frames['state'] = [r['state'] for r in records]
+    frames['level'] = [r['level'] for r in records]
+    return frames
+
+
+def _ws_frame(opcode, payload):
+    """Frame client (wajib di-mask), hanya untuk payload kontrol <= 125 byte"""
+    import os
+    mask = os.urandom(4)
+    masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return bytes([0x80 | opcode, 0x80 | len(payload)]) + mask + masked
+
+
+def stream_ws(url, timeout=5.0, running=lambda: True):
+    """Konsumsi WebSocket /ws/stream backend; generator batch sampai koneksi putus.
+
+    Tiap item array FRAME_DTYPE, baik format=binary maupun format=json (default;
+    record diubah dengan records_to_frames). Berhenti saat `running()` False
+    (dicek tiap WS_RECV_TIMEOUT).
+    """
+    import base64
+    import json
+    import os
+    import socket
+    from urllib.parse import urlsplit
+
+    parts = urlsplit(url)
+    if parts.scheme != 'ws':
+        raise ValueError(f"url harus ws://, dapat {url!r}")
+    path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    key = base64.b64encode(os.urandom(16)).decode()
+    sock = socket.create_connection((parts.hostname, parts.port or 80), timeout=timeout)
+    try:
+        sock.sendall((f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nUpgrade: websocket\r\n"
+                      f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n"
+                      f"Sec-WebSocket-Version: 13\r\n\r\n").encode())
+        buf = bytearray()
+        while b'\r\n\r\n' not in buf:
+            chunk = sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("backend menutup koneksi saat handshake")
+            buf += chunk
+        end = buf.index(b'\r\n\r\n') + 4
+        status = bytes(buf[:buf.index(b'\r\n')]).decode('latin-1')
+        if ' 101 ' not in status + ' ':
+            body = bytes(buf[end:]).decode('utf-8', 'replace').strip()
+            raise ValueError(f"WebSocket ditolak: {status} {body}".strip())
+        del buf[:end]
+        sock.settimeout(WS_RECV_TIMEOUT)
+
+        def need(n):
+            while len(buf) < n:
+                try:
+                    chunk = sock.recv(65536)
+                except socket.timeout:
+                    if running():
+                        continue
+                    return False
+                if not chunk:
+                    return False
+                buf.extend(chunk)
+            return True
+
+        decoder, message, kind = FrameDecoder(), bytearray(), None
+        while need(2):
+            fin, opcode, n = buf[0] & 0x80, buf[0] & 0x0F, buf[1] & 0x7F
+            head = 2 + {126: 2, 127: 8}.get(n, 0)
+            if not need(head):
+                return
+            if n >= 126:
+                n = int.from_bytes(buf[2:head], 'big')
+            if not need(head + n):       # frame dari server tidak di-mask
+                return
+            payload = bytes(buf[head:head + n])
+            del buf[:head + n]
+
+            if opcode == 0x8:            # close
+                sock.sendall(_ws_frame(0x8, payload[:2]))
+                return
+            if opcode == 0x9:            # ping
+                sock.sendall(_ws_frame(0xA, payload))
+                continue
+            if opcode in (0x1, 0x2):
+                kind = opcode
+            elif opcode != 0x0:          # pong / opcode lain
+                continue
+            message += payload
+            if not fin:
+                continue
+            data, message = bytes(message), bytearray()
+            if kind == 0x2:
+                frames, _ = decoder.feed(data)
+                if len(frames):
+                    yield frames
+            else:
+                records = json.loads(data)
+                if records:
+                    yield records_to_frames(records)
+    finally:
+        sock.close()
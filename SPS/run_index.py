@@ -0,0 +1,153 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cache import default_cache
+from features import level_segments
+from runs import list_runs, load_run
+
+# ===============================
+# INDEX REKAMAN UNTUK RUN BROWSER
+# ===============================
+# Setiap run dibaca sekali saat index dibangun: min/max per kanal, durasi,
+# batas waktu per level dan preview min/max-decimated. Overlay di GUI
+# memakai preview; data resolusi penuh hanya dimuat untuk window yang
+# sedang terlihat (dipanggil dari thread worker GUI, jadi cache run dikunci).
+
+PREVIEW_BINS = 1000          # preview = 2 * PREVIEW_BINS titik per run
+FULL_RES_MAX_POINTS = 20000  # di bawah ini, window terlihat digambar resolusi penuh
+RUN_CACHE_SIZE = 8           # jumlah run resolusi penuh yang disimpan di memori
+INDEX_VERSION = 1            # naikkan kalau isi RunIndexEntry berubah (invalidasi cache)
+
+
+def decimate_minmax(time, values, bins=PREVIEW_BINS):
+    """Min/max per bin supaya spike tetap terlihat di preview"""
+    n = len(time)
+    if n <= 2 * bins:
+        return time.copy(), values.copy()
+    edges = np.linspace(0, n, bins + 1).astype(int)
+    # reduceat per bin, lalu min & max disusun bergantian
+    vmin = np.minimum.reduceat(values, edges[:-1], axis=0)
+    vmax = np.maximum.reduceat(values, edges[:-1], axis=0)
+    t0 = time[edges[:-1]]
+    t1 = time[edges[1:] - 1]
+    t = np.column_stack([t0, t1]).ravel()
+    v = np.stack([vmin, vmax], axis=1).reshape(2 * bins, values.shape[1])
+    return t, v
+
+
+class RunIndexEntry:
+    def __init__(self, path, name, sample_type, timestamp, n_samples, duration,
+                 ch_min, ch_max, levels, preview_time, preview_values):
+        self.path = path
+        self.name = name
+        self.sample_type = sample_type
+        self.timestamp = timestamp
+        self.n_samples = n_samples
+        self.duration = duration
+        self.ch_min = ch_min
+        self.ch_max = ch_max
+        self.levels = levels            # list of (level, t_start, t_stop)
+        self.preview_time = preview_time
+        self.preview_values = preview_values
+
+    @property
+    def label(self):
+        stamp = self.timestamp.strftime("%Y-%m-%d %H:%M") if self.timestamp else "-"
+        return f"{self.name} [{os.path.splitext(self.path)[1][1:]}] {stamp}  ({self.duration:.0f} s)"
+
+
+def index_run(path):
+    run = load_run(path)
+    if len(run) == 0:
+        raise ValueError(f"Empty run: {path}")
+    levels = [(level, float(run.time[a]), float(run.time[b - 1]))
+              for level, a, b in level_segments(run.level)]
+    preview_time, preview_values = decimate_minmax(run.time, run.values)
+    return RunIndexEntry(path, run.name, run.sample_type, run.timestamp, len(run), run.duration,
+                         run.values.min(axis=0), run.values.max(axis=0), levels,
+                         preview_time, preview_values)
+
+
+def _index_or_none(path):
+    try:
+        return index_run(path)
+    except (OSError, ValueError) as e:
+        print(f"Skipping {path}: {e}")
+        return None
+
+
+class RunIndex:
+    def __init__(self, entries=None):
+        self.entries = list(entries or [])
+        self._runs = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, directory, workers=None, cache=None):
+        """Index semua rekaman di directory (paralel kalau banyak file).
+
+        Entry diambil dari cache kalau rekaman belum berubah; yang lain diindex ulang.
+        """
+        paths = list_runs(directory)
+        params = f"run_index:v{INDEX_VERSION}:{PREVIEW_BINS}"
+        found = {}
+        if cache is not None:
+            found, todo, keys = cache.lookup(paths, params)
+        else:
+            todo = paths
+
+        if len(todo) <= 2 or workers == 1:
+            entries = [_index_or_none(p) for p in todo]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                entries = list(pool.map(_index_or_none, todo))
+
+        for path, entry in zip(todo, entries):
+            if entry is None:
+                continue
+            found[path] = entry
+            if cache is not None:
+                cache.put(keys[path], entry)
+        if cache is not None:
+            cache.flush()
+
+        result = []
+        for path in paths:
+            entry = found.get(path)
+            if entry is not None:
+                entry.path = path   # isi sama walau file dipindah/di-rename
+                result.append(entry)
+        return cls(result)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def full_run(self, path):
+        """Run resolusi penuh (LRU di memori)"""
+        with self._lock:
+            if path in self._runs:
+                self._runs.move_to_end(path)
+                return self._runs[path]
+            run = load_run(path)
+            self._runs[path] = run
+            if len(self._runs) > RUN_CACHE_SIZE:
+                self._runs.popitem(last=False)
+            return run
+
+    def window(self, entry, t0, t1, max_points=FULL_RES_MAX_POINTS):
+        """Data untuk rentang [t0, t1]: resolusi penuh kalau cukup kecil, preview kalau tidak"""
+        if entry.duration > 0:
+            est = entry.n_samples * (min(t1, entry.preview_time[-1]) - max(t0, entry.preview_time[0])) / entry.duration
+        else:
+            est = entry.n_samples
+        if est > max_points:
+            return entry.preview_time, entry.preview_values
+        run = self.full_run(entry.path)
+        a, b = np.searchsorted(run.time, [t0, t1])
+        a = max(a - 1, 0)
+        b = min(b + 1, len(run.time))
+        return run.time[a:b], run.values[a:b]
@@ -0,0 +1,185 @@
+import csv
+import json
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+
+from protocol import parse_sensor_lines
+
+# ===============================
+# DEFINISI KANAL & FASE PROTOKOL
+# ===============================
+SENSOR_NAMES = [
+    'CO (MCS)', 'Ethanol (MCS)', 'VOC (MCS)',
+    'NO2 (GM)', 'Ethanol (GM)', 'VOC (GM)', 'CO (GM)'
+]
+
+# Urutan field di baris SENSOR: no2,ethanol,voc,co (GM), co,ethanol,voc (MiCS)
+# WIRE_ORDER[i] = index field untuk SENSOR_NAMES[i]
+WIRE_ORDER = [4, 5, 6, 0, 1, 2, 3]
+
+# Kode state dari Arduino, sesuai urutan protokol per level
+STATE_PRECONDITION = 0
+STATE_RAMP = 1
+STATE_HOLD = 2
+STATE_PURGE = 3
+STATE_RECOVERY = 4
+STATE_UNKNOWN = -1
+
+STATE_NAMES = {
+    STATE_PRECONDITION: 'pre-conditioning',
+    STATE_RAMP: 'ramp-up',
+    STATE_HOLD: 'hold',
+    STATE_PURGE: 'purge',
+    STATE_RECOVERY: 'recovery',
+}
+
+RUN_EXTENSIONS = ('.csv', '.json', '.log')
+LOG_SAMPLE_INTERVAL = 0.1   # detik antar baris di log SENSOR mentah (sama dengan GUI)
+
+# Kopi_Robusta_20251126_100834.csv / Kopi Arabika_20251126_105006.json
+_FILENAME_RE = re.compile(r'^(?P<name>.+?)_(?P<date>\d{8})_(?P<time>\d{6})$')
+
+
+# ===============================
+# RUN KOLUMNAR
+# ===============================
+class Run:
+    """Satu rekaman: time (N,), values (N, 7), state (N,), level (N,)"""
+
+    def __init__(self, time, values, state=None, level=None, name="", sample_type="",
+                 timestamp=None, path=None):
+        self.time = np.asarray(time, dtype=float)
+        self.values = np.asarray(values, dtype=float).reshape(len(self.time), len(SENSOR_NAMES))
+        n = len(self.time)
+        self.state = np.full(n, STATE_UNKNOWN, dtype=np.int16) if state is None else np.asarray(state, dtype=np.int16)
+        self.level = np.full(n, STATE_UNKNOWN, dtype=np.int16) if level is None else np.asarray(level, dtype=np.int16)
+        self.name = name
+        self.sample_type = sample_type
+        self.timestamp = timestamp
+        self.path = path
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def has_protocol(self):
+        """True kalau rekaman punya kolom state/level dari Arduino"""
+        return bool(len(self.state)) and bool((self.state != STATE_UNKNOWN).any())
+
+    @property
+    def duration(self):
+        return float(self.time[-1] - self.time[0]) if len(self.time) else 0.0
+
+    def channel(self, sensor):
+        return self.values[:, SENSOR_NAMES.index(sensor)]
+
+
+def parse_run_filename(path):
+    """'Kopi_Robusta_20251126_100834.csv' -> ('Kopi Robusta', datetime)"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    m = _FILENAME_RE.match(stem)
+    if not m:
+        return stem.replace('_', ' '), None
+    try:
+        ts = datetime.strptime(m.group('date') + m.group('time'), "%Y%m%d%H%M%S")
+    except ValueError:
+        ts = None
+    return m.group('name').replace('_', ' '), ts
+
+
+def is_run_file(path):
+    """Cek apakah file adalah rekaman GUI (bukan export InfluxDB dsb.)"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in RUN_EXTENSIONS:
+        return False
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            head = f.read(256)
+    except OSError:
+        return False
+    if ext == '.csv':
+        return head.startswith('Time(s),')
+    if ext == '.log':
+        return head.lstrip().startswith('SENSOR:')
+    return '"metadata"' in head or '"data"' in head
+
+
+def list_runs(directory):
+    """Semua file rekaman di directory, terurut nama"""
+    paths = [os.path.join(directory, f) for f in sorted(os.listdir(directory))]
+    return [p for p in paths if os.path.isfile(p) and is_run_file(p)]
+
+
+# ===============================
+# LOADER CSV / JSON / LOG SENSOR
+# ===============================
+def load_run(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return load_csv_run(path)
+    if ext == '.json':
+        return load_json_run(path)
+    if ext == '.log':
+        return load_sensor_log(path)
+    raise ValueError(f"Unsupported run format: {path}")
+
+
+def load_csv_run(path):
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f))
+        if header[:len(SENSOR_NAMES) + 1] != ['Time(s)'] + SENSOR_NAMES:
+            raise ValueError(f"Not a sensor run CSV: {path}")
+        table = np.loadtxt(f, delimiter=',', ndmin=2)
+
+    n_cols = 1 + len(SENSOR_NAMES)
+    state = level = None
+    if 'State' in header and 'Level' in header:
+        state = table[:, header.index('State')]
+        level = table[:, header.index('Level')]
+
+    name, timestamp = parse_run_filename(path)
+    return Run(table[:, 0], table[:, 1:n_cols], state, level,
+               name=name, sample_type=name, timestamp=timestamp, path=path)
+
+
+def load_json_run(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        doc = json.load(f)
+
+    meta = doc.get('metadata', {})
+    points = doc.get('data', [])
+    time = np.array([p['time'] for p in points], dtype=float)
+    values = np.array([[p['sensors'][s] for s in SENSOR_NAMES] for p in points], dtype=float)
+    state = level = None
+    if points and 'state' in points[0]:
+        state = [p.get('state', STATE_UNKNOWN) for p in points]
+        level = [p.get('level', STATE_UNKNOWN) for p in points]
+
+    name, timestamp = parse_run_filename(path)
+    if meta.get('timestamp'):
+        try:
+            timestamp = datetime.fromisoformat(meta['timestamp'])
+        except ValueError:
+            pass
+    return Run(time, values.reshape(len(time), len(SENSOR_NAMES)), state, level,
+               name=meta.get('sample_name') or name,
+               sample_type=meta.get('sample_type') or name,
+               timestamp=timestamp, path=path)
+
+
+def load_sensor_log(path):
+    """Log mentah baris SENSOR (capture serial/backend), diparse sekaligus"""
+    with open(path, 'rb') as f:
+        rows, bad = parse_sensor_lines(f.read())
+    if bad:
+        print(f"{path}: {len(bad)} baris rusak dilewati (offset pertama {bad[0][0]})")
+    if not len(rows):
+        raise ValueError(f"No SENSOR lines in {path}")
+
+    name, timestamp = parse_run_filename(path)
+    return Run(np.arange(len(rows)) * LOG_SAMPLE_INTERVAL, rows[:, WIRE_ORDER],
+               rows[:, 7], rows[:, 8], name=name, sample_type=name,
+               timestamp=timestamp, path=path)
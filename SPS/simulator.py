@@ -0,0 +1,327 @@
+import argparse
+import os
+import select
+import socket
+import sys
+import time
+
+import numpy as np
+
+from protocol import ACK, HELLO, encode_frames
+from runs import (STATE_HOLD, STATE_PRECONDITION, STATE_PURGE, STATE_RAMP,
+                  STATE_RECOVERY)
+
+# ===============================
+# SIMULATOR BOARD E-NOSE
+# ===============================
+# Pengganti Arduino untuk uji lokal relay Rust tanpa hardware. Dua jalur
+# seperti board asli:
+#   --tcp HOST:PORT   konek ke backend.arduino_addr (board WiFi)
+#   --pty             buat pseudo-terminal; sisi slave dipakai sebagai
+#                     backend.serial_port (serial_mode = ingest)
+# Format: board yang mendukung frame biner membalas HELLO dengan ACK lalu
+# mengirim frame; --format text meniru firmware lama (hanya baris SENSOR:).
+# --unplug-every meniru USB dicabut: pty ditutup lalu dibuat ulang di --link
+# yang sama. Command dari relay: START_SAMPLING, STOP_SAMPLING dan
+# SET_RATE <hz> (rate per fase, lihat performance.phase_rates); frame biner
+# diberi timestamp jam host supaya jarak sampel yang berubah ikut terkirim.
+
+LEVELS = 5
+# (state, detik) per level, urutan protokol sampling
+PHASES = ((STATE_PRECONDITION, 5.0), (STATE_RAMP, 3.0), (STATE_HOLD, 10.0),
+          (STATE_PURGE, 5.0), (STATE_RECOVERY, 7.0))
+# Urutan wire: no2, ethanol, voc, co (GM), co, ethanol, voc (MiCS)
+BASELINE = np.array([0.93, 0.61, 0.46, 0.08, 2.2, 1.4, 0.6])
+GAIN = np.array([0.05, 0.35, 0.25, 0.02, 0.6, 0.9, 0.4])   # respon per level saat hold
+NOISE = 0.004
+TICK = 0.01            # detik antar pengiriman; sampel yang jatuh tempo dikirim sekaligus
+RECONNECT = 1.0        # detik, TCP / pty setelah unplug
+HANDSHAKE_TIMEOUT = 0.5
+MAX_RATE = 200.0       # Hz, sama dengan batas SET_RATE relay
+WRITE_TIMEOUT = 0.5    # (pty) buffer tty penuh selama ini = relay tidak membaca
+
+
+class Board:
+    """Generator sampel + state protokol; tidak tahu transport"""
+
+    def __init__(self, rate=10.0, device=0, binary_capable=True, seed=0, time_scale=1.0):
+        self.rate = rate
+        self.time_scale = time_scale      # protokol berjalan sekian kali lebih cepat
+        self.device = device
+        self.binary_capable = binary_capable
+        self.binary = False
+        self.sampling = True
+        self.seq = 0
+        self.t = 0.0                      # detik sejak START_SAMPLING
+        self.clock_ns = None              # timestamp sampel berikutnya
+        self.rng = np.random.default_rng(seed)
+        self._pending = b''
+
+    def phase(self, t):
+        """Waktu protokol -> (state, level, eksposur 0..1)"""
+        cycle = sum(d for _, d in PHASES)
+        level = min(int(t // cycle), LEVELS - 1)
+        t -= level * cycle
+        exposure = 0.0
+        for state, duration in PHASES:
+            if t < duration or state == STATE_RECOVERY:
+                break
+            t -= duration
+        if state == STATE_RAMP:
+            exposure = t / duration
+        elif state == STATE_HOLD:
+            exposure = 1.0
+        elif state in (STATE_PURGE, STATE_RECOVERY):
+            since = t + (PHASES[3][1] if state == STATE_RECOVERY else 0.0)
+            exposure = np.exp(-since / 2.0)
+        return state, level + 1, exposure
+
+    def samples(self, n):
+        """n sampel berikutnya -> (values (n, 7) urutan wire, state, level, timestamp ns)"""
+        values = np.empty((n, len(BASELINE)))
+        state = np.empty(n, dtype=np.int8)
+        level = np.empty(n, dtype=np.int8)
+        step = 1e9 / self.rate
+        now = time.time_ns()
+        # Jam sampel mengikuti rate; disetel ulang kalau tertinggal jauh (STOP / unplug)
+        if self.clock_ns is None or abs(now - self.clock_ns) > 1e9:
+            self.clock_ns = now - (n - 1) * step
+        stamps = (self.clock_ns + np.arange(n) * step).astype(np.int64)
+        self.clock_ns += n * step
+        for i in range(n):
+            state[i], level[i], exposure = self.phase(self.t * self.time_scale)
+            values[i] = BASELINE + GAIN * level[i] * exposure
+            self.t += 1.0 / self.rate
+        values += self.rng.normal(0.0, NOISE, values.shape)
+        return values, state, level, stamps
+
+    def encode(self, n):
+        values, state, level, stamps = self.samples(n)
+        if self.binary:
+            seq = (self.seq + np.arange(n)) & 0xFFFFFFFF
+            data = encode_frames(values, state, level, seq, device=self.device, timestamp=stamps)
+        else:
+            data = ''.join(f"SENSOR:{','.join(f'{v:.3f}' for v in row)},{s},{l}\n"
+                           for row, s, l in zip(values, state, level)).encode()
+        self.seq = (self.seq + n) & 0xFFFFFFFF
+        return data
+
+    def feed(self, data):
+        """Byte dari relay (command per baris) -> balasan yang harus dikirim"""
+        self._pending += data
+        *lines, self._pending = self._pending.split(b'\n')
+        reply = b''
+        for line in lines:
+            if line.strip() == HELLO.strip() and self.binary_capable:
+                self.binary = True
+                reply += ACK
+                continue
+            cmd = line.strip().decode('ascii', 'replace')
+            if cmd == 'START_SAMPLING':
+                self.sampling, self.t = True, 0.0
+            elif cmd == 'STOP_SAMPLING':
+                self.sampling = False
+            elif cmd.startswith('SET_RATE'):
+                try:
+                    rate = float(cmd.split()[1])
+                except (IndexError, ValueError):
+                    print(f"SET_RATE tidak valid: {cmd}")
+                    continue
+                self.rate = min(max(rate, 0.1), MAX_RATE)
+                print(f"Rate: {self.rate:g} Hz", flush=True)
+            elif cmd:
+                print(f"Command tidak dikenal: {cmd}")
+        return reply
+
+
+def stream(board, write, read, count, duration, stop_at=None):
+    """Kirim sampel sesuai rate sampai count / duration habis atau stop_at.
+
+    write(bytes) -> False kalau transport putus; read() -> bytes dari relay.
+    Hasil: jumlah sampel terkirim, atau None kalau transport putus.
+    """
+    sent = 0
+    start = last = time.monotonic()
+    due = 0.0
+    while count is None or sent < count:
+        now = time.monotonic()
+        if duration is not None and now - start >= duration:
+            break
+        if stop_at is not None and now >= stop_at:
+            return sent
+        reply = board.feed(read())
+        if reply and not write(reply):
+            return None
+        if board.sampling:
+            due += (now - last) * board.rate
+            n = int(due)
+            if count is not None:
+                n = min(n, count - sent)
+            if n:
+                due -= n
+                if not write(board.encode(n)):
+                    return None
+                sent += n
+        last = now
+        time.sleep(TICK)
+    return sent
+
+
+# ===============================
+# TRANSPORT
+# ===============================
+def run_tcp(board, addr, count, duration):
+    host, port = addr.rsplit(':', 1)
+    sent = 0
+    while count is None or sent < count:
+        try:
+            sock = socket.create_connection((host, int(port)), timeout=5)
+        except OSError as e:
+            print(f"Relay {addr} belum siap: {e}")
+            time.sleep(RECONNECT)
+            continue
+        # Board WiFi yang menawarkan frame biner (arah sebaliknya dari serial)
+        board.binary = False
+        if board.binary_capable:
+            sock.sendall(HELLO)
+            sock.settimeout(HANDSHAKE_TIMEOUT)
+            try:
+                board.binary = sock.recv(len(ACK)) == ACK
+            except OSError:
+                pass
+        sock.settimeout(None)
+        print(f"Terhubung ke {addr} ({'binary' if board.binary else 'text'})")
+
+        def write(data):
+            try:
+                sock.sendall(data)
+            except OSError:
+                return False
+            return True
+
+        def read():
+            if not select.select([sock], [], [], 0)[0]:
+                return b''
+            try:
+                return sock.recv(4096)
+            except OSError:
+                return b''
+
+        remaining = None if count is None else count - sent
+        n = stream(board, write, read, remaining, duration)
+        sock.close()
+        if n is None:
+            print("Koneksi relay putus, connect ulang")
+            time.sleep(RECONNECT)
+            continue
+        sent += n
+        break
+    return sent
+
+
+def open_pty(link):
+    """Pseudo-terminal baru (master, slave fd); path slave di-symlink ke `link`"""
+    import tty   # Unix saja; di Windows pakai --tcp
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    os.set_blocking(master, False)
+    path = os.ttyname(slave)
+    if link:
+        tmp = f"{link}.tmp"
+        if os.path.lexists(tmp):
+            os.unlink(tmp)
+        os.symlink(path, tmp)
+        os.replace(tmp, link)
+    print(f"PTY: {link or path} -> {path}", flush=True)
+    return master, slave
+
+
+def run_pty(board, link, count, duration, unplug_every):
+    sent = 0
+    started = time.monotonic()
+    while True:
+        master, slave = open_pty(link)
+        # Seperti board asli: setelah colok ulang mulai lagi dalam mode teks
+        board.binary = False
+        board._pending = b''
+
+        def write(data):
+            # Seperti USB CDC: tunggu relay membaca; relay yang tidak membuka
+            # port sama sekali = sisa data dibuang setelah WRITE_TIMEOUT
+            view = memoryview(data)
+            deadline = time.monotonic() + WRITE_TIMEOUT
+            while view:
+                try:
+                    view = view[os.write(master, view):]
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        break
+                    select.select([], [master], [], TICK)
+                except OSError:
+                    return False
+            return True
+
+        def read():
+            if not select.select([master], [], [], 0)[0]:
+                return b''
+            try:
+                return os.read(master, 4096)
+            except OSError:
+                return b''
+
+        remaining = None if count is None else count - sent
+        left = None if duration is None else duration - (time.monotonic() - started)
+        stop_at = None if unplug_every is None else time.monotonic() + unplug_every
+        n = stream(board, write, read, remaining, left, stop_at)
+        sent += n or 0
+        done = (count is not None and sent >= count) or \
+               (duration is not None and time.monotonic() - started >= duration)
+        if done:
+            # Beri relay waktu membaca sisa buffer sebelum pty ditutup
+            time.sleep(1.0)
+        os.close(master)
+        os.close(slave)
+        if done:
+            break
+        print(f"PTY: dicabut setelah {sent} sampel", flush=True)
+        time.sleep(RECONNECT)
+    if link and os.path.islink(link):
+        os.unlink(link)
+    return sent
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulator board e-nose (TCP atau pseudo-terminal)")
+    where = parser.add_mutually_exclusive_group(required=True)
+    where.add_argument('--tcp', metavar='HOST:PORT', help="alamat backend.arduino_addr")
+    where.add_argument('--pty', action='store_true', help="buat pseudo-terminal sebagai port serial")
+    parser.add_argument('--link', default='/tmp/enose-tty',
+                        help="symlink ke slave pty, isi backend.serial_port dengan ini")
+    parser.add_argument('--format', choices=('binary', 'text'), default='binary',
+                        help="text = firmware lama, HELLO tidak dibalas")
+    parser.add_argument('--rate', type=float, default=10.0, help="sampel per detik")
+    parser.add_argument('--device', type=int, default=0)
+    parser.add_argument('--count', type=int, default=None, help="berhenti setelah N sampel")
+    parser.add_argument('--duration', type=float, default=None, help="berhenti setelah N detik")
+    parser.add_argument('--unplug-every', type=float, default=None, metavar='DETIK',
+                        help="(pty) tutup lalu buat ulang pty tiap N detik")
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help="percepat fase protokol (mis. 10 = satu level 3 detik)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    board = Board(args.rate, args.device, args.format == 'binary', args.seed, args.time_scale)
+    started = time.monotonic()
+    try:
+        if args.tcp:
+            sent = run_tcp(board, args.tcp, args.count, args.duration)
+        else:
+            sent = run_pty(board, args.link, args.count, args.duration, args.unplug_every)
+    except KeyboardInterrupt:
+        sent = board.seq
+    print(f"{sent} sampel dalam {time.monotonic() - started:.1f} detik")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+import numpy as np
+
+# ===============================
+# ROLLING STATISTICS PER KANAL
+# ===============================
+# Semua kanal di-update sekaligus sebagai satu vektor, dan batch sampel
+# diproses dengan satu panggilan (tanpa loop Python per sampel / per kanal).
+# Window diukur dalam detik, bukan jumlah sampel, karena rate sampling bisa
+# berubah per fase: sampel yang lebih tua dari `span` detik dibuang dari
+# ring buffer (buffer membesar sendiri kalau rate naik). Mean/std/slope
+# memakai running sum yang dikurangi sampel yang keluar; min/max dihitung
+# saat snapshot (sekali per render tick). EWMA memakai konstanta waktu
+# `ewma_secs`, jadi responnya sama di rate berapa pun.
+#
+# Waktu sampel diasumsikan naik; sampel yang datang mundur tetap dihitung
+# tapi baru dibuang setelah semua sampel sebelumnya keluar.
+
+DEFAULT_SPAN = 60.0        # detik
+DEFAULT_EWMA_SECS = 2.0    # ~alpha 0.05 @ 10 Hz
+INITIAL_CAPACITY = 1024    # sampel; digandakan saat penuh
+RESYNC_EVERY = 10000       # hitung ulang running sum untuk buang error floating point
+
+
+class RollingStats:
+    def __init__(self, n_channels, span=DEFAULT_SPAN, ewma_secs=DEFAULT_EWMA_SECS):
+        if span <= 0:
+            raise ValueError("span must be > 0")
+        if ewma_secs <= 0:
+            raise ValueError("ewma_secs must be > 0")
+        self.n_channels = n_channels
+        self.span = float(span)
+        self.ewma_secs = float(ewma_secs)
+        self.reset()
+
+    def reset(self):
+        """Kosongkan window dan semua akumulator"""
+        n = self.n_channels
+        self._values = np.zeros((INITIAL_CAPACITY, n))
+        self._times = np.zeros(INITIAL_CAPACITY)
+        self._head = 0            # index sampel tertua di ring
+        self._count = 0
+        self._since_resync = 0
+        self._t0 = None
+        self._t_last = None
+        self._sx = np.zeros(n)
+        self._sxx = np.zeros(n)
+        self._stx = np.zeros(n)
+        self._st = 0.0
+        self._stt = 0.0
+        self._last = np.full(n, np.nan)
+        self._ewma = np.full(n, np.nan)
+        self._ewma_t = None
+
+    def __len__(self):
+        return self._count
+
+    def set_window(self, span=None, ewma_secs=None):
+        """Ganti panjang window / konstanta EWMA (hot reload); isi window dipertahankan"""
+        if span is not None:
+            if span <= 0:
+                raise ValueError("span must be > 0")
+            self.span = float(span)
+            if self._t_last is not None:
+                self._evict(self._t_last - self.span)
+        if ewma_secs is not None:
+            if ewma_secs <= 0:
+                raise ValueError("ewma_secs must be > 0")
+            self.ewma_secs = float(ewma_secs)
+
+    def update(self, t, values):
+        """Tambahkan satu sampel (vektor semua kanal) pada waktu t (detik)"""
+        self.update_batch([t], np.reshape(values, (1, -1)))
+
+    def update_batch(self, times, values):
+        """Tambahkan beberapa sampel sekaligus, values berbentuk (N, n_channels)"""
+        t_abs = np.asarray(times, dtype=float).reshape(-1)
+        x = np.asarray(values, dtype=float).reshape(len(t_abs), self.n_channels)
+        if not len(t_abs):
+            return
+        self._update_ewma(t_abs, x)
+        self._last = x[-1].copy()
+
+        if self._t0 is None:
+            self._t0 = t_abs[0]
+        t_end = max(t_abs[-1], self._t_last) if self._t_last is not None else t_abs[-1]
+        self._t_last = t_end
+        # Sampel batch yang sudah di luar window tidak perlu masuk ring sama sekali
+        keep = t_abs >= t_end - self.span
+        keep[-1] = True
+        t_abs, x = t_abs[keep], x[keep]
+        t = t_abs - self._t0
+
+        self._append(t, x)
+        self._sx += x.sum(axis=0)
+        self._sxx += (x * x).sum(axis=0)
+        self._stx += t @ x
+        self._st += t.sum()
+        self._stt += t @ t
+        self._evict(t_end - self.span)
+
+        self._since_resync += len(t)
+        if self._since_resync >= RESYNC_EVERY:
+            self._resync()
+
+    def _update_ewma(self, t, x):
+        """EWMA konstanta waktu tau, satu langkah untuk seluruh batch.
+
+        Bobot sampel j di akhir batch = (1 - exp(-dt_j / tau)) * exp(-(t_N - t_j) / tau);
+        jumlah bobot + sisa nilai lama = 1, sama dengan rekursi per sampel.
+        """
+        if self._ewma_t is None:
+            self._ewma, self._ewma_t = x[0].copy(), t[0]
+            t, x = t[1:], x[1:]
+            if not len(t):
+                return
+        tau = self.ewma_secs
+        alpha = 1.0 - np.exp(-np.maximum(np.diff(np.r_[self._ewma_t, t]), 0.0) / tau)
+        decay = np.exp(-np.maximum(t[-1] - t, 0.0) / tau)
+        carry = np.exp(-max(t[-1] - self._ewma_t, 0.0) / tau)
+        self._ewma = carry * self._ewma + (alpha * decay) @ x
+        self._ewma_t = t[-1]
+
+    def _ordered(self):
+        """Index ring dari sampel tertua ke terbaru"""
+        return (self._head + np.arange(self._count)) % len(self._times)
+
+    def _append(self, t, x):
+        k = len(t)
+        cap = len(self._times)
+        if self._count + k > cap:
+            order = self._ordered()
+            new_cap = cap
+            while self._count + k > new_cap:
+                new_cap *= 2
+            values = np.zeros((new_cap, self.n_channels))
+            times = np.zeros(new_cap)
+            values[:self._count] = self._values[order]
+            times[:self._count] = self._times[order]
+            self._values, self._times, self._head = values, times, 0
+            cap = new_cap
+        pos = (self._head + self._count + np.arange(k)) % cap
+        self._values[pos] = x
+        self._times[pos] = t
+        self._count += k
+
+    def _evict(self, cutoff_abs):
+        """Buang sampel terdepan yang lebih tua dari cutoff (waktu absolut)"""
+        if not self._count or self._t0 is None:
+            return
+        cutoff = cutoff_abs - self._t0
+        cap = len(self._times)
+        # Ring = dua potongan terurut: [head, cap) lalu [0, tail)
+        first = self._times[self._head:min(self._head + self._count, cap)]
+        n = int(np.searchsorted(first, cutoff, side='left'))
+        if n == len(first) and self._head + self._count > cap:
+            second = self._times[:self._head + self._count - cap]
+            n += int(np.searchsorted(second, cutoff, side='left'))
+        n = min(n, self._count - 1)   # sampel terbaru selalu tinggal
+        if n <= 0:
+            return
+        idx = (self._head + np.arange(n)) % cap
+        old_x = self._values[idx]
+        old_t = self._times[idx]
+        self._sx -= old_x.sum(axis=0)
+        self._sxx -= (old_x * old_x).sum(axis=0)
+        self._stx -= old_t @ old_x
+        self._st -= old_t.sum()
+        self._stt -= old_t @ old_t
+        self._head = (self._head + n) % cap
+        self._count -= n
+
+    def _resync(self):
+        """Hitung ulang running sum dari isi window, dengan t0 digeser ke sampel tertua"""
+        self._since_resync = 0
+        order = self._ordered()
+        x = self._values[order]
+        t = self._times[order]
+        shift = t[0]
+        self._t0 += shift
+        t = t - shift
+        self._times[order] = t
+        self._sx = x.sum(axis=0)
+        self._sxx = (x * x).sum(axis=0)
+        self._stx = t @ x
+        self._st = t.sum()
+        self._stt = t @ t
+
+    def snapshot(self):
+        """Statistik saat ini sebagai dict berisi array per kanal"""
+        n = self._count
+        nan = np.full(self.n_channels, np.nan)
+        if n == 0:
+            return {'last': nan, 'mean': nan, 'std': nan, 'min': nan,
+                    'max': nan, 'slope': nan, 'ewma': nan, 'count': 0}
+
+        mean = self._sx / n
+        var = np.maximum(self._sxx / n - mean * mean, 0.0)
+        window = self._values[self._ordered()]
+
+        t_mean = self._st / n
+        t_var = self._stt / n - t_mean * t_mean
+        if n > 1 and t_var > 0:
+            slope = (self._stx / n - t_mean * mean) / t_var
+        else:
+            slope = np.zeros(self.n_channels)
+
+        return {
+            'last': self._last.copy(),
+            'mean': mean,
+            'std': np.sqrt(var),
+            'min': window.min(axis=0),
+            'max': window.max(axis=0),
+            'slope': slope,
+            'ewma': self._ewma.copy(),
+            'count': n,
+        }